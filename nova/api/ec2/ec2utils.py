@@ -37,18 +37,26 @@ _CACHE_TIME = 7 * 24 * 60 * 60
 _CACHE = None
 
 
+def _get_cache():
+    global _CACHE
+    if not _CACHE:
+        _CACHE = memorycache.get_client()
+    return _CACHE
+
+
+def _memoize_key(func, reqid):
+    return str("%s:%s" % (func.__name__, reqid))
+
+
 def memoize(func):
     @functools.wraps(func)
     def memoizer(context, reqid):
-        global _CACHE
-        if not _CACHE:
-            _CACHE = memorycache.get_client()
-        key = "%s:%s" % (func.__name__, reqid)
-        key = str(key)
-        value = _CACHE.get(key)
+        cache = _get_cache()
+        key = _memoize_key(func, reqid)
+        value = cache.get(key)
         if value is None:
             value = func(context, reqid)
-            _CACHE.set(key, value, time=_CACHE_TIME)
+            cache.set(key, value, time=_CACHE_TIME)
         return value
     return memoizer
 
@@ -285,6 +293,37 @@ def get_int_id_from_instance_uuid(context, instance_uuid):
         return db.ec2_instance_create(context, instance_uuid)['id']
 
 
+def get_int_ids_from_instance_uuids(context, instance_uuids):
+    """Get or create the ec2 ids of many instances, keyed by uuid.
+
+    Mappings that aren't cached yet are looked up with one query and then
+    cached for get_int_id_from_instance_uuid().
+    """
+    cache = _get_cache()
+    int_ids = {}
+    missing = []
+    for instance_uuid in set(instance_uuids):
+        int_id = cache.get(_memoize_key(get_int_id_from_instance_uuid,
+                                        instance_uuid))
+        if int_id is None:
+            missing.append(instance_uuid)
+        else:
+            int_ids[instance_uuid] = int_id
+
+    if missing:
+        found = db.get_ec2_instance_ids_by_uuids(context, missing)
+        for instance_uuid in missing:
+            int_id = found.get(instance_uuid)
+            if int_id is None:
+                int_id = db.ec2_instance_create(context, instance_uuid)['id']
+            cache.set(_memoize_key(get_int_id_from_instance_uuid,
+                                   instance_uuid),
+                      int_id, time=_CACHE_TIME)
+            int_ids[instance_uuid] = int_id
+
+    return int_ids
+
+
 @memoize
 def get_int_id_from_volume_uuid(context, volume_uuid):
     if volume_uuid is None:
@@ -24,6 +24,7 @@ from nova.api.openstack import wsgi
 from nova.api.openstack import xmlutil
 from nova import db
 from nova import exception
+from nova import generations
 from nova.openstack.common.gettextutils import _
 
 
@@ -75,6 +76,7 @@ class FlavorExtraSpecsController(object):
                                                               specs)
         except exception.MetadataLimitExceeded as error:
             raise exc.HTTPBadRequest(explanation=error.format_message())
+        generations.bump(generations.FLAVORS)
         return body
 
     @wsgi.serializers(xml=ExtraSpecTemplate)
@@ -94,6 +96,7 @@ class FlavorExtraSpecsController(object):
                                                                body)
         except exception.MetadataLimitExceeded as error:
             raise exc.HTTPBadRequest(explanation=error.format_message())
+        generations.bump(generations.FLAVORS)
         return body
 
     @wsgi.serializers(xml=ExtraSpecTemplate)
@@ -116,6 +119,7 @@ class FlavorExtraSpecsController(object):
             db.flavor_extra_specs_delete(context, flavor_id, id)
         except exception.InstanceTypeExtraSpecsNotFound as e:
             raise exc.HTTPNotFound(explanation=e.format_message())
+        generations.bump(generations.FLAVORS)
 
 
 class Flavorextraspecs(extensions.ExtensionDescriptor):
@@ -0,0 +1,134 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""The image pre-cache extension."""
+
+import webob.exc
+
+from nova.api.openstack import extensions
+from nova.api.openstack import wsgi
+from nova.api.openstack import xmlutil
+from nova import compute
+from nova import exception
+from nova.image import glance
+from nova.openstack.common.gettextutils import _
+
+
+authorize = extensions.extension_authorizer('compute', 'image_precache')
+
+
+class ImagePrecacheTemplate(xmlutil.TemplateBuilder):
+    def construct(self):
+        root = xmlutil.TemplateElement('precache', selector='precache')
+        root.set('image_id')
+        elem = xmlutil.SubTemplateElement(root, 'host', selector='hosts')
+        elem.set('host')
+        elem.set('state')
+        return xmlutil.MasterTemplate(root, 1)
+
+
+class ImagePrecacheDeserializer(wsgi.XMLDeserializer):
+    def default(self, string):
+        node = xmlutil.safe_minidom_parse_string(string)
+        precache_node = self.find_first_child_named(node, 'precache')
+        if precache_node is None:
+            return {'body': {}}
+
+        precache = {}
+        for attr in ('image_id', 'aggregate_id'):
+            if precache_node.hasAttribute(attr):
+                precache[attr] = precache_node.getAttribute(attr)
+        hosts = [self.extract_text(host_node) for host_node in
+                 self.find_children_named(precache_node, 'host')]
+        if hosts:
+            precache['hosts'] = hosts
+        return {'body': {'precache': precache}}
+
+
+class ImagePrecacheController(wsgi.Controller):
+    """Asks compute hosts to download an image ahead of its use."""
+
+    def __init__(self):
+        self.host_api = compute.HostAPI()
+        self.aggregate_api = compute.AggregateAPI()
+        self.image_service = glance.get_default_image_service()
+        super(ImagePrecacheController, self).__init__()
+
+    def _get_hosts(self, context, body):
+        hosts = list(body.get('hosts') or [])
+        aggregate_id = body.get('aggregate_id')
+        if aggregate_id is not None:
+            try:
+                aggregate = self.aggregate_api.get_aggregate(context,
+                                                             aggregate_id)
+            except exception.AggregateNotFound as e:
+                raise webob.exc.HTTPNotFound(explanation=e.format_message())
+            hosts.extend(aggregate['hosts'])
+        if not hosts:
+            msg = _("Either hosts or aggregate_id must be given")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+        # Keep the order given but only ask each host once
+        return sorted(set(hosts), key=hosts.index)
+
+    @wsgi.serializers(xml=ImagePrecacheTemplate)
+    @wsgi.deserializers(xml=ImagePrecacheDeserializer)
+    def create(self, req, body):
+        """Start downloading an image on a set of hosts.
+
+        The hosts are given by name, by aggregate or both. The response
+        holds the state of the download on each host, so repeating the
+        request can be used to follow their progress. A host reports a
+        failed download once, the next request retries it.
+        """
+        context = req.environ['nova.context']
+        authorize(context)
+
+        if not self.is_valid_body(body, 'precache'):
+            raise webob.exc.HTTPBadRequest()
+        body = body['precache']
+        image_id = body.get('image_id')
+        if not image_id:
+            msg = _("image_id must be given")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        hosts = self._get_hosts(context, body)
+        try:
+            self.image_service.show(context, image_id)
+        except exception.ImageNotFound as e:
+            raise webob.exc.HTTPNotFound(explanation=e.format_message())
+
+        states = []
+        for host in hosts:
+            try:
+                state = self.host_api.precache_image(context, host, image_id)
+            except exception.HostNotFound:
+                state = 'not_found'
+            except exception.ComputeServiceUnavailable:
+                state = 'unavailable'
+            states.append({'host': host, 'state': state})
+        return {'precache': {'image_id': image_id, 'hosts': states}}
+
+
+class Image_precache(extensions.ExtensionDescriptor):
+    """Admin-only pre-caching of images on compute hosts."""
+
+    name = "ImagePrecache"
+    alias = "os-image-precache"
+    namespace = ("http://docs.openstack.org/compute/ext/"
+                 "image-precache/api/v2")
+    updated = "2013-10-18T00:00:00+00:00"
+
+    def get_resources(self):
+        return [extensions.ResourceExtension('os-image-precache',
+                                             ImagePrecacheController())]
@@ -28,11 +28,13 @@ in your environment to assess your capabilities and multiply out to get
 figures.
 
 NOTE: As the rate-limiting here is done in memory, this only works per
-process (each process will have its own rate limiting counter).
+process (each process will have its own rate limiting counter). Use the
+`CacheLimiter` to share the counters between processes through memcached.
 """
 
 import collections
 import copy
+import hashlib
 import httplib
 import math
 import re
@@ -47,6 +49,7 @@ from nova.api.openstack import xmlutil
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import importutils
 from nova.openstack.common import jsonutils
+from nova.openstack.common import memorycache
 from nova import quota
 from nova import utils
 from nova import wsgi as base_wsgi
@@ -404,6 +407,113 @@ class Limiter(object):
         return result
 
 
+class CacheLimiter(Limiter):
+    """
+    Rate-limit checking class which keeps the state of limits in memcached,
+    so that all API workers using the same servers share it.
+
+    To use it, set ``limiter = nova.api.openstack.compute.limits.CacheLimiter``
+    in the ratelimit filter of api-paste.ini. The servers are given by
+    ``memcached_servers`` there, or by the memcached_servers option.
+
+    Requests are counted per user and limit in windows as long as the unit
+    of the limit, using the atomic incr of memcached, so no lock or round
+    trip other than to memcached is needed. The count of the previous window
+    is weighed in for the part of it still within the last unit of time, so
+    requests can't burst across the end of a window.
+    """
+
+    def __init__(self, limits, memcached_servers=None, **kwargs):
+        """
+        Initialize the new `CacheLimiter`.
+
+        @param limits: List of `Limit` objects
+        @param memcached_servers: Comma-separated memcached servers
+        """
+        super(CacheLimiter, self).__init__(limits, **kwargs)
+        if memcached_servers:
+            memcached_servers = [server.strip() for server in
+                                 memcached_servers.split(',')]
+        self._cache = memorycache.get_client(memcached_servers)
+
+    def _make_key(self, username, limit, window):
+        key = u'%s\0%s\0%s\0%s' % (username, limit.verb, limit.regex,
+                                     limit.unit)
+        return 'ratelimit-%s-%d' % (
+            hashlib.md5(key.encode('utf-8')).hexdigest(), window)
+
+    def _count(self, key, unit):
+        self._cache.add(key, '0', time=unit * 2)
+        count = self._cache.incr(key)
+        if count is None:
+            # The count expired between the add and the incr
+            self._cache.add(key, '1', time=unit * 2)
+            count = 1
+        return int(count)
+
+    def _uncount(self, key):
+        # NOTE: memcached refuses to incr by a negative delta, but the in
+        # process fake has no decr
+        decr = getattr(self._cache, 'decr', None)
+        if decr is not None:
+            decr(key)
+        else:
+            self._cache.incr(key, -1)
+
+    def _check_limit(self, limit, username):
+        """
+        Count a request against a limit.
+
+        @return: Seconds until the request would be allowed, or None
+        """
+        now = limit._get_time()
+        window = int(now // limit.unit)
+        elapsed = now - window * limit.unit
+
+        key = self._make_key(username, limit, window)
+        count = self._count(key, limit.unit)
+        previous = int(self._cache.get(
+            self._make_key(username, limit, window - 1)) or 0)
+        used = previous * (limit.unit - elapsed) / limit.unit + count
+
+        if used <= limit.value:
+            limit.remaining = math.floor(limit.value - used)
+            limit.next_request = now
+            return None
+
+        self._uncount(key)
+        if count <= limit.value:
+            # Allowed once enough of the previous window has gone by
+            delay = (limit.unit * float(previous - limit.value + count) /
+                     previous - elapsed)
+        else:
+            delay = limit.unit - elapsed
+        limit.remaining = 0
+        limit.next_request = now + delay
+        return delay
+
+    def check_for_delay(self, verb, url, username=None):
+        """
+        Check the given verb/user/user triplet for limit.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        delays = []
+
+        for limit in self.levels[username]:
+            if limit.verb != verb or not re.match(limit.regex, url):
+                continue
+            delay = self._check_limit(limit, username)
+            if delay:
+                delays.append((delay, limit.error_message))
+
+        if delays:
+            delays.sort()
+            return delays[0]
+
+        return None, None
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
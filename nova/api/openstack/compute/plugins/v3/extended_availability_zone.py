@@ -28,9 +28,8 @@ authorize = extensions.soft_extension_authorizer('compute',
 
 
 class ExtendedAZController(wsgi.Controller):
-    def _extend_server(self, context, server, instance):
+    def _extend_server(self, server, instance, az):
         key = "%s:availability_zone" % ExtendedAvailabilityZone.alias
-        az = avail_zone.get_instance_availability_zone(context, instance)
         if not az and instance.get('availability_zone'):
             # Likely hasn't reached a viable compute node yet so give back the
             # desired availability_zone that *may* exist in the instance
@@ -45,7 +44,9 @@ class ExtendedAZController(wsgi.Controller):
             resp_obj.attach(xml=ExtendedAZTemplate())
             server = resp_obj.obj['server']
             db_instance = req.get_db_instance(server['id'])
-            self._extend_server(context, server, db_instance)
+            az = avail_zone.get_instance_availability_zone(context,
+                                                           db_instance)
+            self._extend_server(server, db_instance, az)
 
     @wsgi.extends
     def detail(self, req, resp_obj):
@@ -53,9 +54,13 @@ class ExtendedAZController(wsgi.Controller):
         if authorize(context):
             resp_obj.attach(xml=ExtendedAZsTemplate())
             servers = list(resp_obj.obj['servers'])
-            for server in servers:
-                db_instance = req.get_db_instance(server['id'])
-                self._extend_server(context, server, db_instance)
+            db_instances = [req.get_db_instance(server['id'])
+                            for server in servers]
+            zones = avail_zone.get_instances_availability_zones(context,
+                                                                db_instances)
+            for server, db_instance in zip(servers, db_instances):
+                self._extend_server(server, db_instance,
+                                    zones[db_instance['uuid']])
 
 
 class ExtendedAvailabilityZone(extensions.V3APIExtensionBase):
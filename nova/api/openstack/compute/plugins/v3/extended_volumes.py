@@ -46,8 +46,9 @@ class ExtendedVolumesController(wsgi.Controller):
         self.compute_api = compute.API()
         self.volume_api = volume.API()
 
-    def _extend_server(self, context, server, instance):
-        bdms = self.compute_api.get_instance_bdms(context, instance)
+    def _extend_server(self, context, server, instance, bdms=None):
+        if bdms is None:
+            bdms = self.compute_api.get_instance_bdms(context, instance)
         volume_ids = [bdm['volume_id'] for bdm in bdms if bdm['volume_id']]
         key = "%s:volumes_attached" % ExtendedVolumes.alias
         server[key] = [{'id': volume_id} for volume_id in volume_ids]
@@ -123,11 +124,14 @@ class ExtendedVolumesController(wsgi.Controller):
             # Attach our slave template to the response object
             resp_obj.attach(xml=ExtendedVolumesServersTemplate())
             servers = list(resp_obj.obj['servers'])
-            for server in servers:
-                db_instance = req.get_db_instance(server['id'])
-                # server['id'] is guaranteed to be in the cache due to
-                # the core API adding it in its 'detail' method.
-                self._extend_server(context, server, db_instance)
+            # server['id'] is guaranteed to be in the cache due to
+            # the core API adding it in its 'detail' method.
+            db_instances = [req.get_db_instance(server['id'])
+                            for server in servers]
+            bdms = self.compute_api.get_instances_bdms(context, db_instances)
+            for server, db_instance in zip(servers, db_instances):
+                self._extend_server(context, server, db_instance,
+                                    bdms[db_instance['uuid']])
 
     def _validate_volume_id(self, volume_id):
         if not uuidutils.is_uuid_like(volume_id):
@@ -22,6 +22,7 @@ from nova.api.openstack import wsgi
 from nova.api.openstack import xmlutil
 from nova import db
 from nova import exception
+from nova import generations
 from nova.openstack.common.db import exception as db_exc
 from nova.openstack.common.gettextutils import _
 
@@ -79,6 +80,7 @@ class FlavorExtraSpecsController(object):
                                                           specs)
         except db_exc.DBDuplicateEntry as error:
             raise webob.exc.HTTPBadRequest(explanation=error.format_message())
+        generations.bump(generations.FLAVORS)
         return body
 
     @wsgi.serializers(xml=ExtraSpecTemplate)
@@ -97,6 +99,7 @@ class FlavorExtraSpecsController(object):
                                                           body)
         except db_exc.DBDuplicateEntry as error:
             raise webob.exc.HTTPBadRequest(explanation=error.format_message())
+        generations.bump(generations.FLAVORS)
         return body
 
     @wsgi.serializers(xml=ExtraSpecTemplate)
@@ -121,6 +124,7 @@ class FlavorExtraSpecsController(object):
             db.instance_type_extra_specs_delete(context, flavor_id, id)
         except exception.InstanceTypeExtraSpecsNotFound as e:
             raise webob.exc.HTTPNotFound(explanation=e.format_message())
+        generations.bump(generations.FLAVORS)
 
 
 class FlavorsExtraSpecs(extensions.V3APIExtensionBase):
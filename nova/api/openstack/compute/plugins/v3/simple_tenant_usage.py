@@ -207,6 +207,25 @@ class SimpleTenantUsageController(object):
 
         return rval.values()
 
+    def _tenant_usage_totals_for_period(self, context, period_start,
+                                        period_stop):
+        """Get the total usage of every tenant.
+
+        Unlike _tenant_usages_for_period(), the usage is summed up by the
+        database rather than from each instance.
+        """
+        compute_api = api.API()
+        usages = compute_api.get_usage_by_window(context, period_start,
+                                                 period_stop)
+        return [{'tenant_id': tenant_id,
+                 'total_local_gb_usage': usage['local_gb_hours'],
+                 'total_vcpus_usage': usage['vcpus_hours'],
+                 'total_memory_mb_usage': usage['memory_mb_hours'],
+                 'total_hours': usage['hours'],
+                 'start': period_start,
+                 'stop': period_stop}
+                for tenant_id, usage in usages.iteritems()]
+
     def _parse_datetime(self, dtstr):
         if not dtstr:
             return timeutils.utcnow()
@@ -253,10 +272,15 @@ class SimpleTenantUsageController(object):
         now = timeutils.utcnow()
         if period_stop > now:
             period_stop = now
-        usages = self._tenant_usages_for_period(context,
-                                                period_start,
-                                                period_stop,
-                                                detailed=detailed)
+        if detailed:
+            usages = self._tenant_usages_for_period(context,
+                                                    period_start,
+                                                    period_stop,
+                                                    detailed=detailed)
+        else:
+            usages = self._tenant_usage_totals_for_period(context,
+                                                          period_start,
+                                                          period_stop)
         return {'tenant_usages': usages}
 
     @extensions.expected_errors(400)
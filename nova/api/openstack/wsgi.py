@@ -16,23 +16,61 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
 import inspect
 import math
 import time
+import types
 from xml.dom import minidom
 
 from lxml import etree
+from oslo.config import cfg
 import webob
 
 from nova.api.openstack import xmlutil
 from nova import exception
+from nova import generations
 from nova.openstack.common import gettextutils
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
+from nova.openstack.common import memorycache
 from nova import wsgi
 
 
+response_cache_opts = [
+    cfg.ListOpt('api_response_cache_resources',
+                default=[],
+                help='API resources whose GET responses are cached per '
+                     'user and answered with 304 Not Modified when the '
+                     'client already has them, for example flavors, limits, '
+                     'extensions, os-availability-zone or os-hypervisors. '
+                     'Resources are named by the first part of their URL '
+                     'after the project id'),
+    cfg.IntOpt('api_response_cache_ttl',
+               default=60,
+               help='Seconds a cached API response is used for. Responses '
+                    'for flavors, aggregates, availability zones and '
+                    'services are also dropped as soon as those change. '
+                    'Everything else, including the usage figures in '
+                    'os-hypervisors responses, is only refreshed after '
+                    'this many seconds'),
+    ]
+
+json_stream_opts = [
+    cfg.IntOpt('api_json_stream_items',
+               default=1000,
+               help='Number of items in the lists of a JSON response, such '
+                    'as the servers of servers/detail, from which the '
+                    'response is encoded and sent in chunks rather than '
+                    'built as a whole in memory. 0 disables streaming'),
+    ]
+
+CONF = cfg.CONF
+CONF.register_opts(response_cache_opts)
+CONF.register_opts(json_stream_opts)
+
+
 XMLNS_V10 = 'http://docs.rackspacecloud.com/servers/api/v1.0'
 XMLNS_V11 = 'http://docs.openstack.org/compute/api/v1.1'
 
@@ -72,6 +110,37 @@ _ROUTES_METHODS = [
     'update',
 ]
 
+# The data each cacheable resource is built from, so that its cached
+# responses are dropped when that data changes
+_RESPONSE_CACHE_GENERATIONS = {
+    'flavors': [generations.FLAVORS],
+    'os-aggregates': [generations.AGGREGATES],
+    'os-availability-zone': [generations.AGGREGATES, generations.SERVICES],
+    # NOTE: hypervisor usage changes with every build and is not tracked,
+    # so only the service details in these responses are kept fresh.
+    'os-hypervisors': [generations.SERVICES],
+    'os-services': [generations.SERVICES],
+}
+
+_RESPONSE_CACHE = None
+
+
+def _get_response_cache():
+    global _RESPONSE_CACHE
+
+    if _RESPONSE_CACHE is None:
+        _RESPONSE_CACHE = memorycache.get_client()
+
+    return _RESPONSE_CACHE
+
+
+def reset_response_cache():
+    """Reset the response cache, mainly for testing purposes."""
+
+    global _RESPONSE_CACHE
+
+    _RESPONSE_CACHE = None
+
 
 class Request(webob.Request):
     """Add some OpenStack API-specific logic to the base webob.Request."""
@@ -339,6 +408,75 @@ class JSONDictSerializer(DictSerializer):
     def default(self, data):
         return jsonutils.dumps(data)
 
+    def iterencode(self, data, chunk_size=65536):
+        """Serialize data, yielding the JSON document in chunks.
+
+        The lists at the top of data, like the servers of a servers/detail
+        response, are encoded one item at a time so that the document is
+        never held in memory as a whole.  The chunks joined together are
+        the same as what default() returns.
+        """
+        chunk = []
+        size = 0
+        for piece in self._iterencode(data):
+            chunk.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+
+    def _iterencode(self, data):
+        if (not isinstance(data, dict) or
+                not all(isinstance(key, basestring) for key in data)):
+            yield jsonutils.dumps(data)
+            return
+
+        yield '{'
+        for idx, (key, value) in enumerate(data.iteritems()):
+            if idx:
+                yield ', '
+            yield jsonutils.dumps(key)
+            yield ': '
+            if not _is_streamable(value):
+                yield jsonutils.dumps(value)
+                continue
+
+            yield '['
+            for item_idx, item in enumerate(value):
+                if item_idx:
+                    yield ', '
+                yield jsonutils.dumps(item)
+            yield ']'
+        yield '}'
+
+
+def _is_streamable(value):
+    """Determine whether a value is a list which can be encoded by item."""
+
+    return isinstance(value, (list, tuple, types.GeneratorType))
+
+
+def _should_stream(obj):
+    """Determine whether a response object is worth serializing in chunks.
+
+    Generators are always streamed; otherwise the lists at the top of the
+    object must hold at least api_json_stream_items items.
+    """
+
+    if CONF.api_json_stream_items <= 0 or not isinstance(obj, dict):
+        return False
+
+    count = 0
+    for value in obj.values():
+        if isinstance(value, types.GeneratorType):
+            return True
+        if _is_streamable(value):
+            count += len(value)
+    return count >= CONF.api_json_stream_items
+
 
 class XMLDictSerializer(DictSerializer):
 
@@ -609,7 +747,11 @@ class ResponseObject(object):
             response.headers[hdr] = str(value)
         response.headers['Content-Type'] = content_type
         if self.obj is not None:
-            response.body = serializer.serialize(self.obj)
+            if (isinstance(serializer, JSONDictSerializer) and
+                    _should_stream(self.obj)):
+                response.app_iter = serializer.iterencode(self.obj)
+            else:
+                response.body = serializer.serialize(self.obj)
 
         return response
 
@@ -908,8 +1050,84 @@ class Resource(wsgi.Application):
         #            function.  If we try to audit __call__(), we can
         #            run into troubles due to the @webob.dec.wsgify()
         #            decorator.
-        return self._process_stack(request, action, action_args,
-                               content_type, body, accept)
+        resource = self._get_cached_resource(request)
+        if resource is None:
+            return self._process_stack(request, action, action_args,
+                                       content_type, body, accept)
+        return self._process_cached_stack(resource, request, action,
+                                          action_args, content_type, body,
+                                          accept)
+
+    def _get_cached_resource(self, request):
+        """Return the name of the resource if its response is cacheable."""
+        if (request.method != 'GET' or
+                not CONF.api_response_cache_resources):
+            return None
+        context = request.environ.get('nova.context')
+        if context is None:
+            return None
+
+        parts = [part for part in request.path_info.split('/') if part]
+        if parts and parts[0] == context.project_id:
+            parts = parts[1:]
+        if not parts:
+            return None
+        resource = parts[0].split('.')[0]
+        if resource not in CONF.api_response_cache_resources:
+            return None
+        return resource
+
+    def _process_cached_stack(self, resource, request, action, action_args,
+                              content_type, body, accept):
+        """Run the processing stack unless a cached response can be used.
+
+        Responses are cached per user and roles, and carry an ETag so that
+        a client sending it back in If-None-Match gets a 304 instead.
+        """
+        context = request.environ['nova.context']
+        key = hashlib.md5('\0'.join([
+            request.path_qs, accept or '',
+            request.headers.get('Accept-Language', ''),
+            context.project_id or '', context.user_id or '',
+            ','.join(sorted(context.roles)), str(context.is_admin),
+            ])).hexdigest()
+        key = str('api-response-%s' % key)
+        current = [generations.get(name) for name in
+                   _RESPONSE_CACHE_GENERATIONS.get(resource, [])]
+
+        cache = _get_response_cache()
+        cached = cache.get(key)
+        if cached is not None and cached['generations'] == current:
+            response = webob.Response()
+            response.status_int = cached['status']
+            for hdr, value in cached['headers']:
+                response.headers[hdr] = value
+            response.body = cached['body']
+        else:
+            response = self._process_stack(request, action, action_args,
+                                           content_type, body, accept)
+            if (not isinstance(response, webob.Response) or
+                    response.status_int != 200):
+                return response
+
+            response.headers['ETag'] = ('"%s"' %
+                                        hashlib.md5(response.body).hexdigest())
+            headers = [(hdr, value) for hdr, value in response.headers.items()
+                       if hdr.lower() not in ('x-compute-request-id',
+                                              'content-length')]
+            cache.set(key, {'generations': current,
+                            'status': response.status_int,
+                            'headers': headers,
+                            'body': response.body},
+                      time=CONF.api_response_cache_ttl)
+
+        etag = response.etag
+        if etag in request.if_none_match:
+            response = webob.Response()
+            response.status_int = 304
+            response.headers['ETag'] = '"%s"' % etag
+        response.headers['x-compute-request-id'] = context.request_id
+        return response
 
     def _process_stack(self, request, action, action_args,
                        content_type, body, accept):
@@ -518,6 +518,164 @@ def SubTemplateElement(parent, tag, attrib=None, selector=None,
     return elem
 
 
+def _compile_selector(selector):
+    """Return a faster equivalent of a selector, where there is one.
+
+    A plain Selector indexing the object with a single key is by far the
+    most common selector in the templates; it is replaced by a function
+    doing just that.  Anything else is returned unchanged.
+    """
+
+    if (selector is None or type(selector) is not Selector or
+            len(selector.chain) != 1 or callable(selector.chain[0])):
+        return selector
+
+    key = selector.chain[0]
+
+    def select(obj, do_raise=False):
+        try:
+            return obj[key]
+        except (KeyError, IndexError):
+            if do_raise:
+                raise KeyError(key)
+            return None
+
+    return select
+
+
+def _overrides(elem, name):
+    """Determine whether a template element overrides a render method."""
+
+    method = getattr(type(elem), name)
+    return method.im_func is not getattr(TemplateElement, name).im_func
+
+
+class CompiledElement(object):
+    """Represent a template element compiled for rendering.
+
+    Rendering a template merges the elements of the master template with
+    the matching elements of the slave templates and looks up their
+    selectors and attributes for every element rendered.  A compiled
+    element does that work once: it holds the selectors, the attributes
+    and text to set, and the compiled children of the element and of all
+    its patches.  Elements overriding render(), _render() or apply() are
+    rendered through those methods instead.
+    """
+
+    def __init__(self, siblings):
+        """Compile an element.
+
+        :param siblings: The TemplateElement instances to render
+                         together, the first one being the element and
+                         the others its patches.
+        """
+
+        self.siblings = siblings
+        elem = siblings[0]
+        self.generic = any(_overrides(sibling, name)
+                           for sibling in siblings
+                           for name in ('render', '_render', 'apply'))
+
+        self.tag = elem.tag
+        self.dynamic_tag = callable(elem.tag)
+        self.selector = _compile_selector(elem.selector)
+        self.subselector = _compile_selector(elem.subselector)
+        if _overrides(elem, 'will_render'):
+            self.will_render = elem.will_render
+        else:
+            self.will_render = None
+
+        # Later patches win, as they would when applied in turn
+        self.text = None
+        self.attrib = []
+        for sibling in siblings:
+            if sibling.text is not None:
+                self.text = _compile_selector(sibling.text)
+            for key, value in sibling.items():
+                self.attrib.append((key, _compile_selector(value)))
+
+        # Merge the children of the element and its patches by tag
+        self.children = []
+        seen = set()
+        for idx, sibling in enumerate(siblings):
+            for child in sibling:
+                if child.tag in seen:
+                    continue
+                seen.add(child.tag)
+                nieces = [child]
+                for sib in siblings[idx + 1:]:
+                    if child.tag in sib:
+                        nieces.append(sib[child.tag])
+                self.children.append(CompiledElement(nieces))
+
+    def render(self, parent, obj, nsmap=None):
+        """Render an object.
+
+        Renders an object against the compiled element and its children.
+        Returns the first etree.Element instance rendered, or None.
+
+        :param parent: The parent etree.Element instance.  Can be
+                       None.
+        :param obj: The object to render.
+        :param nsmap: An optional namespace dictionary to be associated
+                      with the etree.Element instance rendered.
+        """
+
+        if self.generic:
+            elems = self.siblings[0].render(parent, obj, self.siblings[1:],
+                                            nsmap)
+            for child in self.children:
+                for elem, datum in elems:
+                    child.render(elem, datum)
+            return elems[0][0] if elems else None
+
+        # First, get the datum we're rendering
+        data = None if obj is None else self.selector(obj)
+
+        # Check if we should render at all
+        if self.will_render is not None:
+            if not self.will_render(data):
+                return None
+        elif data is None:
+            return None
+
+        subselector = self.subselector
+        if data is None:
+            data = [None]
+            subselector = None
+        elif not isinstance(data, list):
+            data = [data]
+        elif parent is None:
+            raise ValueError(_('root element selecting a list'))
+
+        first = None
+        for datum in data:
+            if subselector is not None:
+                datum = subselector(datum)
+            tagname = self.tag(datum) if self.dynamic_tag else self.tag
+            if parent is None:
+                elem = etree.Element(tagname, nsmap=nsmap)
+            else:
+                elem = etree.SubElement(parent, tagname)
+            if first is None:
+                first = elem
+
+            if datum is not None:
+                if self.text is not None:
+                    elem.text = unicode(self.text(datum))
+                for key, value in self.attrib:
+                    try:
+                        elem.set(key, unicode(value(datum, True)))
+                    except KeyError:
+                        # Attribute has no value, so don't include it
+                        pass
+
+            for child in self.children:
+                child.render(elem, datum)
+
+        return first
+
+
 class Template(object):
     """Represent a template."""
 
@@ -533,6 +691,7 @@ class Template(object):
         self.root = root.unwrap() if root is not None else None
         self.nsmap = nsmap or {}
         self.serialize_options = dict(encoding='UTF-8', xml_declaration=True)
+        self._compiled = {}
 
     def _serialize(self, parent, obj, siblings, nsmap=None):
         """Internal serialization.
@@ -616,7 +775,29 @@ class Template(object):
         nsmap = self._nsmap()
 
         # Form the element tree
-        return self._serialize(None, obj, siblings, nsmap)
+        return self.compile(siblings).render(None, obj, nsmap)
+
+    def compile(self, siblings=None):
+        """Compile the template.
+
+        Returns the CompiledElement for the given root siblings, which
+        default to the ones returned by _siblings().  The result is
+        cached, and shared with the copies of the template, so a
+        template must not be changed once it has been used.
+
+        :param siblings: The TemplateElement instances to render
+                         together at the root.
+        """
+
+        if siblings is None:
+            siblings = self._siblings()
+
+        key = tuple(siblings)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledElement(siblings)
+            self._compiled[key] = compiled
+        return compiled
 
     def _siblings(self):
         """Hook method for computing root siblings.
@@ -760,6 +941,7 @@ class MasterTemplate(Template):
         # Return a copy of the MasterTemplate
         tmp = self.__class__(self.root, self.version, self.nsmap)
         tmp.slaves = self.slaves[:]
+        tmp._compiled = self._compiled
         return tmp
 
 
@@ -863,6 +1045,26 @@ class TemplateBuilder(object):
         raise NotImplementedError(_("subclasses must implement construct()!"))
 
 
+def preload_templates():
+    """Construct and compile the templates of every TemplateBuilder.
+
+    Meant to be called once the API extensions are loaded and before
+    API workers are forked, so the templates are built once and shared
+    by the workers rather than built by each of them on first use.
+    """
+
+    builders = TemplateBuilder.__subclasses__()
+    while builders:
+        builder = builders.pop()
+        builders.extend(builder.__subclasses__())
+        try:
+            template = builder(copy=False)
+        except NotImplementedError:
+            # Base classes for other builders
+            continue
+        template.compile()
+
+
 def make_links(parent, selector=None):
     """
     Attach an Atom <links> element to the parent.
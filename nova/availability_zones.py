@@ -141,3 +141,40 @@ def get_instance_availability_zone(context, instance):
         az = get_host_availability_zone(elevated, host)
         cache.set(cache_key, az, AZ_CACHE_SECONDS)
     return az
+
+
+def get_instances_availability_zones(context, instances):
+    """Return availability zones of many instances, by instance uuid.
+
+    Each host is looked up once, and the hosts missing from the cache are
+    looked up with a single query.
+    """
+    hosts = set(str(instance.get('host')) for instance in instances)
+    hosts.discard('')
+
+    cache = _get_cache()
+    zones = {}
+    missing = []
+    for host in hosts:
+        az = cache.get(_make_cache_key(host))
+        if az:
+            zones[host] = az
+        else:
+            missing.append(host)
+
+    if len(missing) == 1:
+        zones[missing[0]] = get_host_availability_zone(context.elevated(),
+                                                       missing[0])
+    elif missing:
+        metadata = db.aggregate_host_get_by_metadata_key(
+            context.elevated(), key='availability_zone')
+        for host in missing:
+            if metadata.get(host):
+                zones[host] = list(metadata[host])[0]
+            else:
+                zones[host] = CONF.default_availability_zone
+    for host in missing:
+        cache.set(_make_cache_key(host), zones[host], AZ_CACHE_SECONDS)
+
+    return dict((instance['uuid'], zones.get(str(instance.get('host'))))
+                for instance in instances)
@@ -65,11 +65,13 @@ from nova.api.ec2 import ec2utils
 from nova import availability_zones
 from nova.cells import rpc_driver
 from nova.compute import flavors
+from nova.compute import utils as compute_utils
 from nova import config
 from nova import context
 from nova import db
 from nova.db import migration
 from nova import exception
+from nova import generations
 from nova.openstack.common import cliutils
 from nova.openstack.common.db import exception as db_exc
 from nova.openstack.common.gettextutils import _
@@ -91,6 +93,7 @@ CONF.import_opt('vlan_start', 'nova.network.manager')
 CONF.import_opt('vpn_start', 'nova.network.manager')
 CONF.import_opt('default_floating_pool', 'nova.network.floating_ips')
 CONF.import_opt('public_interface', 'nova.network.linux_net')
+CONF.import_opt('project_usage_rollup_max_days', 'nova.scheduler.manager')
 
 QUOTAS = quota.QUOTAS
 
@@ -902,6 +905,23 @@ class DbCommands(object):
         admin_context = context.get_admin_context()
         db.archive_deleted_rows(admin_context, max_rows)
 
+    @args('--max_days', metavar='<number>',
+            help='Maximum number of days to examine')
+    def rollup_usage(self, max_days=None):
+        """Sum up the usage of every project over the days gone by, for
+        usage reports to read.
+        """
+        if max_days is None:
+            max_days = CONF.project_usage_rollup_max_days
+        else:
+            max_days = int(max_days)
+            if max_days < 1:
+                print(_("Must supply a positive value for max_days"))
+                return(1)
+        admin_context = context.get_admin_context()
+        days = compute_utils.rollup_project_usage(admin_context, max_days)
+        print(_("Examined %d days") % days)
+
 
 class FlavorCommands(object):
     """Class for managing flavors.
@@ -1006,6 +1026,7 @@ class FlavorCommands(object):
                             ctxt,
                             inst_type["flavorid"],
                             ext_spec)
+            generations.bump(generations.FLAVORS)
             print((_("Key %(key)s set to %(value)s on instance "
                      "type %(name)s") %
                    {'key': key, 'value': value, 'name': name}))
@@ -1028,6 +1049,7 @@ class FlavorCommands(object):
                         ctxt,
                         inst_type["flavorid"],
                         key)
+            generations.bump(generations.FLAVORS)
 
             print((_("Key %(key)s on flavor %(name)s unset") %
                    {'key': key, 'name': name}))
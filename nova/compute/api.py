@@ -43,6 +43,7 @@ from nova.consoleauth import rpcapi as consoleauth_rpcapi
 from nova import crypto
 from nova.db import base
 from nova import exception
+from nova import generations
 from nova import hooks
 from nova.image import glance
 from nova import network
@@ -1623,6 +1624,10 @@ class API(base.Base):
         return self.db.instance_get_active_by_window_joined(context, begin,
                                                      end, project_id)
 
+    def get_usage_by_window(self, context, begin, end):
+        """Get the usage of every project over a window."""
+        return self.db.project_usage_get_by_window(context, begin, end)
+
     #NOTE(bcwaldon): this doesn't really belong in this class
     def get_instance_type(self, context, instance_type_id):
         """Get an instance type by instance type id."""
@@ -2848,6 +2853,15 @@ class API(base.Base):
             return block_device.legacy_mapping(bdms)
         return bdms
 
+    def get_instances_bdms(self, context, instances, legacy=True):
+        """Get all bdm tables for many instances, by instance uuid."""
+        bdms_by_uuid = self.db.block_device_mapping_get_all_by_instance_uuids(
+                context, [instance['uuid'] for instance in instances])
+        if legacy:
+            return dict((instance_uuid, block_device.legacy_mapping(bdms))
+                        for instance_uuid, bdms in bdms_by_uuid.items())
+        return bdms_by_uuid
+
     def is_volume_backed_instance(self, context, instance, bdms):
         if not instance['image_ref']:
             return True
@@ -2974,6 +2988,16 @@ class HostAPI(base.Base):
                          must_be_up=True)
         return self.rpcapi.get_host_uptime(context, host=host_name)
 
+    def precache_image(self, context, host_name, image_id):
+        """Starts downloading an image into the host's image cache.
+
+        Returns the state of the download on that host.
+        """
+        host_name = self._assert_host_exists(context, host_name,
+                         must_be_up=True)
+        return self.rpcapi.precache_image(context, image_id=image_id,
+                host=host_name)
+
     def host_power_action(self, context, host_name, action):
         """Reboots, shuts down or powers up the host."""
         host_name = self._assert_host_exists(context, host_name)
@@ -3026,6 +3050,7 @@ class HostAPI(base.Base):
                                                   binary)
         service.update(params_to_update)
         service.save()
+        generations.bump(generations.SERVICES)
         return service
 
     def instance_get_all_by_host(self, context, host_name):
@@ -3089,6 +3114,7 @@ class AggregateAPI(base.Base):
         if availability_zone:
             aggregate.metadata = {'availability_zone': availability_zone}
         aggregate.create(context)
+        generations.bump(generations.AGGREGATES)
 
         aggregate = self._reformat_aggregate_info(aggregate)
         # To maintain the same API result as before.
@@ -3115,6 +3141,7 @@ class AggregateAPI(base.Base):
         if values:
             aggregate.metadata = values
         aggregate.save()
+        generations.bump(generations.AGGREGATES)
 
         # If updated values include availability_zones, then the cache
         # which stored availability_zones and host need to be reset
@@ -3127,6 +3154,7 @@ class AggregateAPI(base.Base):
         """Updates the aggregate metadata."""
         aggregate = aggregate_obj.Aggregate.get_by_id(context, aggregate_id)
         aggregate.update_metadata(metadata)
+        generations.bump(generations.AGGREGATES)
         return aggregate
 
     @wrap_exception()
@@ -3143,6 +3171,7 @@ class AggregateAPI(base.Base):
                                                    aggregate_id=aggregate_id,
                                                    reason='not empty')
         aggregate.destroy()
+        generations.bump(generations.AGGREGATES)
         compute_utils.notify_about_aggregate_update(context,
                                                     "delete.end",
                                                     aggregate_payload)
@@ -3183,6 +3212,7 @@ class AggregateAPI(base.Base):
                 self._check_az_for_host(aggregate_meta, host_az, aggregate_id)
         aggregate = aggregate_obj.Aggregate.get_by_id(context, aggregate_id)
         aggregate.add_host(context, host_name)
+        generations.bump(generations.AGGREGATES)
         #NOTE(jogo): Send message to host to support resource pools
         self.compute_rpcapi.add_aggregate_host(context,
                 aggregate=obj_base.obj_to_primitive(aggregate),
@@ -3205,6 +3235,7 @@ class AggregateAPI(base.Base):
         service_obj.Service.get_by_compute_host(context, host_name)
         aggregate = aggregate_obj.Aggregate.get_by_id(context, aggregate_id)
         aggregate.delete_host(host_name)
+        generations.bump(generations.AGGREGATES)
         self.compute_rpcapi.remove_aggregate_host(context,
                 aggregate=obj_base.obj_to_primitive(aggregate),
                 host_param=host_name, host=host_name)
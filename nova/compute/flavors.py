@@ -28,6 +28,7 @@ from oslo.config import cfg
 from nova import context
 from nova import db
 from nova import exception
+from nova import generations
 from nova.openstack.common.db import exception as db_exc
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
@@ -154,10 +155,12 @@ def create(name, memory, vcpus, root_gb, ephemeral_gb=0, flavorid=None,
         raise exception.InvalidInput(reason=_("is_public must be a boolean"))
 
     try:
-        return db.flavor_create(context.get_admin_context(), kwargs)
+        flavor = db.flavor_create(context.get_admin_context(), kwargs)
     except db_exc.DBError as e:
         LOG.exception(_('DB error: %s') % e)
         raise exception.InstanceTypeCreateFailed()
+    generations.bump(generations.FLAVORS)
+    return flavor
 
 
 def destroy(name):
@@ -169,6 +172,7 @@ def destroy(name):
     except (ValueError, exception.NotFound):
         LOG.exception(_('Instance type %s not found for deletion') % name)
         raise exception.InstanceTypeNotFoundByName(instance_type_name=name)
+    generations.bump(generations.FLAVORS)
 
 
 def get_all_flavors(ctxt=None, inactive=False, filters=None):
@@ -259,7 +263,9 @@ def add_flavor_access(flavorid, projectid, ctxt=None):
     if ctxt is None:
         ctxt = context.get_admin_context()
 
-    return db.flavor_access_add(ctxt, flavorid, projectid)
+    access = db.flavor_access_add(ctxt, flavorid, projectid)
+    generations.bump(generations.FLAVORS)
+    return access
 
 
 def remove_flavor_access(flavorid, projectid, ctxt=None):
@@ -267,7 +273,9 @@ def remove_flavor_access(flavorid, projectid, ctxt=None):
     if ctxt is None:
         ctxt = context.get_admin_context()
 
-    return db.flavor_access_remove(ctxt, flavorid, projectid)
+    access = db.flavor_access_remove(ctxt, flavorid, projectid)
+    generations.bump(generations.FLAVORS)
+    return access
 
 
 def extract_flavor(instance, prefix=''):
@@ -37,6 +37,7 @@ import traceback
 import uuid
 
 from eventlet import greenthread
+from eventlet import semaphore
 from oslo.config import cfg
 
 from nova import block_device
@@ -113,6 +114,17 @@ compute_opts = [
     cfg.IntOpt('network_allocate_retries',
                default=0,
                help="Number of times to retry network allocation on failures"),
+    cfg.BoolOpt('sync_power_state_use_events',
+                default=False,
+                help='Rely on lifecycle events from the hypervisor to keep '
+                     'power states up to date, and back off the periodic '
+                     'power state sync to a reconciliation while the driver '
+                     'reports its events are being delivered'),
+    cfg.IntOpt('image_precache_max_concurrent',
+               default=1,
+               help='Number of images requested through the image pre-cache '
+                    'API that are downloaded at the same time. Further '
+                    'requests are queued'),
     ]
 
 interval_opts = [
@@ -123,6 +135,11 @@ interval_opts = [
                default=600,
                help='interval to sync power states between '
                     'the database and the hypervisor'),
+    cfg.IntOpt('sync_power_state_max_interval',
+               default=3600,
+               help='Maximum interval in seconds between power state '
+                    'reconciliations when sync_power_state_use_events is '
+                    'enabled'),
     cfg.IntOpt("heal_instance_info_cache_interval",
                default=60,
                help="Number of seconds between instance info_cache self "
@@ -415,11 +432,19 @@ class ComputeVirtAPI(virtapi.VirtAPI):
         return self._compute.conductor_api.block_device_mapping_update(
                 context, bdm_id, values)
 
+    def action_event_start(self, context, values):
+        return self._compute.conductor_api.action_event_start(context,
+                                                              values)
+
+    def action_event_finish(self, context, values):
+        return self._compute.conductor_api.action_event_finish(context,
+                                                               values)
+
 
 class ComputeManager(manager.SchedulerDependentManager):
     """Manages the running instances from creation to destruction."""
 
-    RPC_API_VERSION = '2.47'
+    RPC_API_VERSION = '2.48'
 
     def __init__(self, compute_driver=None, *args, **kwargs):
         """Load configuration options and connect to the hypervisor."""
@@ -431,6 +456,12 @@ class ComputeManager(manager.SchedulerDependentManager):
         self._last_vol_usage_poll = 0
         self._last_info_cache_heal = 0
         self._last_bw_usage_cell_update = 0
+        self._last_power_state_sync = 0
+        self._power_state_sync_interval = CONF.sync_power_state_interval
+        self._lifecycle_events_healthy = False
+        self._image_precache_states = {}
+        self._image_precache_slots = semaphore.Semaphore(
+            max(CONF.image_precache_max_concurrent, 1))
         self.compute_api = compute.API()
         self.compute_rpcapi = compute_rpcapi.ComputeAPI()
         self.conductor_api = conductor.API()
@@ -3260,6 +3291,44 @@ class ComputeManager(manager.SchedulerDependentManager):
         """Returns the result of calling "uptime" on the target host."""
         return self.driver.get_host_uptime(self.host)
 
+    @wrap_exception()
+    def precache_image(self, context, image_id):
+        """Start downloading an image into the driver's image cache.
+
+        The download runs in the background, this returns its state:
+        'queued', 'downloading', 'cached', 'error' or 'unsupported'.
+        Repeating the request follows the download without starting a
+        new one. The outcome of a download is reported once and then
+        forgotten, so the request after that caches the image again. The
+        image cache manager may have removed it since, and caching an
+        image which is still there is cheap and keeps it for another
+        precached_image_keep_seconds.
+        """
+        state = self._image_precache_states.get(image_id)
+        if state in ('cached', 'error', 'unsupported'):
+            del self._image_precache_states[image_id]
+            return state
+        if state is not None:
+            return state
+        self._image_precache_states[image_id] = 'queued'
+        utils.spawn_n(self._precache_image, context, image_id)
+        return 'queued'
+
+    def _precache_image(self, context, image_id):
+        with self._image_precache_slots:
+            self._image_precache_states[image_id] = 'downloading'
+            try:
+                self.driver.cache_image(context, image_id)
+            except NotImplementedError:
+                state = 'unsupported'
+            except Exception:
+                LOG.exception(_("Failed to pre-cache image %s"), image_id)
+                state = 'error'
+            else:
+                LOG.info(_("Pre-cached image %s"), image_id)
+                state = 'cached'
+            self._image_precache_states[image_id] = state
+
     @wrap_exception()
     @wrap_instance_fault
     def get_diagnostics(self, context, instance):
@@ -4657,7 +4726,31 @@ class ComputeManager(manager.SchedulerDependentManager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        The power states of all instances are fetched from the driver in a
+        single query, so only instances whose state needs aligning are
+        re-read from the database and acted upon.
+
+        With sync_power_state_use_events, lifecycle events keep the power
+        states current and this becomes a reconciliation whose interval
+        doubles after every run that finds nothing to fix, up to
+        sync_power_state_max_interval.  Any drift, or the driver reporting
+        its events as unhealthy, drops it back to sync_power_state_interval.
         """
+        curr_time = time.time()
+        if CONF.sync_power_state_use_events:
+            events_healthy = self.driver.lifecycle_events_healthy()
+            was_healthy = self._lifecycle_events_healthy
+            self._lifecycle_events_healthy = events_healthy
+            if not events_healthy:
+                self._power_state_sync_interval = (
+                    CONF.sync_power_state_interval)
+            elif (was_healthy and curr_time - self._last_power_state_sync <
+                    self._power_state_sync_interval):
+                # Events have been flowing since the last reconciliation
+                return
+        self._last_power_state_sync = curr_time
+
         db_instances = instance_obj.InstanceList.get_by_host(context,
                                                              self.host)
 
@@ -4670,23 +4763,66 @@ class ComputeManager(manager.SchedulerDependentManager):
                      {'num_db_instances': num_db_instances,
                       'num_vm_instances': num_vm_instances})
 
+        # Note(maoy): the call below might take a long time, for example,
+        # because of a broken libvirt driver.
+        vm_power_states = self.driver.list_instance_power_states(
+            [db_instance for db_instance in db_instances
+             if db_instance['task_state'] is None])
+
+        num_out_of_sync = 0
         for db_instance in db_instances:
             if db_instance['task_state'] is not None:
                 LOG.info(_("During sync_power_state the instance has a "
                            "pending task. Skip."), instance=db_instance)
                 continue
-            # No pending tasks. Now try to figure out the real vm_power_state.
-            try:
-                vm_instance = self.driver.get_info(db_instance)
-                vm_power_state = vm_instance['state']
-            except exception.InstanceNotFound:
-                vm_power_state = power_state.NOSTATE
-            # Note(maoy): the above get_info call might take a long time,
-            # for example, because of a broken libvirt driver.
+            # No pending tasks. Now look up the real vm_power_state.
+            vm_power_state = vm_power_states.get(db_instance['uuid'],
+                                                 power_state.NOSTATE)
+            if self._power_state_in_sync(db_instance, vm_power_state):
+                continue
+            num_out_of_sync += 1
             self._sync_instance_power_state(context,
                                             db_instance,
                                             vm_power_state)
 
+        if CONF.sync_power_state_use_events and self._lifecycle_events_healthy:
+            self._adjust_power_state_sync_interval(num_out_of_sync)
+
+    def _adjust_power_state_sync_interval(self, num_out_of_sync):
+        """Back off power state reconciliation while events keep up."""
+        if num_out_of_sync:
+            LOG.info(_("Power state reconciliation found %d instances "
+                       "that lifecycle events did not keep in sync"),
+                     num_out_of_sync)
+            self._power_state_sync_interval = CONF.sync_power_state_interval
+        else:
+            self._power_state_sync_interval = min(
+                self._power_state_sync_interval * 2,
+                max(CONF.sync_power_state_max_interval,
+                    CONF.sync_power_state_interval))
+
+    @staticmethod
+    def _power_state_in_sync(db_instance, vm_power_state):
+        """Check whether _sync_instance_power_state() would be a no-op.
+
+        True when the database already records vm_power_state and that
+        power state is the expected one for the instance's vm_state.
+        """
+        if db_instance['power_state'] != vm_power_state:
+            return False
+        vm_state = db_instance['vm_state']
+        if vm_state == vm_states.ACTIVE:
+            return vm_power_state == power_state.RUNNING
+        elif vm_state == vm_states.STOPPED:
+            return vm_power_state in (power_state.NOSTATE,
+                                      power_state.SHUTDOWN,
+                                      power_state.CRASHED)
+        elif vm_state in (vm_states.SOFT_DELETED,
+                          vm_states.DELETED):
+            return vm_power_state in (power_state.NOSTATE,
+                                      power_state.SHUTDOWN)
+        return True
+
     def _sync_instance_power_state(self, context, db_instance, vm_power_state):
         """Align instance power state between the database and hypervisor.
 
@@ -19,6 +19,8 @@ scheduler with useful information about availability through the ComputeNode
 model.
 """
 
+import time
+
 from oslo.config import cfg
 
 from nova.compute import claims
@@ -45,7 +47,14 @@ resource_tracker_opts = [
                help='Amount of memory in MB to reserve for the host'),
     cfg.StrOpt('compute_stats_class',
                default='nova.compute.stats.Stats',
-               help='Class that will manage stats for the local compute host')
+               help='Class that will manage stats for the local compute host'),
+    cfg.IntOpt('resource_tracker_full_audit_interval', default=0,
+               help='Interval in seconds between full audits of compute '
+                    'resources against the hypervisor and the database. In '
+                    'between, the periodic audit trusts the usage tracked by '
+                    'resource claims and only runs a full audit if the '
+                    'hypervisor instance count drifts from it. 0 runs a '
+                    'full audit every time'),
 ]
 
 CONF = cfg.CONF
@@ -54,6 +63,11 @@ CONF.register_opts(resource_tracker_opts)
 LOG = logging.getLogger(__name__)
 COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
 
+# Compute node fields that are bookkeeping rather than resource data, and
+# so are not worth pushing on their own.
+_UNTRACKED_FIELDS = ('id', 'service_id', 'created_at', 'updated_at',
+                     'deleted_at', 'deleted')
+
 CONF.import_opt('my_ip', 'nova.netconf')
 
 
@@ -72,6 +86,8 @@ class ResourceTracker(object):
         self.tracked_instances = {}
         self.tracked_migrations = {}
         self.conductor_api = conductor.API()
+        self._last_pushed = {}
+        self._last_full_audit = 0
 
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def instance_claim(self, context, instance_ref, limits=None):
@@ -269,8 +285,19 @@ class ResourceTracker(object):
         Add in resource claims in progress to account for operations that have
         declared a need for resources, but not necessarily retrieved them from
         the hypervisor layer yet.
+
+        With resource_tracker_full_audit_interval set, the audit is skipped
+        in between full audits unless _needs_full_audit() detects drift.
         """
+        if not self._needs_full_audit():
+            LOG.debug(_("Skipping resource audit, tracked usage is current"))
+            # Still touch the compute node record so the scheduler drops
+            # any usage it consumed locally and reloads it from the DB.
+            self._update(context, {})
+            return
+
         LOG.audit(_("Auditing locally available compute resources"))
+        self._last_full_audit = time.time()
         resources = self.driver.get_available_resource(self.nodename)
 
         if not resources:
@@ -324,6 +351,27 @@ class ResourceTracker(object):
 
         self._sync_compute_node(context, resources)
 
+    def _needs_full_audit(self):
+        """Check whether the tracked usage may have drifted from reality."""
+        interval = CONF.resource_tracker_full_audit_interval
+        if interval <= 0 or self.disabled:
+            return True
+        if time.time() - self._last_full_audit >= interval:
+            return True
+        if self.tracked_migrations:
+            # Migrating instances may be on the hypervisor of either host
+            return True
+
+        num_vm_instances = self.driver.get_num_instances()
+        num_tracked = len(self.tracked_instances)
+        if num_vm_instances != num_tracked:
+            LOG.audit(_("Hypervisor has %(num_vm_instances)d instances but "
+                        "%(num_tracked)d are tracked, running a full audit"),
+                      {'num_vm_instances': num_vm_instances,
+                       'num_tracked': num_tracked})
+            return True
+        return False
+
     def _sync_compute_node(self, context, resources):
         """Create or update the compute node DB record."""
         if not self.compute_node:
@@ -360,8 +408,10 @@ class ResourceTracker(object):
     def _create(self, context, values):
         """Create the compute node in the DB."""
         # initialize load stats from existing instances:
+        pushed = self._snapshot(values)
         self.compute_node = self.conductor_api.compute_node_create(context,
                                                                    values)
+        self._last_pushed = pushed
 
     def _get_service(self, context):
         try:
@@ -421,14 +471,41 @@ class ResourceTracker(object):
             LOG.audit(_("Free PCI devices: %s") % resources['pci_devices'])
 
     def _update(self, context, values, prune_stats=False):
-        """Persist the compute node updates to the DB."""
+        """Persist the compute node updates to the DB.
+
+        Only the values that changed since the last update are sent, but
+        the update is always made as it also refreshes updated_at, which
+        the scheduler relies on to invalidate its view of the node.
+        """
         if "service" in self.compute_node:
             del self.compute_node['service']
+        changes = dict((key, value) for key, value in values.iteritems()
+                       if key not in _UNTRACKED_FIELDS and
+                       (key not in self._last_pushed or
+                        self._last_pushed[key] != value))
+        if prune_stats and 'stats' in values:
+            # Stats missing from the update would all be pruned
+            changes['stats'] = values['stats']
+        # NOTE: the DB layer may modify the values it is handed
+        pushed = self._snapshot(changes)
         self.compute_node = self.conductor_api.compute_node_update(
-            context, self.compute_node, values, prune_stats)
+            context, self.compute_node, changes, prune_stats)
+        self._last_pushed.update(pushed)
         if self.pci_tracker:
             self.pci_tracker.save(context)
 
+    @staticmethod
+    def _snapshot(values):
+        """Copy values so later in-place changes to them show up as diffs."""
+        snapshot = {}
+        for key, value in values.iteritems():
+            if isinstance(value, dict):
+                value = dict(value)
+            elif isinstance(value, list):
+                value = list(value)
+            snapshot[key] = value
+        return snapshot
+
     def _update_usage(self, resources, usage, sign=1):
         mem_usage = usage['memory_mb']
 
@@ -202,6 +202,7 @@ class ComputeAPI(rpcclient.RpcProxy):
         2.45 - Made resize_instance() take new-world objects
         2.46 - Made finish_resize() take new-world objects
         2.47 - Made finish_revert_resize() take new-world objects
+        2.48 - Add precache_image()
     '''
 
     #
@@ -683,6 +684,10 @@ class ComputeAPI(rpcclient.RpcProxy):
         cctxt = self.client.prepare(server=host)
         return cctxt.call(ctxt, 'get_host_uptime')
 
+    def precache_image(self, ctxt, image_id, host):
+        cctxt = self.client.prepare(server=host, version='2.48')
+        return cctxt.call(ctxt, 'precache_image', image_id=image_id)
+
     def reserve_block_device_name(self, ctxt, instance, device, volume_id):
         instance_p = jsonutils.to_primitive(instance)
         cctxt = self.client.prepare(server=_compute_host(None, instance),
@@ -16,6 +16,7 @@
 
 """Compute-related Utilities and helpers."""
 
+import datetime
 import itertools
 import re
 import string
@@ -25,6 +26,7 @@ from oslo.config import cfg
 
 from nova import block_device
 from nova.compute import flavors
+from nova import db
 from nova import exception
 from nova.network import model as network_model
 from nova import notifications
@@ -432,3 +434,31 @@ class EventReporter(object):
                                              self.event_name, exc_val, exc_tb)
             self.conductor.action_event_finish(self.context, event)
         return False
+
+
+def rollup_project_usage(context, max_days):
+    """Sum up the usage of every project over the days gone by.
+
+    At most max_days days are examined, so that a long history is rolled
+    up over several runs. Days on which no instance was active are
+    skipped without being examined.
+
+    :returns: the number of days examined
+    """
+    today = timeutils.utcnow().replace(hour=0, minute=0, second=0,
+                                       microsecond=0)
+    day = db.project_usage_rollup_get_next_day(context)
+    examined = 0
+    while day is not None and day < today and examined < max_days:
+        next_day = day + datetime.timedelta(days=1)
+        usages = db.instance_usage_get_by_window(context, day, next_day)
+        examined += 1
+        if usages:
+            db.project_usage_rollup_create(context, day, usages)
+            day = next_day
+        else:
+            # NOTE: nothing is stored for a day without usage, so look
+            # for the next day with some from the day after it.
+            day = db.project_usage_rollup_get_next_day(context,
+                                                       after=next_day)
+    return examined
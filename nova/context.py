@@ -95,6 +95,9 @@ class RequestContext(object):
         self.quota_class = quota_class
         self.user_name = user_name
         self.project_name = project_name
+        # NOTE: policy decisions made during this request, remembered by
+        # nova.policy.enforce()
+        self.policy_decisions = {}
         self.is_admin = is_admin
         if self.is_admin is None:
             self.is_admin = policy.check_is_admin(self)
@@ -344,6 +344,14 @@ def floating_ip_get_by_address(context, address):
     return IMPL.floating_ip_get_by_address(context, address)
 
 
+def floating_ip_get_by_address_pattern(context, pattern):
+    """Get the associated floating ips whose address matches a LIKE pattern.
+
+    The fixed ip each one is associated with is loaded too.
+    """
+    return IMPL.floating_ip_get_by_address_pattern(context, pattern)
+
+
 def floating_ip_get_by_fixed_address(context, fixed_address):
     """Get a floating ips by fixed address."""
     return IMPL.floating_ip_get_by_fixed_address(context, fixed_address)
@@ -523,6 +531,11 @@ def fixed_ip_get_by_network_host(context, network_uuid, host):
     return IMPL.fixed_ip_get_by_network_host(context, network_uuid, host)
 
 
+def fixed_ip_get_by_address_pattern(context, pattern):
+    """Get the allocated fixed ips whose address matches a LIKE pattern."""
+    return IMPL.fixed_ip_get_by_address_pattern(context, pattern)
+
+
 def fixed_ips_by_virtual_interface(context, vif_id):
     """Get fixed ips by virtual interface or raise if none exist."""
     return IMPL.fixed_ips_by_virtual_interface(context, vif_id)
@@ -1166,6 +1179,12 @@ def block_device_mapping_get_all_by_instance(context, instance_uuid):
                                                          instance_uuid)
 
 
+def block_device_mapping_get_all_by_instance_uuids(context, instance_uuids):
+    """Get the block device mappings of many instances, keyed by uuid."""
+    return IMPL.block_device_mapping_get_all_by_instance_uuids(
+        context, instance_uuids)
+
+
 def block_device_mapping_get_by_volume_id(context, volume_id,
         columns_to_join=None):
     """Get block device mapping for a given volume."""
@@ -1671,6 +1690,48 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
 ###################
 
 
+def instance_usage_get_by_window(context, begin, end):
+    """Sum up the usage of the instances active during a window.
+
+    Returns the hours, vcpus_hours, memory_mb_hours and local_gb_hours
+    used by each project over the window, keyed by project id.
+    """
+    return IMPL.instance_usage_get_by_window(context, begin, end)
+
+
+def project_usage_get_by_window(context, begin, end):
+    """Get the usage of every project during a window.
+
+    Returns the same as instance_usage_get_by_window(), but reads the
+    usage of the days which have been rolled up from their rollups.
+    """
+    return IMPL.project_usage_get_by_window(context, begin, end)
+
+
+def project_usage_rollup_get_next_day(context, after=None):
+    """Return the first day with usage which hasn't been rolled up yet.
+
+    Days on which no instance was active are skipped.
+
+    :param after: Look from this day on rather than from the day after the
+                  last day rolled up.
+    Returns None if there is nothing to roll up at all.
+    """
+    return IMPL.project_usage_rollup_get_next_day(context, after=after)
+
+
+def project_usage_rollup_create(context, day, usages):
+    """Store the usage of every project over a day.
+
+    :param usages: the usages of the projects over the day, as returned
+                   by instance_usage_get_by_window()
+    """
+    return IMPL.project_usage_rollup_create(context, day, usages)
+
+
+###################
+
+
 def s3_image_get(context, image_id):
     """Find local s3 image represented by the provided id."""
     return IMPL.s3_image_get(context, image_id)
@@ -1847,6 +1908,14 @@ def get_ec2_instance_id_by_uuid(context, instance_id):
     return IMPL.get_ec2_instance_id_by_uuid(context, instance_id)
 
 
+def get_ec2_instance_ids_by_uuids(context, instance_uuids):
+    """Get the ec2 ids of many instances, keyed by uuid.
+
+    Instances without an ec2 id mapping are left out.
+    """
+    return IMPL.get_ec2_instance_ids_by_uuids(context, instance_uuids)
+
+
 def get_instance_uuid_by_ec2_id(context, ec2_id):
     """Get uuid through ec2 id from instance_id_mappings table."""
     return IMPL.get_instance_uuid_by_ec2_id(context, ec2_id)
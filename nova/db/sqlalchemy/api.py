@@ -43,7 +43,10 @@ from sqlalchemy.orm import joinedload_all
 from sqlalchemy.orm import noload
 from sqlalchemy.schema import Table
 from sqlalchemy.sql.expression import asc
+from sqlalchemy.sql.expression import case
 from sqlalchemy.sql.expression import desc
+from sqlalchemy.sql.expression import extract
+from sqlalchemy.sql.expression import literal_column
 from sqlalchemy.sql.expression import select
 from sqlalchemy.sql import func
 from sqlalchemy import String
@@ -971,6 +974,34 @@ def floating_ip_get_by_address(context, address):
     return _floating_ip_get_by_address(context, address)
 
 
+def _address_pattern_filter(query, column, pattern):
+    """Filter a query on an address column with a LIKE pattern.
+
+    A pattern without wildcards is compared for equality instead.
+    """
+    if '%' not in pattern and '_' not in pattern:
+        return query.filter(column == pattern)
+
+    # NOTE: addresses are stored as inet on PostgreSQL, which has no LIKE
+    db_string = CONF.database.connection.split(':')[0].split('+')[0]
+    if db_string == 'postgresql':
+        column = func.host(column)
+    return query.filter(column.like(pattern))
+
+
+@require_context
+def floating_ip_get_by_address_pattern(context, pattern):
+    query = model_query(context, models.FloatingIp, read_deleted="no").\
+                filter(models.FloatingIp.fixed_ip_id != None).\
+                options(joinedload('fixed_ip'))
+    try:
+        return _address_pattern_filter(query, models.FloatingIp.address,
+                                       pattern).all()
+    except DataError:
+        # Not a valid address, so nothing can match it
+        return []
+
+
 def _floating_ip_get_by_address(context, address, session=None):
 
     # if address string is empty explicitly set it to None
@@ -1377,6 +1408,19 @@ def fixed_ip_get_by_network_host(context, network_id, host):
     return result
 
 
+@require_context
+def fixed_ip_get_by_address_pattern(context, pattern):
+    query = model_query(context, models.FixedIp, read_deleted="no").\
+                filter(models.FixedIp.instance_uuid != None).\
+                filter(models.FixedIp.virtual_interface_id != None)
+    try:
+        return _address_pattern_filter(query, models.FixedIp.address,
+                                       pattern).all()
+    except DataError:
+        # Not a valid address, so nothing can match it
+        return []
+
+
 @require_context
 def fixed_ips_by_virtual_interface(context, vif_id):
     result = model_query(context, models.FixedIp, read_deleted="no").\
@@ -3503,6 +3547,23 @@ def block_device_mapping_get_all_by_instance(context, instance_uuid):
                  all()
 
 
+@require_context
+def block_device_mapping_get_all_by_instance_uuids(context, instance_uuids):
+    output = dict((instance_uuid, []) for instance_uuid in instance_uuids)
+    if not instance_uuids:
+        return output
+
+    rows = _block_device_mapping_get_query(context).\
+                 filter(models.BlockDeviceMapping.instance_uuid.in_(
+                     instance_uuids)).\
+                 all()
+
+    for row in rows:
+        output[row['instance_uuid']].append(row)
+
+    return output
+
+
 @require_context
 def block_device_mapping_get_by_volume_id(context, volume_id,
         columns_to_join=None):
@@ -4845,6 +4906,160 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
 ####################
 
 
+_USAGE_KEYS = ('hours', 'vcpus_hours', 'memory_mb_hours', 'local_gb_hours')
+
+
+def _day_start(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _seconds_between(start, stop):
+    """Return an expression for the whole seconds from start to stop."""
+    db_string = CONF.database.connection.split(':')[0].split('+')[0]
+    if db_string == 'mysql':
+        return func.timestampdiff(literal_column('SECOND'), start, stop)
+    elif db_string == 'postgresql':
+        return extract('epoch', stop - start)
+    else:
+        return func.strftime('%s', stop) - func.strftime('%s', start)
+
+
+def _usage_add(usages, project_id, values):
+    usage = usages.setdefault(project_id, dict.fromkeys(_USAGE_KEYS, 0.0))
+    for key, value in zip(_USAGE_KEYS, values):
+        # NOTE: MySQL returns the sums as Decimals
+        usage[key] += float(value or 0)
+
+
+def _instance_usage_add_by_window(context, session, begin, end, usages):
+    """Sum up the usage of the instances active during a window in the
+    database, adding it to the usages of their projects.
+    """
+    instance = models.Instance
+    start = case([(instance.launched_at > begin, instance.launched_at)],
+                 else_=begin)
+    stop = case([(and_(instance.terminated_at != None,
+                       instance.terminated_at < end),
+                  instance.terminated_at)],
+                else_=end)
+    hours = _seconds_between(start, stop) / 3600.0
+    local_gb = instance.root_gb + instance.ephemeral_gb
+
+    query = model_query(context, instance.project_id,
+                        func.sum(hours),
+                        func.sum(hours * instance.vcpus),
+                        func.sum(hours * instance.memory_mb),
+                        func.sum(hours * local_gb),
+                        base_model=instance, read_deleted='yes',
+                        session=session).\
+                filter(or_(instance.terminated_at == None,
+                           instance.terminated_at > begin)).\
+                filter(instance.launched_at < end).\
+                group_by(instance.project_id)
+
+    for row in query.all():
+        _usage_add(usages, row[0], row[1:])
+
+
+@require_context
+def instance_usage_get_by_window(context, begin, end):
+    usages = {}
+    _instance_usage_add_by_window(context, get_session(), begin, end,
+                                  usages)
+    return usages
+
+
+@require_context
+def project_usage_get_by_window(context, begin, end):
+    session = get_session()
+    rollup = models.ProjectUsageRollup
+    first_day, last_day = model_query(context, func.min(rollup.day),
+                                      func.max(rollup.day),
+                                      base_model=rollup,
+                                      session=session).first()
+
+    usages = {}
+    if first_day is None:
+        _instance_usage_add_by_window(context, session, begin, end, usages)
+        return usages
+
+    # Only whole days can be read from the rollups
+    rollup_begin = _day_start(begin)
+    if rollup_begin < begin:
+        rollup_begin += datetime.timedelta(days=1)
+    rollup_begin = max(rollup_begin, first_day)
+    rollup_end = min(_day_start(end), last_day + datetime.timedelta(days=1))
+    if rollup_begin >= rollup_end:
+        _instance_usage_add_by_window(context, session, begin, end, usages)
+        return usages
+
+    query = model_query(context, rollup.project_id,
+                        func.sum(rollup.hours),
+                        func.sum(rollup.vcpus_hours),
+                        func.sum(rollup.memory_mb_hours),
+                        func.sum(rollup.local_gb_hours),
+                        base_model=rollup, session=session).\
+                filter(rollup.day >= rollup_begin).\
+                filter(rollup.day < rollup_end).\
+                group_by(rollup.project_id)
+    for row in query.all():
+        _usage_add(usages, row[0], row[1:])
+
+    if begin < rollup_begin:
+        _instance_usage_add_by_window(context, session, begin, rollup_begin,
+                                      usages)
+    if rollup_end < end:
+        _instance_usage_add_by_window(context, session, rollup_end, end,
+                                      usages)
+    return usages
+
+
+@require_admin_context
+def project_usage_rollup_get_next_day(context, after=None):
+    session = get_session()
+    if after is None:
+        rollup = models.ProjectUsageRollup
+        last_day = model_query(context, func.max(rollup.day),
+                               base_model=rollup, session=session).scalar()
+        if last_day is not None:
+            after = last_day + datetime.timedelta(days=1)
+
+    instance = models.Instance
+    query = model_query(context, func.min(instance.launched_at),
+                        base_model=instance, read_deleted='yes',
+                        session=session)
+    if after is not None:
+        query = query.filter(or_(instance.terminated_at == None,
+                                 instance.terminated_at > after))
+    first_launched_at = query.scalar()
+    if first_launched_at is None:
+        return None
+    day = _day_start(first_launched_at)
+    if after is not None and day < after:
+        return after
+    return day
+
+
+@require_admin_context
+def project_usage_rollup_create(context, day, usages):
+    session = get_session()
+    try:
+        with session.begin():
+            for project_id, usage in usages.iteritems():
+                usage_rollup = models.ProjectUsageRollup()
+                usage_rollup.update(usage)
+                usage_rollup.project_id = project_id
+                usage_rollup.day = day
+                usage_rollup.save(session=session)
+    except db_exc.DBDuplicateEntry:
+        # NOTE: Another scheduler got to roll the day up first, which it
+        # did with the same data.
+        pass
+
+
+####################
+
+
 def s3_image_get(context, image_id):
     """Find local s3 image represented by the provided id."""
     result = model_query(context, models.S3Image, read_deleted="yes").\
@@ -5368,6 +5583,19 @@ def get_ec2_instance_id_by_uuid(context, instance_id):
     return result['id']
 
 
+@require_context
+def get_ec2_instance_ids_by_uuids(context, instance_uuids):
+    if not instance_uuids:
+        return {}
+
+    rows = _ec2_instance_get_query(context).\
+                    filter(models.InstanceIdMapping.uuid.in_(
+                        instance_uuids)).\
+                    all()
+
+    return dict((row['uuid'], row['id']) for row in rows)
+
+
 @require_context
 def get_instance_uuid_by_ec2_id(context, ec2_id):
     result = _ec2_instance_get_query(context).\
@@ -0,0 +1,80 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Float
+from sqlalchemy import Index
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
+from sqlalchemy import String
+from sqlalchemy import Table
+from sqlalchemy import UniqueConstraint
+
+from nova.db.sqlalchemy import api
+from nova.db.sqlalchemy import utils
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    rollups_uc_name = 'uniq_project_usage_rollups0project_id0day0deleted'
+    rollups = Table('project_usage_rollups', meta,
+                    Column('created_at', DateTime(timezone=False)),
+                    Column('updated_at', DateTime(timezone=False)),
+                    Column('deleted_at', DateTime(timezone=False)),
+                    Column('deleted', Integer, default=0),
+                    Column('id', Integer, primary_key=True, nullable=False),
+                    Column('project_id', String(255), nullable=False),
+                    Column('day', DateTime(timezone=False), nullable=False),
+                    Column('hours', Float),
+                    Column('vcpus_hours', Float),
+                    Column('memory_mb_hours', Float),
+                    Column('local_gb_hours', Float),
+                    Index('project_usage_rollups_day_idx', 'day'),
+                    UniqueConstraint('project_id', 'day', 'deleted',
+                                     name=rollups_uc_name),
+                    mysql_engine='InnoDB',
+                    mysql_charset='utf8')
+
+    try:
+        rollups.create()
+        utils.create_shadow_table(migrate_engine, table=rollups)
+    except Exception:
+        LOG.exception(_("Exception while creating table "
+                        "'project_usage_rollups'."))
+        raise
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    try:
+        rollups = Table('project_usage_rollups', meta, autoload=True)
+        rollups.drop()
+        shadow_rollups = Table(api._SHADOW_TABLE_PREFIX +
+                               'project_usage_rollups', meta, autoload=True)
+        shadow_rollups.drop()
+    except Exception:
+        LOG.exception(_("Exception while dropping 'project_usage_rollups' "
+                        "tables."))
+        raise
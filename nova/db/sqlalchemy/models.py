@@ -1168,6 +1168,26 @@ class VolumeUsage(BASE, NovaBase):
     curr_write_bytes = Column(BigInteger, default=0)
 
 
+class ProjectUsageRollup(BASE, NovaBase):
+    """Usage of a project's instances over one day, summed up once the day
+    is over so that usage reports don't have to go through the instances.
+    """
+    __tablename__ = 'project_usage_rollups'
+    __table_args__ = (
+        Index('project_usage_rollups_day_idx', 'day'),
+        schema.UniqueConstraint(
+            "project_id", "day", "deleted",
+            name="uniq_project_usage_rollups0project_id0day0deleted"),
+    )
+    id = Column(Integer, primary_key=True, nullable=False)
+    project_id = Column(String(255), nullable=False)
+    day = Column(DateTime, nullable=False)
+    hours = Column(Float, default=0)
+    vcpus_hours = Column(Float, default=0)
+    memory_mb_hours = Column(Float, default=0)
+    local_gb_hours = Column(Float, default=0)
+
+
 class S3Image(BASE, NovaBase):
     """Compatibility layer for the S3 image service talking to Glance."""
     __tablename__ = 's3_images'
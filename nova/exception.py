@@ -189,6 +189,11 @@ class ImageNotAuthorized(NovaException):
     msg_fmt = _("Not authorized for image %(image_id)s.")
 
 
+class ImageDownloadTimeout(NovaException):
+    msg_fmt = _("Timed out after %(timeout)s seconds waiting for the "
+                "download of %(target)s.")
+
+
 class Invalid(NovaException):
     msg_fmt = _("Unacceptable parameters.")
     code = 400
@@ -1021,6 +1026,11 @@ class MalformedRequestBody(NovaException):
     msg_fmt = _("Malformed message body: %(reason)s")
 
 
+class UnsupportedRpcCompression(NovaException):
+    msg_fmt = _("Unsupported rpc compression codec %(codec)s, this service "
+                "supports: %(supported)s")
+
+
 # NOTE(johannes): NotFound should only be used when a 404 error is
 # appropriate to be returned
 class ConfigNotFound(NovaException):
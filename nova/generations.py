@@ -0,0 +1,71 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Generation markers for data that is cached.
+
+Code caching something derived from data that rarely changes, like the
+list of flavors, stores the current generation of that data with it. Code
+changing the data calls bump(), after which the stored generation no
+longer matches and the cached copy is known to be stale.
+
+Generations live in memcached when memcached_servers is set, so a bump
+is seen by every process sharing those servers.
+"""
+
+import uuid
+
+from nova.openstack.common import memorycache
+
+FLAVORS = 'flavors'
+AGGREGATES = 'aggregates'
+SERVICES = 'services'
+
+MC = None
+
+
+def _get_cache():
+    global MC
+
+    if MC is None:
+        MC = memorycache.get_client()
+
+    return MC
+
+
+def reset_cache():
+    """Reset the cache, mainly for testing purposes."""
+
+    global MC
+
+    MC = None
+
+
+def _make_cache_key(name):
+    return str('generation-%s' % name)
+
+
+def get(name):
+    """Return the current generation of the named data."""
+    cache = _get_cache()
+    key = _make_cache_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex)
+        generation = cache.get(key)
+    return generation
+
+
+def bump(name):
+    """Record that the named data changed."""
+    _get_cache().set(_make_cache_key(name), uuid.uuid4().hex)
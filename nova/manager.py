@@ -53,6 +53,13 @@ This module provides Manager, a base class for managers.
 
 """
 
+import datetime
+import pprint
+import random
+import sys
+import time
+
+from eventlet import greenpool
 from oslo.config import cfg
 
 from nova import baserpc
@@ -62,15 +69,60 @@ from nova.objects import base as objects_base
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.openstack.common import periodic_task
-from nova.openstack.common.rpc import dispatcher as rpc_dispatcher
+from nova.openstack.common import timeutils
+from nova import rpcstats
 from nova.scheduler import rpcapi as scheduler_rpcapi
 
 
+manager_opts = [
+    cfg.IntOpt('rpc_dispatch_stats_interval',
+               default=600,
+               help='Interval in seconds for sending rpc dispatch stats '
+                    'notifications when rpc_dispatch_stats is enabled'),
+    cfg.IntOpt('periodic_task_max_concurrency',
+               default=1,
+               help='Maximum number of periodic tasks run at the same time, '
+                    'each in its own greenthread. 1 runs them serially'),
+    cfg.IntOpt('periodic_task_initial_jitter',
+               default=0,
+               help='Upper bound in seconds of a random delay added to the '
+                    'first run of each periodic task, so that services '
+                    'restarted together do not run their tasks in lockstep'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(manager_opts)
 CONF.import_opt('host', 'nova.netconf')
+CONF.import_opt('rpc_dispatch_stats', 'nova.rpcstats')
 LOG = logging.getLogger(__name__)
 
 
+def print_rpc_dispatch_stats():
+    """Print the rpc dispatch stats of this process, one method at a time.
+
+    This is meant for the eventlet backdoor, where it is reached with
+    ``from nova import manager; manager.print_rpc_dispatch_stats()``.
+    """
+    for entry in rpcstats.get_stats():
+        pprint.pprint(entry)
+
+
+def print_image_downloads():
+    """Print the image downloads this process has in flight or queued.
+
+    This is meant for the eventlet backdoor of compute services using the
+    libvirt driver, which coordinates its image downloads. It prints
+    nothing in other services.
+    """
+    # NOTE: looked up rather than imported, so that services which do not
+    # use the libvirt driver don't load it.
+    imagedownload = sys.modules.get('nova.virt.libvirt.imagedownload')
+    if imagedownload is None:
+        return
+    for download in imagedownload.get_coordinator().get_downloads():
+        pprint.pprint(download)
+
+
 class Manager(base.Base, periodic_task.PeriodicTasks):
     # Set RPC API version to 1.0 by default.
     RPC_API_VERSION = '1.0'
@@ -96,12 +148,143 @@ class Manager(base.Base, periodic_task.PeriodicTasks):
         base_rpc = baserpc.BaseRPCAPI(self.service_name, backdoor_port)
         apis.extend([self, base_rpc])
         serializer = objects_base.NovaObjectSerializer()
-        return rpc_dispatcher.RpcDispatcher(apis, serializer)
+        return rpcstats.RpcDispatcher(apis, serializer,
+                                      topic=self.service_name)
 
     def periodic_tasks(self, context, raise_on_error=False):
         """Tasks to be run at a periodic interval."""
         return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
 
+    def _init_periodic_tasks(self):
+        """Set up the per-instance executor state on the first pass."""
+        self._periodic_running = set()
+        self._periodic_stats = {}
+        self._periodic_pool = None
+        if CONF.periodic_task_max_concurrency > 1:
+            self._periodic_pool = greenpool.GreenPool(
+                CONF.periodic_task_max_concurrency)
+        # NOTE: the last run times are class attributes, shared by every
+        # instance, so jittered times are kept on the instance.
+        self._periodic_last_run = dict(self._periodic_last_run)
+
+        now = timeutils.utcnow()
+        for task_name, task in self._periodic_tasks:
+            self._periodic_stats[task_name] = {'runs': 0,
+                                               'overruns': 0,
+                                               'skipped': 0,
+                                               'last_duration': None,
+                                               'max_duration': 0.0}
+
+            spacing = self._periodic_spacing[task_name]
+            if spacing is None or CONF.periodic_task_initial_jitter <= 0:
+                continue
+            jitter = random.uniform(
+                0, min(spacing, CONF.periodic_task_initial_jitter))
+            last_run = self._periodic_last_run[task_name]
+            if last_run is None:
+                last_run = now - datetime.timedelta(seconds=spacing)
+            self._periodic_last_run[task_name] = (
+                last_run + datetime.timedelta(seconds=jitter))
+
+    def run_periodic_tasks(self, context, raise_on_error=False):
+        """Run the periodic tasks which are due.
+
+        This follows PeriodicTasks.run_periodic_tasks(), but runs up to
+        periodic_task_max_concurrency tasks at once in greenthreads, skips
+        tasks whose previous run is still in progress and records how long
+        each run took.
+        """
+        if not hasattr(self, '_periodic_stats'):
+            self._init_periodic_tasks()
+
+        idle_for = periodic_task.DEFAULT_INTERVAL
+        for task_name, task in self._periodic_tasks:
+            full_task_name = '.'.join([self.__class__.__name__, task_name])
+
+            now = timeutils.utcnow()
+            spacing = self._periodic_spacing[task_name]
+            last_run = self._periodic_last_run[task_name]
+
+            # If a periodic task is _nearly_ due, then we'll run it early
+            if spacing is not None and last_run is not None:
+                due = last_run + datetime.timedelta(seconds=spacing)
+                if not timeutils.is_soon(due, 0.2):
+                    idle_for = min(idle_for, timeutils.delta_seconds(now, due))
+                    continue
+
+            if spacing is not None:
+                idle_for = min(idle_for, spacing)
+
+            if task_name in self._periodic_running:
+                # Rather than queueing another run behind the one still in
+                # progress, wait for the next time the task is due.
+                self._periodic_stats[task_name]['skipped'] += 1
+                LOG.warn(_("Skipping periodic task %(full_task_name)s "
+                           "because its previous run is still in progress"),
+                         {'full_task_name': full_task_name})
+                continue
+
+            LOG.debug(_("Running periodic task %(full_task_name)s"),
+                      {'full_task_name': full_task_name})
+            self._periodic_last_run[task_name] = timeutils.utcnow()
+            self._periodic_running.add(task_name)
+
+            if self._periodic_pool is None or raise_on_error:
+                self._run_periodic_task(context, task_name, task,
+                                        raise_on_error)
+                time.sleep(0)
+            else:
+                self._periodic_pool.spawn_n(self._run_periodic_task,
+                                            context, task_name, task, False)
+
+        return idle_for
+
+    def _run_periodic_task(self, context, task_name, task, raise_on_error):
+        full_task_name = '.'.join([self.__class__.__name__, task_name])
+        start = time.time()
+        try:
+            task(self, context)
+        except Exception as e:
+            if raise_on_error:
+                raise
+            LOG.exception(_("Error during %(full_task_name)s: %(e)s"),
+                          {'full_task_name': full_task_name, 'e': e})
+        finally:
+            self._periodic_running.discard(task_name)
+            self._record_periodic_task_run(task_name, time.time() - start)
+
+    def _record_periodic_task_run(self, task_name, duration):
+        stats = self._periodic_stats[task_name]
+        stats['runs'] += 1
+        stats['last_duration'] = duration
+        stats['max_duration'] = max(stats['max_duration'], duration)
+
+        spacing = self._periodic_spacing[task_name]
+        if spacing is not None and duration > spacing:
+            stats['overruns'] += 1
+            LOG.warn(_("Periodic task %(task)s took %(duration).2f seconds, "
+                       "longer than its %(spacing)s second interval"),
+                     {'task': '.'.join([self.__class__.__name__, task_name]),
+                      'duration': duration, 'spacing': spacing})
+
+    def get_periodic_task_stats(self):
+        """Return the run count, durations and overruns of each task."""
+        if not hasattr(self, '_periodic_stats'):
+            return {}
+        return dict((task_name, dict(stats))
+                    for task_name, stats in self._periodic_stats.items())
+
+    @periodic_task.periodic_task(spacing=CONF.rpc_dispatch_stats_interval)
+    def _emit_rpc_dispatch_stats(self, context):
+        """Send the per-method rpc dispatch stats as a notification."""
+        if not CONF.rpc_dispatch_stats:
+            return
+        payload = {'host': self.host,
+                   'service': self.service_name,
+                   'buckets': list(rpcstats.DispatchStats.BUCKETS),
+                   'methods': rpcstats.get_stats()}
+        self.notifier.info(context, 'rpc.dispatch.stats', payload)
+
     def init_host(self):
         """Hook to do additional manager initialization when one requests
         the service be started.  This is called before any service record
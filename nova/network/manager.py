@@ -47,6 +47,7 @@ import datetime
 import itertools
 import math
 import re
+import string
 import uuid
 
 import eventlet
@@ -170,6 +171,40 @@ CONF.import_opt('my_ip', 'nova.netconf')
 CONF.import_opt('network_topic', 'nova.network.rpcapi')
 
 
+def _ip_filter_address_pattern(ip_filter):
+    """Turn an ip filter regex into a SQL LIKE pattern.
+
+    Every address the regex matches also matches the pattern, so the
+    database can use its address index to find the candidates before the
+    regex is applied to them.
+    """
+    if '|' in ip_filter:
+        return '%'
+    if ip_filter.startswith('^'):
+        ip_filter = ip_filter[1:]
+
+    pattern = []
+    i = 0
+    while i < len(ip_filter):
+        char = ip_filter[i]
+        if char == '\\' and ip_filter[i + 1:i + 2] == '.':
+            pattern.append('.')
+            i += 1
+        elif char == '.':
+            pattern.append('_')
+        elif char in string.hexdigits or char == ':':
+            pattern.append(char)
+        elif char == '$' and i == len(ip_filter) - 1:
+            return ''.join(pattern)
+        else:
+            # A quantifier makes the character before it optional
+            if char in '*?{' and pattern:
+                pattern.pop()
+            break
+        i += 1
+    return ''.join(pattern) + '%'
+
+
 class RPCAllocateFixedIP(object):
     """Mixin class originally for FlatDCHP and VLAN network managers.
 
@@ -406,6 +441,13 @@ class NetworkManager(manager.Manager):
         ip_filter = re.compile(str(filters.get('ip')))
         ipv6_filter = re.compile(str(filters.get('ip6')))
 
+        # NOTE: IPv6 addresses are worked out from the MAC address of each
+        # interface rather than stored, so only filters on stored addresses
+        # can be looked up through the address indexes.
+        if 'ip6' not in filters and ('ip' in filters) != bool(fixed_ip_filter):
+            return self._get_instance_uuids_by_address(
+                context, filters.get('ip'), ip_filter, fixed_ip_filter)
+
         # NOTE(jkoelker) Should probably figure out a better way to do
         #                this. But for now it "works", this could suck on
         #                large installs.
@@ -452,6 +494,39 @@ class NetworkManager(manager.Manager):
 
         return results
 
+    def _get_instance_uuids_by_address(self, context, ip_regex, ip_filter,
+                                       fixed_ip_filter):
+        if ip_regex is not None:
+            pattern = _ip_filter_address_pattern(str(ip_regex))
+        else:
+            pattern = fixed_ip_filter
+
+        results = []
+        matched = set()
+        for fixed_ip in self.db.fixed_ip_get_by_address_pattern(context,
+                                                                pattern):
+            if (fixed_ip['address'] == fixed_ip_filter or
+                    ip_filter.match(fixed_ip['address'])):
+                results.append({'instance_uuid': fixed_ip['instance_uuid'],
+                                'ip': fixed_ip['address']})
+                matched.add(fixed_ip['id'])
+
+        if ip_regex is None:
+            return results
+
+        for floating_ip in self.db.floating_ip_get_by_address_pattern(
+                context, pattern):
+            fixed_ip = floating_ip['fixed_ip']
+            # Instances matched by their fixed ip are only listed once
+            if (not fixed_ip or not fixed_ip['instance_uuid'] or
+                    fixed_ip['id'] in matched):
+                continue
+            if ip_filter.match(floating_ip['address']):
+                results.append({'instance_uuid': fixed_ip['instance_uuid'],
+                                'ip': floating_ip['address']})
+
+        return results
+
     def _get_networks_for_instance(self, context, instance_id, project_id,
                                    requested_networks=None):
         """Determine & return which networks an instance should connect to."""
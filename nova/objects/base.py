@@ -25,6 +25,7 @@ from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.openstack.common.rpc import common as rpc_common
 import nova.openstack.common.rpc.serializer
+from nova import rpccompression
 
 
 LOG = logging.getLogger('object')
@@ -52,6 +53,10 @@ def make_class_properties(cls):
         for field, typefn in supercls.fields.items():
             if field not in cls.fields:
                 cls.fields[field] = typefn
+    # NOTE: Each field gets a bit in the per-object changed-fields mask.
+    # Sorting keeps the assignment stable between processes.
+    cls._obj_field_bits = dict((name, 1 << index) for index, name
+                               in enumerate(sorted(cls.fields)))
     for name, typefn in cls.fields.iteritems():
 
         def getter(self, name=name):
@@ -60,8 +65,9 @@ def make_class_properties(cls):
                 self.obj_load_attr(name)
             return getattr(self, attrname)
 
-        def setter(self, value, name=name, typefn=typefn):
-            self._changed_fields.add(name)
+        def setter(self, value, name=name, typefn=typefn,
+                   bit=cls._obj_field_bits[name]):
+            self._obj_changed_mask |= bit
             try:
                 return setattr(self, get_attrname(name), typefn(value))
             except Exception:
@@ -73,6 +79,26 @@ def make_class_properties(cls):
         setattr(cls, name, property(getter, setter))
 
 
+def make_class_slots(bases, dict_):
+    """Return the __slots__ for a class using compact field storage.
+
+    This covers the storage attribute of every field (including the
+    ones inherited from mixins), the per-object bookkeeping attributes
+    and any extra __slots__ the class declares itself. Names already
+    provided by a slotted base class are not repeated.
+    """
+    inherited = set()
+    field_names = set(dict_.get('fields', {}))
+    for base in bases:
+        for supercls in base.__mro__:
+            inherited.update(supercls.__dict__.get('__slots__', ()))
+            field_names.update(supercls.__dict__.get('fields', {}))
+    slots = list(dict_.get('__slots__', ()))
+    slots.extend(['_context', '_obj_changed_mask'])
+    slots.extend(sorted(get_attrname(name) for name in field_names))
+    return tuple(name for name in slots if name not in inherited)
+
+
 class NovaObjectMetaclass(type):
     """Metaclass that allows tracking of object classes."""
 
@@ -80,6 +106,20 @@ class NovaObjectMetaclass(type):
     # remoted. If this is not None, use it to remote things over RPC.
     indirection_api = None
 
+    def __new__(mcs, name, bases, dict_):
+        # NOTE: Classes that opt into compact storage keep their field
+        # values in generated __slots__ instead of the instance __dict__,
+        # which is never allocated unless something outside of the
+        # fields is stashed on the object.
+        compact = dict_.get('obj_compact_storage',
+                            any(getattr(base, 'obj_compact_storage', False)
+                                for base in bases))
+        if compact:
+            dict_ = dict(dict_)
+            dict_['__slots__'] = make_class_slots(bases, dict_)
+        return super(NovaObjectMetaclass, mcs).__new__(mcs, name, bases,
+                                                       dict_)
+
     def __init__(cls, names, bases, dict_):
         if not hasattr(cls, '_obj_classes'):
             # This will be set in the 'NovaObject' class.
@@ -140,7 +180,8 @@ def remotable(fn):
             for key, value in updates.iteritems():
                 if key in self.fields:
                     self[key] = self._attr_from_primitive(key, value)
-            self._changed_fields = set(updates.get('obj_what_changed', []))
+            self._obj_changed_mask = self._obj_fields_mask(
+                updates.get('obj_what_changed', []))
             return result
         else:
             return fn(self, ctxt, *args, **kwargs)
@@ -194,8 +235,17 @@ class NovaObject(object):
     fields = {}
     obj_extra_fields = []
 
+    # Set this to True to store fields in generated __slots__ instead of
+    # the instance __dict__. This is worthwhile for objects that are held
+    # in large numbers, such as the members of an InstanceList.
+    obj_compact_storage = False
+
+    # Bit assigned to each field in the changed-fields mask; this is
+    # populated for subclasses by make_class_properties()
+    _obj_field_bits = {}
+
     def __init__(self):
-        self._changed_fields = set()
+        self._obj_changed_mask = 0
         self._context = None
 
     @classmethod
@@ -264,7 +314,7 @@ class NovaObject(object):
                 setattr(self, name,
                         self._attr_from_primitive(name, objdata[name]))
         changes = primitive.get('nova_object.changes', [])
-        self._changed_fields = set([x for x in changes if x in self.fields])
+        self._obj_changed_mask = self._obj_fields_mask(changes)
         return self
 
     def _attr_to_primitive(self, attribute):
@@ -318,9 +368,23 @@ class NovaObject(object):
         """
         raise NotImplementedError('Cannot save anything in the base class')
 
+    def _obj_fields_mask(self, fields):
+        """Returns the changed-fields mask covering the named fields.
+
+        Names that are not fields of this object are ignored.
+        """
+        mask = 0
+        for name in fields:
+            mask |= self._obj_field_bits.get(name, 0)
+        return mask
+
     def obj_what_changed(self):
         """Returns a set of fields that have been modified."""
-        return self._changed_fields
+        mask = self._obj_changed_mask
+        if not mask:
+            return set()
+        return set(name for name, bit in self._obj_field_bits.iteritems()
+                   if mask & bit)
 
     def obj_get_changes(self):
         """Returns a dict of changed fields and their new values."""
@@ -335,9 +399,9 @@ class NovaObject(object):
         Note that this is NOT "revert to previous values"
         """
         if fields:
-            self._changed_fields -= set(fields)
+            self._obj_changed_mask &= ~self._obj_fields_mask(fields)
         else:
-            self._changed_fields.clear()
+            self._obj_changed_mask = 0
 
     def obj_attr_is_set(self, attrname):
         """Test object to see if attrname is present.
@@ -498,6 +562,9 @@ class NovaObjectSerializer(nova.openstack.common.rpc.serializer.Serializer):
     ability to serialize and deserialize NovaObject entities. Any service
     that needs to accept or return NovaObjects as arguments or result values
     should pass this to its RpcProxy and RpcDispatcher objects.
+
+    Large arguments and return values are also compressed as configured
+    by rpc_compression.
     """
     def _process_iterable(self, context, action_fn, values):
         """Process an iterable, taking an action on each value.
@@ -515,23 +582,31 @@ class NovaObjectSerializer(nova.openstack.common.rpc.serializer.Serializer):
             iterable = tuple
         return iterable([action_fn(context, value) for value in values])
 
-    def serialize_entity(self, context, entity):
+    def _serialize_entity(self, context, entity):
         if isinstance(entity, (tuple, list, set)):
-            entity = self._process_iterable(context, self.serialize_entity,
+            entity = self._process_iterable(context, self._serialize_entity,
                                             entity)
         elif (hasattr(entity, 'obj_to_primitive') and
               callable(entity.obj_to_primitive)):
             entity = entity.obj_to_primitive()
         return entity
 
-    def deserialize_entity(self, context, entity):
+    def _deserialize_entity(self, context, entity):
         if isinstance(entity, dict) and 'nova_object.name' in entity:
             entity = NovaObject.obj_from_primitive(entity, context=context)
         elif isinstance(entity, (tuple, list, set)):
-            entity = self._process_iterable(context, self.deserialize_entity,
-                                            entity)
+            entity = self._process_iterable(context,
+                                            self._deserialize_entity, entity)
         return entity
 
+    def serialize_entity(self, context, entity):
+        return rpccompression.compress(
+            self._serialize_entity(context, entity))
+
+    def deserialize_entity(self, context, entity):
+        return self._deserialize_entity(context,
+                                        rpccompression.decompress(entity))
+
 
 def obj_to_primitive(obj):
     """Recursively turn an object into a python primitive.
@@ -70,6 +70,11 @@ class Instance(base.NovaPersistentObject, base.NovaObject):
     # Version 1.8: 'security_groups' and 'pci_devices' cannot be None
     VERSION = '1.8'
 
+    # NOTE: Instances are held by the thousand in InstanceLists, so keep
+    # their fields out of the per-object __dict__.
+    obj_compact_storage = True
+    __slots__ = ('_orig_metadata', '_orig_system_metadata')
+
     fields = {
         'id': int,
 
@@ -32,6 +32,8 @@ class InstanceInfoCache(base.NovaPersistentObject, base.NovaObject):
     # Version 1.4: String attributes updated to support unicode
     VERSION = '1.4'
 
+    obj_compact_storage = True
+
     fields = {
         'instance_uuid': utils.str_value,
         'network_info': utils.network_model_or_none,
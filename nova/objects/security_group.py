@@ -22,6 +22,8 @@ class SecurityGroup(base.NovaPersistentObject, base.NovaObject):
     # Version 1.1: String attributes updated to support unicode
     VERSION = '1.1'
 
+    obj_compact_storage = True
+
     fields = {
         'id': int,
         'name': utils.str_value,
@@ -18,6 +18,7 @@
 """Policy Engine For Nova."""
 
 import os.path
+import re
 
 from oslo.config import cfg
 
@@ -42,12 +43,22 @@ CONF.register_opts(policy_opts)
 _POLICY_PATH = None
 _POLICY_CACHE = {}
 
+# The rules last compiled, and the compiled version of each of them
+_COMPILED_RULES = None
+_COMPILED = {}
+
+_TARGET_KEY_RE = re.compile(r'%\(([^)]+)\)')
+
 
 def reset():
     global _POLICY_PATH
     global _POLICY_CACHE
+    global _COMPILED_RULES
+    global _COMPILED
     _POLICY_PATH = None
     _POLICY_CACHE = {}
+    _COMPILED_RULES = None
+    _COMPILED = {}
     policy.reset()
 
 
@@ -67,6 +78,179 @@ def init():
 def _set_rules(data):
     default_rule = CONF.policy_default_rule
     policy.set_rules(policy.Rules.load_json(data, default_rule))
+    _get_compiled_rules()
+
+
+def _union(key_sets):
+    result = set()
+    for keys in key_sets:
+        if keys is None:
+            return None
+        result |= keys
+    return result
+
+
+def _compile_check(check, rules, resolving):
+    """Turn a tree of policy checks into a single function.
+
+    Returns the function, taking the target and credentials like the
+    checks do, with the sets of credential and target keys its result
+    depends on. The key sets are None when they are not known, for checks
+    that are called as they are, like http checks.
+    """
+    kind = type(check)
+    if kind is policy.TrueCheck:
+        return (lambda target, creds: True), set(), set()
+    if kind is policy.FalseCheck:
+        return (lambda target, creds: False), set(), set()
+
+    if kind is policy.NotCheck:
+        func, cred_keys, target_keys = _compile_check(check.rule, rules,
+                                                      resolving)
+        return (lambda target, creds: not func(target, creds),
+                cred_keys, target_keys)
+
+    if kind in (policy.AndCheck, policy.OrCheck):
+        compiled = [_compile_check(rule, rules, resolving)
+                    for rule in check.rules]
+        funcs = tuple(func for func, _cred_keys, _target_keys in compiled)
+        if kind is policy.AndCheck:
+            def func(target, creds):
+                for rule in funcs:
+                    if not rule(target, creds):
+                        return False
+                return True
+        else:
+            def func(target, creds):
+                for rule in funcs:
+                    if rule(target, creds):
+                        return True
+                return False
+        return (func, _union(keys[1] for keys in compiled),
+                _union(keys[2] for keys in compiled))
+
+    if kind is policy.RuleCheck:
+        if check.match in resolving:
+            # A rule referring back to itself is left to fail as it did
+            return check, None, None
+        try:
+            rule = rules[check.match]
+        except KeyError:
+            return (lambda target, creds: False), set(), set()
+        rule_func, cred_keys, target_keys = _compile_check(
+            rule, rules, resolving | set([check.match]))
+
+        def func(target, creds):
+            try:
+                return rule_func(target, creds)
+            except KeyError:
+                # Like RuleCheck, a rule needing something which is
+                # missing fails closed
+                return False
+        return func, cred_keys, target_keys
+
+    if kind is policy.RoleCheck:
+        role = check.match.lower()
+
+        def func(target, creds):
+            return role in [x.lower() for x in creds['roles']]
+        return func, set(['roles']), set()
+
+    if kind is IsAdminCheck:
+        expected = check.expected
+        return (lambda target, creds: creds['is_admin'] == expected,
+                set(['is_admin']), set())
+
+    if kind is policy.GenericCheck:
+        cred_key = check.kind
+        match = check.match
+        if '%' not in match:
+            def func(target, creds):
+                return (cred_key in creds and
+                        match == unicode(creds[cred_key]))
+            return func, set([cred_key]), set()
+
+        keys = _TARGET_KEY_RE.findall(match)
+        if (not keys or len(keys) != match.count('%(') or
+                any('(' in key for key in keys)):
+            # Not sure which target keys the match uses, so don't
+            # remember decisions depending on it
+            target_keys = None
+        else:
+            target_keys = set(keys)
+
+        def func(target, creds):
+            # Format first so a missing target key raises KeyError, as
+            # GenericCheck does, whether or not the credential is there
+            formatted = match % target
+            return (cred_key in creds and
+                    formatted == unicode(creds[cred_key]))
+        return func, set([cred_key]), target_keys
+
+    return check, None, None
+
+
+def _get_compiled_rules():
+    """Return the compiled rules, compiling them if they changed."""
+    global _COMPILED_RULES
+    global _COMPILED
+
+    # NOTE: rules are also set directly on the common policy module, so
+    # that is where to look for them
+    rules = policy._rules
+    if rules is not _COMPILED_RULES:
+        _COMPILED_RULES = rules
+        _COMPILED = {}
+        for name, rule in (rules or {}).items():
+            _COMPILED[name] = _compile_check(rule, rules, set([name]))
+    return _COMPILED
+
+
+def _get_compiled(action):
+    compiled = _get_compiled_rules()
+    try:
+        return compiled[action]
+    except KeyError:
+        pass
+
+    try:
+        # Rules without the action give their default rule, if any
+        rule = _COMPILED_RULES[action]
+    except (KeyError, TypeError):
+        return (lambda target, creds: False), set(), set()
+    compiled[action] = _compile_check(rule, _COMPILED_RULES, set([action]))
+    return compiled[action]
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _decision_key(action, cred_keys, target_keys, target, credentials):
+    """Return what a decision is remembered by, or None if it can't be."""
+    if cred_keys is None or target_keys is None:
+        return None
+    try:
+        key = (action,
+               tuple((k, _freeze(credentials.get(k)))
+                     for k in sorted(cred_keys)),
+               tuple((k, _freeze(target[k])) for k in sorted(target_keys)))
+        hash(key)
+    except (KeyError, TypeError, AttributeError):
+        return None
+    return key
+
+
+def _check(action, target, credentials):
+    func, _cred_keys, _target_keys = _get_compiled(action)
+    try:
+        return func(target, credentials)
+    except KeyError:
+        # As for the common policy code, a rule needing something which
+        # is missing fails closed
+        return False
 
 
 def enforce(context, action, target, do_raise=True):
@@ -95,12 +279,30 @@ def enforce(context, action, target, do_raise=True):
 
     credentials = context.to_dict()
 
-    # Add the exception arguments if asked to do a raise
-    extra = {}
-    if do_raise:
-        extra.update(exc=exception.PolicyNotAuthorized, action=action)
+    # The same decision tends to be asked for many times in a request,
+    # for example once per server for an extension's attributes, so it
+    # is remembered on the context for the rest of the request
+    decisions = getattr(context, 'policy_decisions', None)
+    key = None
+    if decisions is not None:
+        _func, cred_keys, target_keys = _get_compiled(action)
+        key = _decision_key(action, cred_keys, target_keys, target,
+                            credentials)
+        if decisions.get(None) is not _COMPILED_RULES:
+            decisions.clear()
+            decisions[None] = _COMPILED_RULES
+
+    if key is not None and key in decisions:
+        result = decisions[key]
+    else:
+        result = _check(action, target, credentials)
+        if key is not None:
+            decisions[key] = result
+
+    if do_raise and result is False:
+        raise exception.PolicyNotAuthorized(action=action)
 
-    return policy.check(action, target, credentials, **extra)
+    return result
 
 
 def check_is_admin(context):
@@ -113,7 +315,7 @@ def check_is_admin(context):
     credentials = context.to_dict()
     target = credentials
 
-    return policy.check('context_is_admin', target, credentials)
+    return _check('context_is_admin', target, credentials)
 
 
 @policy.register('is_admin')
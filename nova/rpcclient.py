@@ -25,7 +25,74 @@ so that the commit which switches us to oslo.messaging is smaller and easier
 to review. This file will be removed as part of that commit.
 """
 
+import sys
+
+from eventlet import event
+from eventlet import greenthread
+
+from nova.openstack.common import rpc
+from nova.openstack.common.rpc import common as rpc_common
 from nova.openstack.common.rpc import proxy
+from nova import rpccompression
+from nova import rpcstats
+
+
+class CallFuture(object):
+    """The eventual result of a call made with call_async().
+
+    The given function is run in its own green thread as soon as the
+    future is created, so several futures wait for their replies
+    concurrently.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self._event = event.Event()
+        greenthread.spawn_n(self._run, func, *args, **kwargs)
+
+    def _run(self, func, *args, **kwargs):
+        try:
+            self._event.send(func(*args, **kwargs))
+        except Exception:
+            self._event.send_exception(*sys.exc_info())
+
+    def ready(self):
+        """Return True if the result (or failure) has arrived."""
+        return self._event.ready()
+
+    def result(self):
+        """Wait for the reply and return it, or raise the failure."""
+        return self._event.wait()
+
+
+def gather(futures, return_exceptions=False):
+    """Wait for a set of futures and return their results in order.
+
+    Since the calls behind the futures are already in flight, the total
+    wait is bounded by the slowest reply rather than the sum of all of
+    them.
+
+    :param futures: An iterable of CallFuture objects.
+    :param return_exceptions: If True, a failed call puts its exception
+                              in the result list instead of raising it.
+                              Otherwise the first failure is raised after
+                              all of the futures have completed.
+    :returns: A list of results in the same order as futures.
+    """
+    results = []
+    exc_info = None
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            if return_exceptions:
+                results.append(e)
+            else:
+                results.append(None)
+                if exc_info is None:
+                    exc_info = sys.exc_info()
+    if exc_info is not None:
+        raise exc_info[0], exc_info[1], exc_info[2]
+    return results
 
 
 class RPCClient(object):
@@ -84,12 +151,83 @@ class RPCClient(object):
     def call(self, ctxt, method, **kwargs):
         return self._invoke(self.proxy.call, ctxt, method, **kwargs)
 
+    def call_async(self, ctxt, method, **kwargs):
+        return self._invoke(self.proxy.call_async, ctxt, method, **kwargs)
+
     def can_send_version(self, version):
         return self.proxy.can_send_version(version)
 
 
 class RpcProxy(proxy.RpcProxy):
 
+    def __init__(self, *args, **kwargs):
+        super(RpcProxy, self).__init__(*args, **kwargs)
+        # NOTE: servers compress large return values, so decompress them
+        # even if the serializer given to us would not.
+        self.serializer = rpccompression.DecompressingSerializer(
+            self.serializer)
+
+    # NOTE: the send time is stamped here rather than in the rpc drivers,
+    # so with the amqp drivers it includes the wait for a connection.
+    def call(self, context, msg, *args, **kwargs):
+        rpcstats.add_send_time(msg)
+        return super(RpcProxy, self).call(context, msg, *args, **kwargs)
+
+    def multicall(self, context, msg, *args, **kwargs):
+        rpcstats.add_send_time(msg)
+        return super(RpcProxy, self).multicall(context, msg, *args, **kwargs)
+
+    def cast(self, context, msg, *args, **kwargs):
+        rpcstats.add_send_time(msg)
+        return super(RpcProxy, self).cast(context, msg, *args, **kwargs)
+
+    def fanout_cast(self, context, msg, *args, **kwargs):
+        rpcstats.add_send_time(msg)
+        return super(RpcProxy, self).fanout_cast(context, msg, *args,
+                                                 **kwargs)
+
+    def cast_to_server(self, context, server_params, msg, *args, **kwargs):
+        rpcstats.add_send_time(msg)
+        return super(RpcProxy, self).cast_to_server(
+            context, server_params, msg, *args, **kwargs)
+
+    def fanout_cast_to_server(self, context, server_params, msg, *args,
+                              **kwargs):
+        rpcstats.add_send_time(msg)
+        return super(RpcProxy, self).fanout_cast_to_server(
+            context, server_params, msg, *args, **kwargs)
+
+    def call_async(self, context, msg, topic=None, version=None,
+                   timeout=None):
+        """Make a call without waiting for its reply.
+
+        With the amqp drivers the message is sent before this returns,
+        and the reply comes back through the shared reply queue like the
+        one of any other call.
+
+        :returns: A CallFuture whose result() is the return value from the
+                  remote method.  Pass several of them to gather() to wait
+                  for them together.
+        """
+        self._set_version(msg, version)
+        msg['args'] = self._serialize_msg_args(context, msg['args'])
+        real_topic = self._get_topic(topic)
+        rpcstats.add_send_time(msg)
+        replies = rpc.multicall(context, real_topic, msg, timeout)
+
+        def _wait():
+            try:
+                # NOTE: like call(), return the last result of the multicall
+                result = None
+                for result in replies:
+                    pass
+            except rpc_common.Timeout as exc:
+                raise rpc_common.Timeout(
+                    exc.info, real_topic, msg.get('method'))
+            return self.serializer.deserialize_entity(context, result)
+
+        return CallFuture(_wait)
+
     def get_client(self, namespace=None, server_params=None):
         return RPCClient(self,
                          namespace=namespace,
@@ -0,0 +1,119 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compression of large rpc arguments and return values.
+
+NovaObjectSerializer compresses each argument and return value whose JSON
+encoding is at least rpc_compression_threshold bytes long into a primitive
+naming its codec, and decompresses such primitives when they come back.
+Every nova RpcProxy decompresses the return values it receives, whatever
+serializer it was given.
+"""
+
+import base64
+import zlib
+
+from oslo.config import cfg
+
+from nova import exception
+from nova.openstack.common import jsonutils
+from nova.openstack.common.rpc import serializer as rpc_serializer
+
+try:
+    import lz4
+except ImportError:
+    lz4 = None
+
+rpc_compression_opts = [
+    cfg.StrOpt('rpc_compression',
+               default='none',
+               help='Codec used to compress large rpc arguments and return '
+                    'values: none, zlib or lz4 (if installed). Only enable '
+                    'it once every service understands compressed values. '
+                    'Services refuse to start with an unsupported codec.'),
+    cfg.IntOpt('rpc_compression_threshold',
+               default=16384,
+               help='Size in bytes of the JSON encoded argument or return '
+                    'value above which it is compressed'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(rpc_compression_opts)
+
+_CODEC_KEY = 'nova_compressed.codec'
+_DATA_KEY = 'nova_compressed.data'
+
+_CODECS = {'zlib': (zlib.compress, zlib.decompress)}
+if lz4 is not None:
+    _CODECS['lz4'] = (lz4.compress, lz4.decompress)
+
+
+def _get_codec(name):
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise exception.UnsupportedRpcCompression(
+            codec=name, supported=', '.join(sorted(_CODECS)))
+
+
+def check_config():
+    """Make sure the configured codec is available in this process.
+
+    :raises: UnsupportedRpcCompression
+    """
+    if CONF.rpc_compression != 'none':
+        _get_codec(CONF.rpc_compression)
+
+
+def is_compressed(entity):
+    return isinstance(entity, dict) and _CODEC_KEY in entity
+
+
+def compress(entity):
+    """Compress a serialized entity if it is large enough.
+
+    Returns the entity unchanged if compression is disabled, the entity is
+    already compressed or its JSON encoding is below the threshold.
+    """
+    if CONF.rpc_compression == 'none' or is_compressed(entity):
+        return entity
+    compress_fn = _get_codec(CONF.rpc_compression)[0]
+    payload = jsonutils.dumps(entity)
+    if len(payload) < CONF.rpc_compression_threshold:
+        return entity
+    return {_CODEC_KEY: CONF.rpc_compression,
+            _DATA_KEY: base64.b64encode(compress_fn(payload))}
+
+
+def decompress(entity):
+    """Undo compress(), returning anything else unchanged.
+
+    :raises: UnsupportedRpcCompression if the entity was compressed with a
+             codec this process does not have.
+    """
+    if not is_compressed(entity):
+        return entity
+    decompress_fn = _get_codec(entity[_CODEC_KEY])[1]
+    return jsonutils.loads(decompress_fn(base64.b64decode(entity[_DATA_KEY])))
+
+
+class DecompressingSerializer(rpc_serializer.Serializer):
+    """Wraps a serializer to decompress entities before deserializing them.
+    """
+    def __init__(self, base):
+        self._base = base
+
+    def serialize_entity(self, context, entity):
+        return self._base.serialize_entity(context, entity)
+
+    def deserialize_entity(self, context, entity):
+        return self._base.deserialize_entity(context, decompress(entity))
@@ -0,0 +1,207 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Warm-up and health checks for the rpc connection pool.
+
+The amqp rpc drivers (kombu and qpid) open pooled connections on demand
+and never check them while they are idle. The pool defined here can open
+rpc_conn_pool_min_size connections up front and, every
+rpc_conn_pool_check_interval seconds, replace idle connections which died.
+setup() makes the rpc driver in use create its pool from this module.
+"""
+
+import collections
+import time
+
+from eventlet import greenpool
+from eventlet import greenthread
+from oslo.config import cfg
+
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+from nova.openstack.common import loopingcall
+from nova.openstack.common import rpc
+from nova.openstack.common.rpc import amqp as rpc_amqp
+
+rpcpool_opts = [
+    cfg.IntOpt('rpc_conn_pool_min_size',
+               default=0,
+               help='Number of connections the RPC connection pool opens '
+                    'when it is created and keeps open afterwards'),
+    cfg.IntOpt('rpc_conn_pool_check_interval',
+               default=0,
+               help='Seconds between health checks of idle pooled RPC '
+                    'connections. Dead connections are closed and '
+                    'replaced. 0 disables the checks.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(rpcpool_opts)
+
+LOG = logging.getLogger(__name__)
+
+
+def _is_healthy(connection):
+    """Check whether an idle kombu or qpid connection is still usable.
+
+    This does not reconnect, a dead connection is left as it is.
+    """
+    broker = getattr(connection, 'connection', None)
+    if broker is None:
+        return False
+    opened = getattr(broker, 'opened', None)
+    if opened is not None:
+        # qpid.messaging.Connection
+        return opened()
+    if not broker.connected:
+        return False
+    verify = getattr(broker.transport, 'verify_connection', None)
+    if verify is None:
+        return True
+    try:
+        return verify(broker.connection)
+    except Exception:
+        return False
+
+
+class Pool(rpc_amqp.Pool):
+    """A connection pool which can be warmed up and health checked."""
+
+    # Seconds over which the connection creation rate is averaged.
+    CREATION_RATE_WINDOW = 300
+
+    def __init__(self, conf, connection_cls, *args, **kwargs):
+        super(Pool, self).__init__(conf, connection_cls, *args, **kwargs)
+        self.connections_created = 0
+        self.connections_evicted = 0
+        self._creation_times = collections.deque()
+        self._health_check = None
+
+    def create(self):
+        connection = super(Pool, self).create()
+        self.connections_created += 1
+        self._creation_times.append(time.time())
+        return connection
+
+    def start(self):
+        """Warm up the pool and start checking idle connections.
+
+        Both happen in the background so the caller is not held up by
+        them.
+        """
+        if self.conf.rpc_conn_pool_min_size > 0:
+            greenthread.spawn_n(self.warm_up)
+        interval = self.conf.rpc_conn_pool_check_interval
+        if interval > 0 and not self._health_check:
+            self._health_check = loopingcall.FixedIntervalLoopingCall(
+                self.check_health)
+            self._health_check.start(interval, initial_delay=interval)
+
+    def _create_for_warm_up(self, _index):
+        try:
+            return self.create()
+        except Exception:
+            LOG.exception(_('Failed to open connection while warming up '
+                            'the connection pool'))
+
+    def warm_up(self, count=None):
+        """Open connections until the pool holds at least count of them.
+
+        The connections are opened concurrently and added to the free
+        list, so the first callers after a (re)start do not pay the
+        connection setup latency.
+        """
+        if count is None:
+            count = self.conf.rpc_conn_pool_min_size
+        needed = min(count, self.max_size) - self.current_size
+        if needed <= 0:
+            return
+        # Reserve the slots up front so concurrent get() calls can not
+        # push the pool over max_size while we are connecting.
+        self.current_size += needed
+        pool = greenpool.GreenPool(needed)
+        for connection in pool.imap(self._create_for_warm_up,
+                                    range(needed)):
+            if connection is None:
+                self.current_size -= 1
+            else:
+                self.put(connection)
+
+    def _evict(self, connection):
+        self.current_size -= 1
+        self.connections_evicted += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def check_health(self):
+        """Evict idle connections that are no longer usable.
+
+        Connections that are handed out are left alone, they are checked
+        once they are returned to the pool. The pool is then topped back
+        up to rpc_conn_pool_min_size.
+        """
+        for connection in list(self.free_items):
+            if _is_healthy(connection):
+                continue
+            try:
+                self.free_items.remove(connection)
+            except ValueError:
+                # Handed out while we were checking it
+                continue
+            LOG.info(_('Evicting dead connection from the connection pool'))
+            self._evict(connection)
+        self.warm_up()
+        LOG.debug(_('Connection pool stats: %s'), self.get_stats())
+
+    def get_stats(self):
+        """Return a dict describing the current pool usage."""
+        now = time.time()
+        while (self._creation_times and
+               now - self._creation_times[0] > self.CREATION_RATE_WINDOW):
+            self._creation_times.popleft()
+        free = len(self.free_items)
+        return {'size': self.current_size,
+                'max_size': self.max_size,
+                'free': free,
+                'in_use': self.current_size - free,
+                'waiters': self.waiting(),
+                'created': self.connections_created,
+                'evicted': self.connections_evicted,
+                'created_per_minute': (len(self._creation_times) * 60.0 /
+                                       self.CREATION_RATE_WINDOW)}
+
+    def empty(self):
+        if self._health_check:
+            self._health_check.stop()
+            self._health_check = None
+        super(Pool, self).empty()
+
+
+def setup():
+    """Make the rpc driver in use create its connection pool from here.
+
+    Does nothing unless the warm-up or the health checks are enabled, or
+    when the driver does not pool its connections.
+    """
+    if (CONF.rpc_conn_pool_min_size <= 0 and
+            CONF.rpc_conn_pool_check_interval <= 0):
+        return
+    connection_cls = getattr(rpc._get_impl(), 'Connection', None)
+    if connection_cls is None or not hasattr(connection_cls, 'pool'):
+        return
+    # NOTE: rpc_amqp.get_connection_pool() only creates a pool when the
+    # connection class has none, so the drivers use the one set here.
+    if connection_cls.pool is None:
+        connection_cls.pool = Pool(CONF, connection_cls)
+        connection_cls.pool.start()
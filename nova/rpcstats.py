@@ -0,0 +1,172 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Per-method queue lag and duration of dispatched rpc messages.
+
+With rpc_dispatch_stats enabled, nova's RpcProxy stamps the messages it
+sends with their send time, and the RpcDispatcher defined here records how
+long each message waited and how long dispatching it took, per topic and
+method, in a process-wide DispatchStats.
+"""
+
+import time
+
+from oslo.config import cfg
+
+from nova.openstack.common.rpc import dispatcher as rpc_dispatcher
+
+rpcstats_opts = [
+    cfg.BoolOpt('rpc_dispatch_stats',
+                default=False,
+                help='Record queue lag and handler duration for each rpc '
+                     'method this service dispatches. Senders with this '
+                     'enabled stamp messages with their send time.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(rpcstats_opts)
+
+# NOTE: the amqp drivers unpack message keys with this prefix into the
+# context the message is dispatched with, so the send time reaches the
+# dispatcher without changing the drivers.
+_SENT_AT_KEY = 'sent_at'
+_SENT_AT_MSG_KEY = '_context_' + _SENT_AT_KEY
+
+
+class DispatchStats(object):
+    """Histograms of queue lag and handler duration for dispatched methods.
+
+    Timings are kept per (topic, method) and bucketed by the upper bounds
+    in BUCKETS (in seconds), with a final bucket for anything slower.
+    """
+
+    BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+    def __init__(self):
+        self._stats = {}
+
+    def _bucket(self, seconds):
+        for index, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                return index
+        return len(self.BUCKETS)
+
+    def _new_entry(self, topic, method):
+        nbuckets = len(self.BUCKETS) + 1
+        return {'topic': topic,
+                'method': method,
+                'count': 0,
+                'failures': 0,
+                'duration_total': 0.0,
+                'duration_max': 0.0,
+                'duration_buckets': [0] * nbuckets,
+                'lag_count': 0,
+                'lag_total': 0.0,
+                'lag_max': 0.0,
+                'lag_buckets': [0] * nbuckets}
+
+    def record(self, topic, method, duration, lag=None, failed=False):
+        """Record one dispatched message.
+
+        :param topic: The topic the dispatcher serves.
+        :param method: The rpc method that was called.
+        :param duration: Seconds the handler took to return.
+        :param lag: Seconds between the message being sent and the handler
+                    starting, or None if the sender did not stamp it.
+        :param failed: Whether the handler raised.
+        """
+        key = (topic, method)
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = self._new_entry(topic, method)
+        entry['count'] += 1
+        if failed:
+            entry['failures'] += 1
+        entry['duration_total'] += duration
+        entry['duration_max'] = max(entry['duration_max'], duration)
+        entry['duration_buckets'][self._bucket(duration)] += 1
+        if lag is not None:
+            # NOTE: Clock skew between hosts can make this negative.
+            lag = max(lag, 0.0)
+            entry['lag_count'] += 1
+            entry['lag_total'] += lag
+            entry['lag_max'] = max(entry['lag_max'], lag)
+            entry['lag_buckets'][self._bucket(lag)] += 1
+
+    def get_stats(self):
+        """Return a list of per-method stats, slowest handlers first."""
+        stats = [dict(entry, duration_buckets=list(entry['duration_buckets']),
+                      lag_buckets=list(entry['lag_buckets']))
+                 for entry in self._stats.values()]
+        return sorted(stats, key=lambda entry: entry['duration_total'],
+                      reverse=True)
+
+    def reset(self):
+        self._stats = {}
+
+
+STATS = DispatchStats()
+
+
+def get_stats():
+    """Return the dispatch stats recorded by this process."""
+    return STATS.get_stats()
+
+
+def add_send_time(msg):
+    """Stamp a message about to be sent with the current time."""
+    if CONF.rpc_dispatch_stats:
+        msg[_SENT_AT_MSG_KEY] = time.time()
+
+
+def _pop_send_time(ctxt):
+    # Removed even when the stats are disabled, so that it is not passed
+    # on to the contexts created from this one.
+    values = getattr(ctxt, 'values', None)
+    if isinstance(values, dict):
+        return values.pop(_SENT_AT_KEY, None)
+    return None
+
+
+class RpcDispatcher(rpc_dispatcher.RpcDispatcher):
+    """An RpcDispatcher which records the stats of what it dispatches.
+
+    The recorded duration covers the whole dispatch, so it includes the
+    (de)serialization of the arguments and the result.
+    """
+
+    def __init__(self, callbacks, serializer=None, topic=None):
+        """Initialize the rpc dispatcher.
+
+        :param topic: The topic this dispatcher serves, used to label the
+                      dispatch stats.
+        """
+        super(RpcDispatcher, self).__init__(callbacks, serializer)
+        self.topic = topic
+
+    def dispatch(self, ctxt, version, method, namespace, **kwargs):
+        sent_at = _pop_send_time(ctxt)
+        if not CONF.rpc_dispatch_stats:
+            return super(RpcDispatcher, self).dispatch(
+                ctxt, version, method, namespace, **kwargs)
+
+        start = time.time()
+        lag = start - sent_at if sent_at else None
+        failed = True
+        try:
+            result = super(RpcDispatcher, self).dispatch(
+                ctxt, version, method, namespace, **kwargs)
+            failed = False
+            return result
+        finally:
+            STATS.record(self.topic, method, time.time() - start, lag=lag,
+                         failed=failed)
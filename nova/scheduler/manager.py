@@ -48,8 +48,25 @@ scheduler_driver_opt = cfg.StrOpt('scheduler_driver',
         default='nova.scheduler.filter_scheduler.FilterScheduler',
         help='Default driver to use for the scheduler')
 
+usage_rollup_opts = [
+    cfg.IntOpt('project_usage_rollup_interval',
+               default=3600,
+               help='Interval in seconds at which the usage of every project '
+                    'over the days gone by is summed up, so that usage '
+                    'reports can read it rather than go through every '
+                    'instance. Set to -1 to disable, for example when '
+                    '"nova-manage db rollup_usage" is run from cron '
+                    'instead'),
+    cfg.IntOpt('project_usage_rollup_max_days',
+               default=31,
+               help='Maximum number of days examined each time usage is '
+                    'rolled up, so that a long history is rolled up bit by '
+                    'bit'),
+    ]
+
 CONF = cfg.CONF
 CONF.register_opt(scheduler_driver_opt)
+CONF.register_opts(usage_rollup_opts)
 
 QUOTAS = quota.QUOTAS
 
@@ -272,6 +289,12 @@ class SchedulerManager(manager.Manager):
     def _expire_reservations(self, context):
         QUOTAS.expire(context)
 
+    @periodic_task.periodic_task(spacing=CONF.project_usage_rollup_interval)
+    def _rollup_project_usage(self, context):
+        """Sum up the usage of every project over the days gone by."""
+        compute_utils.rollup_project_usage(
+            context, CONF.project_usage_rollup_max_days)
+
     # NOTE(russellb) This method can be removed in 3.0 of this API.  It is
     # deprecated in favor of the method in the base API.
     def get_backdoor_port(self, context):
@@ -33,6 +33,9 @@ from nova.openstack.common import importutils
 from nova.openstack.common import log as logging
 from nova.openstack.common import rpc
 from nova.openstack.common import service
+from nova import policy
+from nova import rpccompression
+from nova import rpcpool
 from nova import servicegroup
 from nova import utils
 from nova import version
@@ -108,6 +111,8 @@ service_opts = [
 CONF = cfg.CONF
 CONF.register_opts(service_opts)
 CONF.import_opt('host', 'nova.netconf')
+CONF.import_opt('wsgi_worker_max_requests', 'nova.wsgi')
+CONF.import_opt('wsgi_worker_max_requests_jitter', 'nova.wsgi')
 
 
 class Service(service.Service):
@@ -151,6 +156,7 @@ class Service(service.Service):
         LOG.audit(_('Starting %(topic)s node (version %(version)s)'),
                   {'topic': self.topic, 'version': verstr})
         self.basic_config_check()
+        rpcpool.setup()
         self.manager.init_host()
         self.model_disconnected = False
         ctxt = context.get_admin_context()
@@ -289,6 +295,11 @@ class Service(service.Service):
         except Exception as e:
             LOG.error(_('Temporary directory is invalid: %s'), e)
             sys.exit(1)
+        try:
+            rpccompression.check_config()
+        except exception.UnsupportedRpcCompression as e:
+            LOG.error(_('Invalid rpc_compression setting: %s'), e)
+            sys.exit(1)
 
 
 class WSGIService(object):
@@ -310,16 +321,35 @@ class WSGIService(object):
         self.port = getattr(CONF, '%s_listen_port' % name, 0)
         self.workers = getattr(CONF, '%s_workers' % name, None)
         self.use_ssl = use_ssl
+        max_requests = None
+        max_requests_jitter = 0
+        if self.workers:
+            # Done before the workers are forked so that they share the
+            # result rather than each doing it on its first requests.
+            self._preload()
+            max_requests = CONF.wsgi_worker_max_requests
+            max_requests_jitter = CONF.wsgi_worker_max_requests_jitter
         self.server = wsgi.Server(name,
                                   self.app,
                                   host=self.host,
                                   port=self.port,
                                   use_ssl=self.use_ssl,
-                                  max_url_len=max_url_len)
+                                  max_url_len=max_url_len,
+                                  max_requests=max_requests,
+                                  max_requests_jitter=max_requests_jitter)
         # Pull back actual port used
         self.port = self.server.port
         self.backdoor_port = None
 
+    def _preload(self):
+        """Load what the API would otherwise load on first use."""
+        policy.init()
+        if 'nova.api.openstack.xmlutil' in sys.modules:
+            # The loaded API uses XML templates, its extensions are
+            # imported by now so their templates can all be built.
+            from nova.api.openstack import xmlutil
+            xmlutil.preload_templates()
+
     def _get_manager(self):
         """Initialize a Manager object appropriate for this service.
 
@@ -350,6 +380,8 @@ class WSGIService(object):
         :returns: None
 
         """
+        rpccompression.check_config()
+        rpcpool.setup()
         if self.manager:
             self.manager.init_host()
             self.manager.pre_start_hook()
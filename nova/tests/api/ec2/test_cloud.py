@@ -845,6 +845,44 @@ class CloudTestCase(test.TestCase):
         db.service_destroy(self.context, comp1['id'])
         db.service_destroy(self.context, comp2['id'])
 
+    def test_describe_instances_bulk_lookups(self):
+        # Block device mappings and ec2 ids are not looked up per instance
+        self._stub_instance_get_with_fixed_ips('get_all')
+
+        def fake_get_all_by_instance(context, instance_uuid):
+            self.fail('Unexpected block device mapping lookup')
+
+        def fake_get_ec2_instance_id_by_uuid(context, instance_uuid):
+            self.fail('Unexpected ec2 id lookup')
+
+        self.stubs.Set(db, 'block_device_mapping_get_all_by_instance',
+                       fake_get_all_by_instance)
+        self.stubs.Set(db, 'get_ec2_instance_id_by_uuid',
+                       fake_get_ec2_instance_id_by_uuid)
+
+        image_uuid = 'cedef40a-ed67-4d10-800e-17455edce175'
+        sys_meta = flavors.save_flavor_info(
+            {}, flavors.get_flavor(1))
+        instances = [db.instance_create(self.context,
+                                        {'reservation_id': 'a',
+                                         'image_ref': image_uuid,
+                                         'instance_type_id': 1,
+                                         'host': 'host1',
+                                         'vm_state': 'active',
+                                         'system_metadata': sys_meta})
+                     for i in range(3)]
+
+        result = self.cloud.describe_instances(self.context)
+        result = result['reservationSet'][0]
+        self.assertEqual(
+            sorted(ec2utils.id_to_ec2_inst_id(instance['uuid'])
+                   for instance in instances),
+            sorted(instance['instanceId']
+                   for instance in result['instancesSet']))
+
+        for instance in instances:
+            db.instance_destroy(self.context, instance['uuid'])
+
     def test_describe_instances_all_invalid(self):
         # Makes sure describe_instances works and filters results.
         self.flags(use_ipv6=True)
@@ -2823,6 +2861,24 @@ class CloudTestCase(test.TestCase):
                 ec2utils.resource_type_from_id(self.context, 'x-12345'),
                 None)
 
+    def test_get_int_ids_from_instance_uuids(self):
+        mapping = db.ec2_instance_create(self.context, 'fake-uuid1')
+        int_ids = ec2utils.get_int_ids_from_instance_uuids(
+            self.context, ['fake-uuid1', 'fake-uuid2', 'fake-uuid2'])
+        self.assertEqual(mapping['id'], int_ids['fake-uuid1'])
+        self.assertEqual(db.get_ec2_instance_id_by_uuid(self.context,
+                                                        'fake-uuid2'),
+                         int_ids['fake-uuid2'])
+
+        # Both mappings are now cached
+        def fake_get_ec2_instance_id_by_uuid(context, instance_uuid):
+            self.fail('Unexpected ec2 id lookup of %s' % instance_uuid)
+
+        self.stubs.Set(db, 'get_ec2_instance_id_by_uuid',
+                       fake_get_ec2_instance_id_by_uuid)
+        self.assertEqual(ec2utils.id_to_ec2_id(int_ids['fake-uuid2']),
+                         ec2utils.id_to_ec2_inst_id('fake-uuid2'))
+
 
 class CloudTestCaseNeutronProxy(test.TestCase):
     def setUp(self):
@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from lxml import etree
+import webob.exc
+
+from nova.api.openstack.compute.contrib import image_precache
+from nova.compute import api as compute_api
+from nova import exception
+from nova import test
+from nova.tests.api.openstack import fakes
+
+
+def fake_precache_image(self, context, host_name, image_id):
+    if host_name == 'down_host':
+        raise exception.ComputeServiceUnavailable(host=host_name)
+    if host_name == 'missing_host':
+        raise exception.HostNotFound(host=host_name)
+    return 'queued'
+
+
+def fake_get_aggregate(self, context, aggregate_id):
+    if aggregate_id != 1:
+        raise exception.AggregateNotFound(aggregate_id=aggregate_id)
+    return {'id': 1, 'hosts': ['host2', 'host3']}
+
+
+class ImagePrecacheTest(test.NoDBTestCase):
+
+    def setUp(self):
+        super(ImagePrecacheTest, self).setUp()
+        self.stubs.Set(compute_api.HostAPI, 'precache_image',
+                       fake_precache_image)
+        self.stubs.Set(compute_api.AggregateAPI, 'get_aggregate',
+                       fake_get_aggregate)
+        self.controller = image_precache.ImagePrecacheController()
+        self.shown = []
+        self.stubs.Set(self.controller.image_service, 'show',
+                       lambda context, image_id: self.shown.append(image_id))
+        self.req = fakes.HTTPRequest.blank('/v2/fake/os-image-precache',
+                                           use_admin_context=True)
+
+    def _precache(self, **kwargs):
+        body = {'precache': dict(image_id='fake-image', **kwargs)}
+        return self.controller.create(self.req, body)['precache']
+
+    def test_precache_hosts(self):
+        result = self._precache(hosts=['host1', 'down_host', 'missing_host'])
+        self.assertEqual('fake-image', result['image_id'])
+        self.assertEqual([{'host': 'host1', 'state': 'queued'},
+                          {'host': 'down_host', 'state': 'unavailable'},
+                          {'host': 'missing_host', 'state': 'not_found'}],
+                         result['hosts'])
+        self.assertEqual(['fake-image'], self.shown)
+
+    def test_precache_aggregate(self):
+        result = self._precache(hosts=['host1', 'host2'], aggregate_id=1)
+        self.assertEqual(['host1', 'host2', 'host3'],
+                         [host['host'] for host in result['hosts']])
+
+    def test_precache_aggregate_not_found(self):
+        self.assertRaises(webob.exc.HTTPNotFound, self._precache,
+                          aggregate_id=2)
+
+    def test_precache_no_hosts(self):
+        self.assertRaises(webob.exc.HTTPBadRequest, self._precache)
+
+    def test_precache_no_image(self):
+        self.assertRaises(webob.exc.HTTPBadRequest, self.controller.create,
+                          self.req, {'precache': {'hosts': ['host1']}})
+
+    def test_precache_image_not_found(self):
+        def fake_show(context, image_id):
+            raise exception.ImageNotFound(image_id=image_id)
+
+        self.stubs.Set(self.controller.image_service, 'show', fake_show)
+        self.assertRaises(webob.exc.HTTPNotFound, self._precache,
+                          hosts=['host1'])
+
+
+class ImagePrecacheSerializerTest(test.NoDBTestCase):
+
+    def test_serializer(self):
+        serializer = image_precache.ImagePrecacheTemplate()
+        exemplar = {'precache': {'image_id': 'fake-image',
+                                 'hosts': [{'host': 'host1',
+                                            'state': 'queued'},
+                                           {'host': 'host2',
+                                            'state': 'cached'}]}}
+        tree = etree.fromstring(serializer.serialize(exemplar))
+
+        self.assertEqual('precache', tree.tag)
+        self.assertEqual('fake-image', tree.get('image_id'))
+        self.assertEqual(2, len(tree))
+        for child, host in zip(tree, exemplar['precache']['hosts']):
+            self.assertEqual('host', child.tag)
+            self.assertEqual(host['host'], child.get('host'))
+            self.assertEqual(host['state'], child.get('state'))
@@ -20,6 +20,7 @@ import webob
 from nova.api.openstack.compute.plugins.v3 import flavors_extraspecs
 import nova.db
 from nova import exception
+from nova import generations
 from nova import test
 from nova.tests.api.openstack import fakes
 
@@ -60,6 +61,8 @@ class FlavorsExtraSpecsTest(test.TestCase):
         super(FlavorsExtraSpecsTest, self).setUp()
         fakes.stub_out_key_pair_funcs(self.stubs)
         self.controller = flavors_extraspecs.FlavorExtraSpecsController()
+        self.bumped = []
+        self.stubs.Set(generations, 'bump', self.bumped.append)
 
     def test_index(self):
         self.stubs.Set(nova.db, 'instance_type_extra_specs_get',
@@ -103,6 +106,7 @@ class FlavorsExtraSpecsTest(test.TestCase):
         req = fakes.HTTPRequest.blank('/v3/flavors/1/extra-specs/key5',
                                       use_admin_context=True)
         self.controller.delete(req, 1, 'key5')
+        self.assertEqual([generations.FLAVORS], self.bumped)
 
     def test_delete_no_admin(self):
         self.stubs.Set(nova.db, 'instance_type_extra_specs_delete',
@@ -130,6 +134,7 @@ class FlavorsExtraSpecsTest(test.TestCase):
 
         self.assertEqual('value1', res_dict['extra_specs']['key1'])
         self.assertEqual(self.controller.create.wsgi_code, 201)
+        self.assertEqual([generations.FLAVORS], self.bumped)
 
     def test_create_no_admin(self):
         self.stubs.Set(nova.db,
@@ -162,6 +167,7 @@ class FlavorsExtraSpecsTest(test.TestCase):
         res_dict = self.controller.update(req, 1, 'key1', body)
 
         self.assertEqual('value1', res_dict['key1'])
+        self.assertEqual([generations.FLAVORS], self.bumped)
 
     def test_update_item_no_admin(self):
         self.stubs.Set(nova.db,
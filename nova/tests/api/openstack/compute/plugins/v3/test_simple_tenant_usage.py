@@ -82,11 +82,39 @@ def fake_instance_get_active_by_window_joined(self, context, begin, end,
                                          for x in xrange(TENANTS * SERVERS)]
 
 
+def fake_get_usage_by_window(self, context, begin, end):
+    # Sums up the same instances the detailed report goes through
+    usages = {}
+    for instance in fake_instance_get_active_by_window_joined(
+            self, context, begin, end, None):
+        start = max(instance['launched_at'], begin)
+        stop = min(instance['terminated_at'], end)
+        hours = max(timeutils.delta_seconds(start, stop), 0) / 3600.0
+        usage = usages.setdefault(instance['project_id'],
+                                  {'hours': 0.0,
+                                   'vcpus_hours': 0.0,
+                                   'memory_mb_hours': 0.0,
+                                   'local_gb_hours': 0.0})
+        usage['hours'] += hours
+        usage['vcpus_hours'] += VCPUS * hours
+        usage['memory_mb_hours'] += MEMORY_MB * hours
+        usage['local_gb_hours'] += (ROOT_GB + EPHEMERAL_GB) * hours
+    return usages
+
+
 class SimpleTenantUsageTest(test.TestCase):
     def setUp(self):
         super(SimpleTenantUsageTest, self).setUp()
         self.stubs.Set(api.API, "get_active_by_window",
                        fake_instance_get_active_by_window_joined)
+        self.usage_windows = []
+
+        def get_usage_by_window(compute_api, context, begin, end):
+            self.usage_windows.append((begin, end))
+            return fake_get_usage_by_window(compute_api, context, begin,
+                                            end)
+
+        self.stubs.Set(api.API, "get_usage_by_window", get_usage_by_window)
         self.admin_context = context.RequestContext('fakeadmin_0',
                                                     'faketenant_0',
                                                     is_admin=True)
@@ -102,6 +130,8 @@ class SimpleTenantUsageTest(test.TestCase):
             osapi_compute_ext_list=['Simple_tenant_usage'])
 
     def _test_verify_index(self, start, stop):
+        timeutils.set_time_override(NOW)
+        self.addCleanup(timeutils.clear_time_override)
         req = webob.Request.blank(
                     '/v3/os-simple-tenant-usage?start=%s&end=%s' %
                     (start.isoformat(), stop.isoformat()))
@@ -127,6 +157,21 @@ class SimpleTenantUsageTest(test.TestCase):
                              SERVERS * VCPUS * HOURS)
             self.assertFalse(usages[i].get('server_usages'))
 
+        # The end of the period is clamped to now
+        self.assertEqual([(start, min(stop, NOW))], self.usage_windows)
+
+        # The totals summed up by the database match those summed up from
+        # each instance
+        detailed = dict((usage['tenant_id'], usage)
+                        for usage in self._get_tenant_usages('1', start,
+                                                             stop))
+        self.assertEqual(TENANTS, len(usages))
+        for usage in usages:
+            for key in ('total_hours', 'total_local_gb_usage',
+                        'total_memory_mb_usage', 'total_vcpus_usage'):
+                self.assertAlmostEqual(detailed[usage['tenant_id']][key],
+                                       usage[key])
+
     def test_verify_index(self):
         self._test_verify_index(START, STOP)
 
@@ -169,11 +214,11 @@ class SimpleTenantUsageTest(test.TestCase):
                                'servers')))
         self.assertEqual(res.status_int, 400)
 
-    def _get_tenant_usages(self, detailed=''):
+    def _get_tenant_usages(self, detailed='', start=START, stop=STOP):
         req = webob.Request.blank(
                     '/v3/os-simple-tenant-usage?'
                     'detailed=%s&start=%s&end=%s' %
-                    (detailed, START.isoformat(), STOP.isoformat()))
+                    (detailed, start.isoformat(), stop.isoformat()))
         req.method = "GET"
         req.headers["content-type"] = "application/json"
 
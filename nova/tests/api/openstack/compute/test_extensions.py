@@ -210,6 +210,7 @@ class ExtensionControllerTest(ExtensionTestCase):
             "FloatingIpsBulk",
             "Fox In Socks",
             "Hosts",
+            "ImagePrecache",
             "ImageSize",
             "InstanceActions",
             "Keypairs",
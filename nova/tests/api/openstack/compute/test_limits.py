@@ -29,6 +29,7 @@ from nova.api.openstack.compute import views
 from nova.api.openstack import xmlutil
 import nova.context
 from nova.openstack.common import jsonutils
+from nova.openstack.common import memorycache
 from nova import test
 from nova.tests.api.openstack import fakes
 from nova.tests import matchers
@@ -664,6 +665,64 @@ class LimiterTest(BaseLimitTestSuite):
         self.assertEqual(expected, results)
 
 
+class CacheLimiterTest(BaseLimitTestSuite):
+    """
+    Tests for the memcached backed `limits.CacheLimiter` class.
+    """
+
+    def setUp(self):
+        super(CacheLimiterTest, self).setUp()
+        cache = memorycache.Client()
+        self.stubs.Set(memorycache, 'get_client', lambda servers: cache)
+        userlimits = {'limits.user0': '(put, *, .*, 2, minute)'}
+        self.limiters = [limits.CacheLimiter(TEST_LIMITS, **userlimits),
+                         limits.CacheLimiter(TEST_LIMITS, **userlimits)]
+
+    def _check(self, num, verb, url, username=None):
+        """Check and yield results from checks, alternating limiters."""
+        for x in xrange(num):
+            limiter = self.limiters[x % 2]
+            yield limiter.check_for_delay(verb, url, username)[0]
+
+    def test_no_delay_GET(self):
+        delay = self.limiters[0].check_for_delay("GET", "/anything")
+        self.assertEqual(delay, (None, None))
+
+    def test_delay_PUT_shared(self):
+        expected = [None] * 10 + [60.0]
+        results = list(self._check(11, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+    def test_delay_PUT_wait(self):
+        expected = [None] * 10 + [60.0]
+        results = list(self._check(11, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+        # The previous window still counts in full
+        self.time += 60.0
+        self.assertEqual([6.0], list(self._check(1, "PUT", "/anything")))
+
+        self.time += 6.0
+        expected = [None, 6.0]
+        results = list(self._check(2, "PUT", "/anything"))
+        self.assertEqual(expected, results)
+
+    def test_multiple_users(self):
+        expected = [None] * 2 + [60.0] * 3
+        results = list(self._check(5, "PUT", "/anything", "user0"))
+        self.assertEqual(expected, results)
+
+        expected = [None] * 10 + [60.0]
+        results = list(self._check(11, "PUT", "/anything", "user1"))
+        self.assertEqual(expected, results)
+
+    def test_get_limits(self):
+        list(self._check(4, "PUT", "/anything"))
+        limit = self.limiters[1].get_limits()[3]
+        self.assertEqual("PUT", limit["verb"])
+        self.assertEqual(6, limit["remaining"])
+
+
 class WsgiLimiterTest(BaseLimitTestSuite):
     """
     Tests for `limits.WsgiLimiter` class.
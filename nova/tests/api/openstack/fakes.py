@@ -694,6 +694,12 @@ def stub_bdm_get_all_by_instance(context, instance_uuid):
             {'source_type': 'volume', 'volume_id': 'volume_id2'}]
 
 
+def stub_bdm_get_all_by_instance_uuids(context, instance_uuids):
+    return dict((instance_uuid,
+                 stub_bdm_get_all_by_instance(context, instance_uuid))
+                for instance_uuid in instance_uuids)
+
+
 def fake_get_available_languages(domain):
     existing_translations = ['en_GB', 'en_AU', 'de', 'zh_CN', 'en_US']
     return existing_translations
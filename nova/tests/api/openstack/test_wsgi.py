@@ -4,7 +4,9 @@ import inspect
 import webob
 
 from nova.api.openstack import wsgi
+from nova import context
 from nova import exception
+from nova import generations
 from nova.openstack.common import gettextutils
 from nova import test
 from nova.tests.api.openstack import fakes
@@ -190,6 +192,26 @@ class JSONDictSerializerTest(test.NoDBTestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(result, expected_json)
 
+    def test_iterencode(self):
+        input_dict = dict(servers=[dict(id=i, name='server-%d' % i)
+                                   for i in range(100)],
+                          servers_links=[], count=100, a=dict(b=(2, 3)))
+        serializer = wsgi.JSONDictSerializer()
+        chunks = list(serializer.iterencode(input_dict, chunk_size=512))
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(serializer.serialize(input_dict), ''.join(chunks))
+
+    def test_iterencode_generator(self):
+        input_dict = dict(servers=(dict(id=i) for i in range(3)))
+        serializer = wsgi.JSONDictSerializer()
+        result = ''.join(serializer.iterencode(input_dict))
+        self.assertEqual('{"servers": [{"id": 0}, {"id": 1}, {"id": 2}]}',
+                         result)
+
+    def test_iterencode_not_dict(self):
+        serializer = wsgi.JSONDictSerializer()
+        self.assertEqual(['[1, 2]'], list(serializer.iterencode([1, 2])))
+
 
 class TextDeserializerTest(test.NoDBTestCase):
     def test_dispatch_default(self):
@@ -941,6 +963,70 @@ class ResourceTest(test.NoDBTestCase):
         self.assertRaises(UnicodeDecodeError, req.get_response, app)
 
 
+class ResponseCacheTest(test.NoDBTestCase):
+    def setUp(self):
+        super(ResponseCacheTest, self).setUp()
+        self.flags(api_response_cache_resources=['tests'])
+        self.stubs.Set(wsgi, '_RESPONSE_CACHE_GENERATIONS',
+                       {'tests': [generations.FLAVORS]})
+        wsgi.reset_response_cache()
+        generations.reset_cache()
+        self.addCleanup(wsgi.reset_response_cache)
+        self.addCleanup(generations.reset_cache)
+
+        self.calls = []
+
+        class Controller(object):
+            def index(inner_self, req):
+                self.calls.append(req.path_info)
+                return {'pants': len(self.calls)}
+
+        self.app = fakes.TestRouter(Controller())
+
+    def _get(self, path='/tests', user_id='fake_user', etag=None):
+        req = webob.Request.blank(path)
+        req.environ['nova.context'] = context.RequestContext(user_id,
+                                                             'fake_project')
+        if etag:
+            req.headers['If-None-Match'] = etag
+        return req.get_response(self.app)
+
+    def test_cached_response(self):
+        first = self._get()
+        second = self._get()
+        self.assertEqual(200, second.status_int)
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertEqual(1, len(self.calls))
+
+    def test_cached_response_per_user(self):
+        self._get()
+        self._get(user_id='other_user')
+        self.assertEqual(2, len(self.calls))
+
+    def test_not_cached_resource(self):
+        self.flags(api_response_cache_resources=['flavors'])
+        first = self._get()
+        self._get()
+        self.assertEqual(2, len(self.calls))
+        self.assertNotIn('ETag', first.headers)
+
+    def test_not_modified(self):
+        first = self._get()
+        second = self._get(etag=first.headers['ETag'])
+        self.assertEqual(304, second.status_int)
+        self.assertEqual('', second.body)
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+
+    def test_generation_bump(self):
+        first = self._get()
+        generations.bump(generations.FLAVORS)
+        second = self._get(etag=first.headers['ETag'])
+        self.assertEqual(200, second.status_int)
+        self.assertEqual(2, len(self.calls))
+        self.assertNotEqual(first.headers['ETag'], second.headers['ETag'])
+
+
 class ResponseObjectTest(test.NoDBTestCase):
     def test_default_code(self):
         robj = wsgi.ResponseObject({})
@@ -1040,6 +1126,31 @@ class ResponseObjectTest(test.NoDBTestCase):
             self.assertEqual(response.status_int, 202)
             self.assertEqual(response.body, mtype)
 
+    def test_serialize_stream(self):
+        self.flags(api_json_stream_items=3)
+        obj = {'servers': [{'id': 1}, {'id': 2}], 'servers_links': []}
+        robj = wsgi.ResponseObject(obj, json=wsgi.JSONDictSerializer)
+        request = wsgi.Request.blank('/tests/123')
+
+        # Not enough items to be streamed
+        response = robj.serialize(request, 'application/json')
+        self.assertEqual(len(response.body), response.content_length)
+
+        obj['servers'].append({'id': 3})
+        response = robj.serialize(request, 'application/json')
+        self.assertEqual(None, response.content_length)
+        self.assertEqual(wsgi.JSONDictSerializer().serialize(obj),
+                         response.body)
+
+    def test_serialize_stream_disabled(self):
+        self.flags(api_json_stream_items=0)
+        obj = {'servers': (server for server in [{'id': 1}])}
+        robj = wsgi.ResponseObject(obj, json=wsgi.JSONDictSerializer)
+        request = wsgi.Request.blank('/tests/123')
+        response = robj.serialize(request, 'application/json')
+        self.assertEqual(len(response.body), response.content_length)
+        self.assertEqual('{"servers": [{"id": 1}]}', response.body)
+
 
 class ValidBodyTest(test.NoDBTestCase):
 
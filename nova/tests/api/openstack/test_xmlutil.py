@@ -708,6 +708,96 @@ class TemplateTest(test.NoDBTestCase):
         templ = xmlutil.Template(None)
         self.assertEqual(templ.serialize(None), '')
 
+    def _make_compile_template(self):
+        class NoneTemplateElement(xmlutil.TemplateElement):
+            def will_render(self, datum):
+                return True
+
+        class UpperTemplateElement(xmlutil.TemplateElement):
+            def apply(self, elem, obj):
+                super(UpperTemplateElement, self).apply(elem, obj)
+                elem.text = elem.text.upper()
+
+        root = xmlutil.TemplateElement('test', selector='test', name='name')
+        value = xmlutil.SubTemplateElement(root, 'value', selector='values')
+        value.text = xmlutil.Selector()
+        xmlutil.SubTemplateElement(root, 'empty', selector='empty')
+        attrs = xmlutil.SubTemplateElement(root, 'attrs', selector='attrs')
+        xmlutil.SubTemplateElement(attrs, xmlutil.Selector(0),
+                                   selector=xmlutil.get_items, value=1)
+        missing = NoneTemplateElement('missing', selector='missing')
+        root.append(missing)
+        xmlutil.SubTemplateElement(missing, 'inner', selector='inner')
+        server = xmlutil.SubTemplateElement(root, 'server',
+                                            selector='servers',
+                                            subselector='server', id='id')
+        upper = UpperTemplateElement('name', selector='name')
+        upper.text = xmlutil.Selector()
+        server.append(upper)
+        master = xmlutil.MasterTemplate(root, 1, nsmap=dict(f='foo'))
+
+        root_slave = xmlutil.TemplateElement('test', selector='test',
+                                             name='other')
+        server = xmlutil.SubTemplateElement(root_slave, 'server',
+                                            selector='servers',
+                                            subselector='server',
+                                            status='status')
+        image = xmlutil.SubTemplateElement(server, 'image', selector='image',
+                                           id='id')
+        image.text = 'name'
+        slave = xmlutil.SlaveTemplate(root_slave, 1, nsmap=dict(b='bar'))
+        master.attach(slave)
+        return master
+
+    def test_compile(self):
+        obj = {
+            'test': {
+                'name': 'foobar',
+                'other': 'other',
+                'values': [1, 2, 3],
+                'empty': [],
+                'attrs': {'a': 1, 'b': 2},
+                'servers': [
+                    {'server': {'id': 1, 'name': 'one', 'status': 'ACTIVE',
+                                'image': {'id': 42, 'name': 'cirros'}}},
+                    {'server': {'id': 2, 'name': 'two'}},
+                    ],
+                },
+            }
+        master = self._make_compile_template()
+
+        expected = master._serialize(None, obj, master._siblings(),
+                                     master._nsmap())
+        result = master.make_tree(obj)
+
+        self.assertEqual(etree.tostring(expected), etree.tostring(result))
+        self.assertEqual('other', result.get('name'))
+        self.assertEqual(1, len(result.findall('missing')))
+        self.assertEqual(0, len(result.findall('empty')))
+        self.assertEqual(['ONE', 'TWO'],
+                         [elem.text for elem in result.findall('server/name')])
+        self.assertEqual('cirros', result.find('server/image').text)
+
+    def test_compile_cached(self):
+        master = self._make_compile_template()
+        compiled = master.compile()
+        self.assertEqual(compiled, master.compile())
+
+        # Copies share the compiled template...
+        copy = master.copy()
+        self.assertEqual(compiled, copy.compile())
+
+        # ...until they have different slaves
+        slave = xmlutil.SlaveTemplate(xmlutil.TemplateElement('test'), 1)
+        copy.attach(slave)
+        self.assertNotEqual(compiled, copy.compile())
+        self.assertEqual(compiled, master.compile())
+
+    def test_compile_root_list(self):
+        root = xmlutil.TemplateElement('test', selector='test')
+        master = xmlutil.MasterTemplate(root, 1)
+        self.assertRaises(ValueError, master.make_tree, {'test': [1, 2]})
+
 
 class MasterTemplateBuilder(xmlutil.TemplateBuilder):
     def construct(self):
@@ -747,6 +837,17 @@ class TemplateBuilderTest(test.NoDBTestCase):
         tmpl3 = MasterTemplateBuilder(False)
         self.assertEqual(MasterTemplateBuilder._tmpl, tmpl3)
 
+    def test_preload_templates(self):
+        self.stubs.Set(MasterTemplateBuilder, '_tmpl', None)
+        self.stubs.Set(SlaveTemplateBuilder, '_tmpl', None)
+
+        xmlutil.preload_templates()
+
+        for builder in (MasterTemplateBuilder, SlaveTemplateBuilder):
+            tmpl = builder._tmpl
+            self.assertNotEqual(None, tmpl)
+            self.assertIn((tmpl.root,), tmpl._compiled)
+
     def test_slave_template_builder(self):
         # Make sure the template hasn't been built yet
         self.assertEqual(SlaveTemplateBuilder._tmpl, None)
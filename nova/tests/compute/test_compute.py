@@ -5613,23 +5613,181 @@ class ComputeTestCase(BaseTestCase):
 
         self.compute._reclaim_queued_deletes(ctxt)
 
+    def test_precache_image(self):
+        calls = []
+        threads = []
+
+        def fake_cache_image(context, image_id):
+            calls.append(image_id)
+
+        self.stubs.Set(self.compute.driver, 'cache_image', fake_cache_image)
+        self.stubs.Set(utils, 'spawn_n',
+                       lambda func, *args: threads.append((func, args)))
+
+        self.assertEqual('queued',
+                         self.compute.precache_image(self.context, 'image'))
+        # Asking again while queued doesn't start another download
+        self.assertEqual('queued',
+                         self.compute.precache_image(self.context, 'image'))
+        self.assertEqual(1, len(threads))
+
+        func, args = threads.pop()
+        self.assertEqual('queued',
+                         self.compute.precache_image(self.context, 'image'))
+        func(*args)
+        self.assertEqual(['image'], calls)
+        self.assertEqual('cached',
+                         self.compute.precache_image(self.context, 'image'))
+        self.assertEqual([], threads)
+        self.assertEqual({}, self.compute._image_precache_states)
+
+    def test_precache_image_after_reaped(self):
+        base_files = set()
+        calls = []
+        threads = []
+
+        def fake_cache_image(context, image_id):
+            if image_id not in base_files:
+                calls.append(image_id)
+                base_files.add(image_id)
+
+        self.stubs.Set(self.compute.driver, 'cache_image', fake_cache_image)
+        self.stubs.Set(utils, 'spawn_n',
+                       lambda func, *args: threads.append((func, args)))
+
+        self.compute.precache_image(self.context, 'image')
+        func, args = threads.pop()
+        func(*args)
+        self.assertEqual('cached',
+                         self.compute.precache_image(self.context, 'image'))
+
+        # The image cache manager removes the unused base file
+        base_files.clear()
+
+        self.assertEqual('queued',
+                         self.compute.precache_image(self.context, 'image'))
+        func, args = threads.pop()
+        func(*args)
+        self.assertEqual(['image', 'image'], calls)
+        self.assertEqual('cached',
+                         self.compute.precache_image(self.context, 'image'))
+
+    def test_precache_image_error(self):
+        threads = []
+
+        def fake_cache_image(context, image_id):
+            raise test.TestingException()
+
+        self.stubs.Set(self.compute.driver, 'cache_image', fake_cache_image)
+        self.stubs.Set(utils, 'spawn_n',
+                       lambda func, *args: threads.append((func, args)))
+
+        self.compute.precache_image(self.context, 'bad-image')
+        func, args = threads.pop()
+        func(*args)
+        self.assertEqual('error',
+                         self.compute.precache_image(self.context,
+                                                     'bad-image'))
+        self.assertEqual([], threads)
+
+        # The error was reported, asking again retries the download
+        self.assertEqual('queued',
+                         self.compute.precache_image(self.context,
+                                                     'bad-image'))
+        self.assertEqual(1, len(threads))
+
+    def test_precache_image_unsupported(self):
+        threads = []
+
+        def fake_cache_image(context, image_id):
+            raise NotImplementedError()
+
+        self.stubs.Set(self.compute.driver, 'cache_image', fake_cache_image)
+        self.stubs.Set(utils, 'spawn_n',
+                       lambda func, *args: threads.append((func, args)))
+
+        self.compute.precache_image(self.context, 'image')
+        func, args = threads.pop()
+        func(*args)
+        self.assertEqual('unsupported',
+                         self.compute.precache_image(self.context, 'image'))
+        self.assertEqual([], threads)
+        self.assertEqual({}, self.compute._image_precache_states)
+
     def test_sync_power_states(self):
         ctxt = self.context.elevated()
-        self._create_fake_instance({'host': self.compute.host})
-        self._create_fake_instance({'host': self.compute.host})
-        self.mox.StubOutWithMock(self.compute.driver, 'get_info')
+        instance1 = self._create_fake_instance(
+            {'host': self.compute.host, 'power_state': power_state.RUNNING})
+        instance2 = self._create_fake_instance(
+            {'host': self.compute.host, 'power_state': power_state.RUNNING})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
         self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
-        self.compute.driver.get_info(mox.IgnoreArg()).AndReturn(
-            {'state': power_state.RUNNING})
-        self.compute._sync_instance_power_state(ctxt, mox.IgnoreArg(),
-                                                power_state.RUNNING)
-        self.compute.driver.get_info(mox.IgnoreArg()).AndReturn(
-            {'state': power_state.SHUTDOWN})
-        self.compute._sync_instance_power_state(ctxt, mox.IgnoreArg(),
-                                                power_state.SHUTDOWN)
+        self.compute.driver.list_instance_power_states(
+            mox.IgnoreArg()).AndReturn(
+                {instance1['uuid']: power_state.RUNNING,
+                 instance2['uuid']: power_state.SHUTDOWN})
+        # instance1 is already in sync so only instance2 is looked at
+        self.compute._sync_instance_power_state(
+            ctxt, mox.ContainsKeyValue('uuid', instance2['uuid']),
+            power_state.SHUTDOWN)
         self.mox.ReplayAll()
         self.compute._sync_power_states(ctxt)
 
+    def test_sync_power_states_retries_vm_state_mismatch(self):
+        # The power_state was recorded by an earlier sync, but the stop
+        # call it triggered has not taken effect yet.
+        ctxt = self.context.elevated()
+        instance = self._create_fake_instance(
+            {'host': self.compute.host, 'power_state': power_state.SHUTDOWN})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
+        self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
+        self.compute.driver.list_instance_power_states(
+            mox.IgnoreArg()).AndReturn(
+                {instance['uuid']: power_state.SHUTDOWN})
+        self.compute._sync_instance_power_state(
+            ctxt, mox.ContainsKeyValue('uuid', instance['uuid']),
+            power_state.SHUTDOWN)
+        self.mox.ReplayAll()
+        self.compute._sync_power_states(ctxt)
+
+    def _test_sync_power_states_with_events(self, healthy, times):
+        self.flags(sync_power_state_use_events=True,
+                   sync_power_state_interval=600,
+                   sync_power_state_max_interval=1800)
+        ctxt = self.context.elevated()
+        synced = []
+        self.stubs.Set(self.compute.driver, 'lifecycle_events_healthy',
+                       lambda: healthy)
+        self.stubs.Set(self.compute.driver, 'list_instance_power_states',
+                       lambda instances: synced.append(instances) or {})
+        for now in times:
+            self.stubs.Set(time, 'time', lambda: now)
+            self.compute._sync_power_states(ctxt)
+        return len(synced)
+
+    def test_sync_power_states_backs_off_with_healthy_events(self):
+        # Runs at 0 and 1200 and 3000: the interval doubles after each
+        # reconciliation that finds nothing to fix, up to the maximum.
+        self.assertEqual(3, self._test_sync_power_states_with_events(
+            True, [1000, 1600, 2200, 3000, 4000, 5200]))
+        self.assertEqual(1800, self.compute._power_state_sync_interval)
+
+    def test_sync_power_states_polls_with_unhealthy_events(self):
+        self.assertEqual(3, self._test_sync_power_states_with_events(
+            False, [1000, 1600, 2200]))
+        self.assertEqual(600, self.compute._power_state_sync_interval)
+
+    def test_adjust_power_state_sync_interval_on_drift(self):
+        self.flags(sync_power_state_interval=600,
+                   sync_power_state_max_interval=1800)
+        self.compute._power_state_sync_interval = 1200
+        self.compute._adjust_power_state_sync_interval(0)
+        self.assertEqual(1800, self.compute._power_state_sync_interval)
+        self.compute._adjust_power_state_sync_interval(2)
+        self.assertEqual(600, self.compute._power_state_sync_interval)
+
     def _test_lifecycle_event(self, lifecycle_event, power_state):
         instance = self._create_fake_instance()
         uuid = instance['uuid']
@@ -8128,6 +8286,24 @@ class ComputeAPITestCase(BaseTestCase):
         self.assertEqual(expected,
                          self.compute_api.get_instance_bdms({}, instance))
 
+    def test_get_instances_bdms(self):
+        new_bdm = object()
+        legacy_bdm = object()
+
+        self.mox.StubOutWithMock(self.compute_api.db,
+                       'block_device_mapping_get_all_by_instance_uuids')
+        self.compute_api.db.block_device_mapping_get_all_by_instance_uuids(
+            mox.IgnoreArg(), ['fake-instance']).AndReturn(
+                {'fake-instance': new_bdm})
+        self.mox.StubOutWithMock(block_device, 'legacy_mapping')
+        block_device.legacy_mapping(new_bdm).AndReturn(legacy_bdm)
+        self.mox.ReplayAll()
+
+        instances = [{'uuid': 'fake-instance'}]
+
+        self.assertEqual({'fake-instance': legacy_bdm},
+                         self.compute_api.get_instances_bdms({}, instances))
+
 
 def fake_rpc_method(context, topic, msg, do_cast=True):
     pass
@@ -106,6 +106,18 @@ class ComputeHostAPITestCase(test.TestCase):
                           self.host_api.get_host_uptime, self.ctxt,
                           'fake_host')
 
+    def test_precache_image(self):
+        self._mock_assert_host_exists()
+        self._mock_rpc_call(
+                {'method': 'precache_image',
+                 'namespace': None,
+                 'args': {'image_id': 'fake-image'},
+                 'version': '2.48'})
+        self.mox.ReplayAll()
+        result = self.host_api.precache_image(self.ctxt, 'fake_host',
+                                              'fake-image')
+        self.assertEqual('fake-result', result)
+
     def test_host_power_action(self):
         self._mock_assert_host_exists()
         self._mock_rpc_call(
@@ -517,6 +517,77 @@ class TrackerTestCase(BaseTrackerTestCase):
         self.assertEqual(0, self.tracker.compute_node['current_workload'])
         self._assert('{}', 'pci_stats')
 
+    def test_update_pushes_only_changed_values(self):
+        pushed = []
+
+        def fake_compute_node_update(ctx, compute_node_id, values,
+                                     prune_stats=False):
+            pushed.append(dict(values))
+            return self._fake_compute_node_update(ctx, compute_node_id,
+                                                  values, prune_stats)
+
+        self.stubs.Set(db, 'compute_node_update', fake_compute_node_update)
+        self.tracker.compute_node['stats'] = self.tracker.stats
+        self.tracker._update(self.context, self.tracker.compute_node)
+        del pushed[:]
+
+        # Nothing changed, the update is still made to bump updated_at
+        self.tracker.compute_node['stats'] = self.tracker.stats
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual([{}], pushed)
+        del pushed[:]
+
+        self.tracker.compute_node['stats'] = self.tracker.stats
+        self.tracker.compute_node['memory_mb_used'] += 1
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual(1, len(pushed))
+        self.assertEqual(['memory_mb_used'], pushed[0].keys())
+
+    def test_skipped_audit_still_pushes(self):
+        self.flags(resource_tracker_full_audit_interval=3600)
+        pushed = []
+
+        def fake_compute_node_update(ctx, compute_node_id, values,
+                                     prune_stats=False):
+            pushed.append(dict(values))
+            return self._fake_compute_node_update(ctx, compute_node_id,
+                                                  values, prune_stats)
+
+        self.stubs.Set(db, 'compute_node_update', fake_compute_node_update)
+        self.stubs.Set(self.tracker.driver, 'get_num_instances', lambda: 0)
+
+        # The audit in setUp is recent so this one is skipped
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual([{}], pushed)
+
+    def test_incremental_audit(self):
+        self.flags(resource_tracker_full_audit_interval=3600)
+        audits = []
+        num_instances = [0]
+
+        def fake_get_available_resource(nodename):
+            audits.append(nodename)
+            return FakeVirtDriver().get_available_resource(nodename)
+
+        self.stubs.Set(self.tracker.driver, 'get_available_resource',
+                       fake_get_available_resource)
+        self.stubs.Set(self.tracker.driver, 'get_num_instances',
+                       lambda: num_instances[0])
+
+        # The audit in setUp is recent and nothing drifted
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(0, len(audits))
+
+        # An instance appeared on the hypervisor without a claim
+        num_instances[0] = 1
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(1, len(audits))
+
+        num_instances[0] = 0
+        self.tracker._last_full_audit -= 3600
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(2, len(audits))
+
 
 class TrackerPciStatsTestCase(BaseTrackerTestCase):
 
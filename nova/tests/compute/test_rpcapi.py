@@ -361,6 +361,10 @@ class ComputeRpcAPITestCase(test.TestCase):
     def test_get_host_uptime(self):
         self._test_compute_api('get_host_uptime', 'call', host='host')
 
+    def test_precache_image(self):
+        self._test_compute_api('precache_image', 'call', image_id='id',
+                host='host', version='2.48')
+
     def test_backup_instance(self):
         self._test_compute_api('backup_instance', 'cast',
                 instance=self.fake_instance, image_id='id',
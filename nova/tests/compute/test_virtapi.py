@@ -83,6 +83,12 @@ class VirtAPIBaseTest(test.NoDBTestCase, test.APICoverage):
         self.assertExpected('block_device_mapping_update',
                             'fake_bdm', 'fake_values')
 
+    def test_action_event_start(self):
+        self.assertExpected('action_event_start', {'event': 'fake'})
+
+    def test_action_event_finish(self):
+        self.assertExpected('action_event_finish', {'event': 'fake'})
+
 
 class FakeVirtAPITest(VirtAPIBaseTest):
 
@@ -3073,6 +3073,25 @@ class FixedIPTestCase(BaseInstanceTypeTestCase):
             [FIXED_IP_ADDRESS_1, FIXED_IP_ADDRESS_2],
             [ips_list[0].address, ips_list[1].address])
 
+    def test_fixed_ip_get_by_address_pattern(self):
+        instance_uuid = self._create_instance()
+        vif = db.virtual_interface_create(
+            self.ctxt, dict(instance_uuid=instance_uuid))
+
+        for address in ['192.168.1.5', '192.168.1.50', '192.168.2.5']:
+            db.fixed_ip_create(self.ctxt, dict(
+                virtual_interface_id=vif.id, instance_uuid=instance_uuid,
+                address=address))
+        # Not allocated to an instance
+        db.fixed_ip_create(self.ctxt, dict(address='192.168.1.51'))
+
+        ips = db.fixed_ip_get_by_address_pattern(self.ctxt, '192.168.1.5%')
+        self._assertEqualListsOfPrimitivesAsSets(
+            ['192.168.1.5', '192.168.1.50'], [ip['address'] for ip in ips])
+
+        ips = db.fixed_ip_get_by_address_pattern(self.ctxt, '192.168.2.5')
+        self.assertEqual(['192.168.2.5'], [ip['address'] for ip in ips])
+
     def test_fixed_ips_by_virtual_interface_no_ip_found(self):
         instance_uuid = self._create_instance()
 
@@ -3751,6 +3770,28 @@ class FloatingIpTestCase(test.TestCase, ModelsObjectComparatorMixin):
                                                            fixed_addr)
             self.assertEqual(float_addr, float_ip[0]['address'])
 
+    def test_floating_ip_get_by_address_pattern(self):
+        fixed_float = [
+            ('1.1.1.1', '2.2.2.1'),
+            ('1.1.1.2', '2.2.2.12'),
+            ('1.1.1.3', '2.2.3.1')
+        ]
+
+        for fixed_addr, float_addr in fixed_float:
+            self._create_floating_ip({'address': float_addr})
+            self._create_fixed_ip({'address': fixed_addr})
+            db.floating_ip_fixed_ip_associate(self.ctxt, float_addr,
+                                              fixed_addr, 'some_host')
+        # Not associated with a fixed ip
+        self._create_floating_ip({'address': '2.2.2.13'})
+
+        float_ips = db.floating_ip_get_by_address_pattern(self.ctxt,
+                                                          '2.2.2.1%')
+        self.assertEqual(
+            set([('2.2.2.1', '1.1.1.1'), ('2.2.2.12', '1.1.1.2')]),
+            set((ip['address'], ip['fixed_ip']['address'])
+                for ip in float_ips))
+
     def test_floating_ip_get_by_fixed_ip_id(self):
         fixed_float = [
             ('1.1.1.1', '2.2.2.1'),
@@ -4090,6 +4131,139 @@ class VolumeUsageDBApiTestCase(test.TestCase):
             self.assertEqual(vol_usage[key], value, key)
 
 
+class ProjectUsageTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ProjectUsageTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.day = datetime.datetime(2013, 10, 1)
+        # Running since the day before
+        self._create_instance('project1', -12, None)
+        # Running for 12 hours on the day
+        self._create_instance('project1', 6, 18)
+        # Terminated before the day
+        self._create_instance('project2', -12, -1)
+        # Launched the day after
+        self._create_instance('project3', 30, None)
+
+    def _create_instance(self, project_id, launched_at, terminated_at):
+        values = {'project_id': project_id,
+                  'launched_at': self._hours(launched_at),
+                  'terminated_at': self._hours(terminated_at),
+                  'vcpus': 2,
+                  'memory_mb': 512,
+                  'root_gb': 1,
+                  'ephemeral_gb': 2}
+        return db.instance_create(self.ctxt, values)
+
+    def _hours(self, hours):
+        if hours is None:
+            return None
+        return self.day + datetime.timedelta(hours=hours)
+
+    def _usage(self, hours):
+        return {'hours': hours,
+                'vcpus_hours': hours * 2,
+                'memory_mb_hours': hours * 512,
+                'local_gb_hours': hours * 3}
+
+    def _rollup(self, day):
+        usages = db.instance_usage_get_by_window(
+            self.ctxt, day, day + datetime.timedelta(days=1))
+        db.project_usage_rollup_create(self.ctxt, day, usages)
+
+    def test_instance_usage_get_by_window(self):
+        usages = db.instance_usage_get_by_window(self.ctxt, self.day,
+                                                 self._hours(24))
+        self.assertEqual({'project1': self._usage(36.0)}, usages)
+
+        usages = db.instance_usage_get_by_window(self.ctxt, self._hours(-6),
+                                                 self._hours(36))
+        self.assertEqual({'project1': self._usage(54.0),
+                          'project2': self._usage(5.0),
+                          'project3': self._usage(6.0)}, usages)
+
+    def test_project_usage_get_by_window_without_rollups(self):
+        self.assertEqual(
+            db.instance_usage_get_by_window(self.ctxt, self._hours(-6),
+                                            self._hours(36)),
+            db.project_usage_get_by_window(self.ctxt, self._hours(-6),
+                                           self._hours(36)))
+
+    def test_project_usage_get_by_window(self):
+        self._rollup(self._hours(-24))
+        self._rollup(self.day)
+        expected = db.instance_usage_get_by_window(self.ctxt, self._hours(-6),
+                                                   self._hours(36))
+
+        # Usage added to a day rolled up isn't seen anymore
+        self._create_instance('project4', 1, 2)
+        self.assertEqual(expected,
+                         db.project_usage_get_by_window(self.ctxt,
+                                                        self._hours(-6),
+                                                        self._hours(36)))
+
+        # But it is for days which haven't been
+        self._create_instance('project4', 25, 27)
+        expected['project4'] = self._usage(2.0)
+        self.assertEqual(expected,
+                         db.project_usage_get_by_window(self.ctxt,
+                                                        self._hours(-6),
+                                                        self._hours(36)))
+
+    def test_project_usage_rollup_get_next_day(self):
+        self.assertEqual(self._hours(-24),
+                         db.project_usage_rollup_get_next_day(self.ctxt))
+        self._rollup(self._hours(-24))
+        self._rollup(self.day)
+        self.assertEqual(self._hours(24),
+                         db.project_usage_rollup_get_next_day(self.ctxt))
+
+    def test_project_usage_rollup_get_next_day_deleted_instances(self):
+        for instance in db.instance_get_all(self.ctxt):
+            db.instance_destroy(self.ctxt, instance['uuid'])
+        self.assertEqual(self._hours(-24),
+                         db.project_usage_rollup_get_next_day(self.ctxt))
+
+    def test_project_usage_rollup_get_next_day_after(self):
+        for instance in db.instance_get_all(self.ctxt):
+            if instance['terminated_at'] is None:
+                db.instance_update(self.ctxt, instance['uuid'],
+                                   {'terminated_at': self._hours(40)})
+        self._create_instance('project1', 24 * 5 + 3, None)
+
+        # Days without any instance active are skipped
+        self.assertEqual(self._hours(24 * 5),
+                         db.project_usage_rollup_get_next_day(
+                             self.ctxt, after=self._hours(48)))
+        self.assertEqual(self._hours(24 * 6),
+                         db.project_usage_rollup_get_next_day(
+                             self.ctxt, after=self._hours(24 * 6)))
+
+    def test_project_usage_rollup_get_next_day_nothing_active(self):
+        for instance in db.instance_get_all(self.ctxt):
+            if instance['terminated_at'] is None:
+                db.instance_update(self.ctxt, instance['uuid'],
+                                   {'terminated_at': self._hours(40)})
+        self.assertEqual(None, db.project_usage_rollup_get_next_day(
+            self.ctxt, after=self._hours(48)))
+
+    def test_project_usage_get_by_window_not_admin(self):
+        ctxt = context.RequestContext('fake-user', 'project1')
+        self.assertEqual(
+            db.instance_usage_get_by_window(self.ctxt, self.day,
+                                            self._hours(24)),
+            db.project_usage_get_by_window(ctxt, self.day, self._hours(24)))
+
+    def test_project_usage_rollup_create_twice(self):
+        self._rollup(self.day)
+        db.project_usage_rollup_create(self.ctxt, self.day,
+                                       {'project1': self._usage(1.0)})
+        usages = db.project_usage_get_by_window(self.ctxt, self.day,
+                                                self._hours(24))
+        self.assertEqual({'project1': self._usage(36.0)}, usages)
+
+
 class TaskLogTestCase(test.TestCase):
 
     def setUp(self):
@@ -4314,6 +4488,28 @@ class BlockDeviceMappingTestCase(test.TestCase):
         bmd = db.block_device_mapping_get_all_by_instance(self.ctxt, uuid2)
         self.assertEqual(len(bmd), 2)
 
+    def test_block_device_mapping_get_all_by_instance_uuids(self):
+        uuid1 = self.instance['uuid']
+        uuid2 = db.instance_create(self.ctxt, {})['uuid']
+        uuid3 = db.instance_create(self.ctxt, {})['uuid']
+
+        for values in [{'instance_uuid': uuid1, 'device_name': 'first'},
+                       {'instance_uuid': uuid2, 'device_name': 'second'},
+                       {'instance_uuid': uuid2, 'device_name': 'third'}]:
+            self._create_bdm(values)
+
+        bdms = db.block_device_mapping_get_all_by_instance_uuids(
+            self.ctxt, [uuid1, uuid2, uuid3])
+        self.assertEqual(['first'], [bdm['device_name']
+                                     for bdm in bdms[uuid1]])
+        self.assertEqual(set(['second', 'third']),
+                         set(bdm['device_name'] for bdm in bdms[uuid2]))
+        self.assertEqual([], bdms[uuid3])
+
+    def test_block_device_mapping_get_all_by_instance_uuids_empty(self):
+        self.assertEqual({}, db.block_device_mapping_get_all_by_instance_uuids(
+            self.ctxt, []))
+
     def test_block_device_mapping_destroy(self):
         bdm = self._create_bdm({})
         db.block_device_mapping_destroy(self.ctxt, bdm['id'])
@@ -6011,6 +6207,14 @@ class Ec2TestCase(test.TestCase):
         inst_id = db.get_ec2_instance_id_by_uuid(self.ctxt, 'fake-uuid')
         self.assertEqual(inst['id'], inst_id)
 
+    def test_get_ec2_instance_ids_by_uuids(self):
+        inst1 = db.ec2_instance_create(self.ctxt, 'fake-uuid1')
+        inst2 = db.ec2_instance_create(self.ctxt, 'fake-uuid2')
+        inst_ids = db.get_ec2_instance_ids_by_uuids(
+            self.ctxt, ['fake-uuid1', 'fake-uuid2', 'uuid-not-present'])
+        self.assertEqual({'fake-uuid1': inst1['id'],
+                          'fake-uuid2': inst2['id']}, inst_ids)
+
     def test_get_instance_uuid_by_ec2_id(self):
         inst = db.ec2_instance_create(self.ctxt, 'fake-uuid')
         inst_uuid = db.get_instance_uuid_by_ec2_id(self.ctxt, inst['id'])
@@ -3033,6 +3033,37 @@ class TestNovaMigrations(BaseMigrationTestCase, CommonTestsMixIn):
                 else:
                     self.assertNotIn((name, columns), index_data)
 
+    def _216(self, engine):
+        for table_name in ('project_usage_rollups',
+                           'shadow_project_usage_rollups'):
+            self.assertRaises(sqlalchemy.exc.NoSuchTableError,
+                              db_utils.get_table, engine, table_name)
+
+    def _pre_upgrade_216(self, engine):
+        self._216(engine)
+
+    def _check_216(self, engine, data):
+        rollups = db_utils.get_table(engine, 'project_usage_rollups')
+        fake_rollup = {'project_id': 'fake',
+                       'day': datetime.datetime(2013, 10, 1),
+                       'hours': 24.0,
+                       'vcpus_hours': 48.0,
+                       'memory_mb_hours': 12288.0,
+                       'local_gb_hours': 72.0,
+                       'deleted': 0}
+        engine.execute(rollups.insert(), fake_rollup)
+        result = rollups.select().execute().fetchall()
+        self.assertEqual(1, len(result))
+        self.assertEqual(48.0, result[0]['vcpus_hours'])
+        self.assertRaises(sqlalchemy.exc.IntegrityError,
+                          engine.execute, rollups.insert(), fake_rollup)
+
+        self.assertTrue(db_utils.check_shadow_table(engine,
+                                                    'project_usage_rollups'))
+
+    def _post_downgrade_216(self, engine):
+        self._216(engine)
+
 
 class TestBaremetalMigrations(BaseMigrationTestCase, CommonTestsMixIn):
     """Test sqlalchemy-migrate migrations."""
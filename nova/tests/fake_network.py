@@ -15,6 +15,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import re
+
 from oslo.config import cfg
 
 from nova.compute import api as compute_api
@@ -110,13 +112,16 @@ class FakeNetworkManager(network_manager.NetworkManager):
 
         fixed_ips = [dict(id=100,
                           address='172.16.0.1',
-                          virtual_interface_id=0),
+                          virtual_interface_id=0,
+                          instance_uuid=vifs[0]['instance_uuid']),
                      dict(id=200,
                           address='172.16.0.2',
-                          virtual_interface_id=1),
+                          virtual_interface_id=1,
+                          instance_uuid=vifs[1]['instance_uuid']),
                      dict(id=210,
                           address='173.16.0.2',
-                          virtual_interface_id=2)]
+                          virtual_interface_id=2,
+                          instance_uuid=vifs[2]['instance_uuid'])]
 
         def fixed_ip_get_by_instance(self, context, instance_uuid):
             return [dict(address='10.0.0.0'), dict(address='10.0.0.1'),
@@ -155,6 +160,23 @@ class FakeNetworkManager(network_manager.NetworkManager):
         def fixed_ip_disassociate(self, context, address):
             return True
 
+        @staticmethod
+        def _address_like(address, pattern):
+            regex = ''.join('.*' if char == '%' else
+                            '.' if char == '_' else
+                            re.escape(char) for char in pattern)
+            return re.match(regex + '$', address)
+
+        def fixed_ip_get_by_address_pattern(self, context, pattern):
+            return [ip for ip in self.fixed_ips
+                    if self._address_like(ip['address'], pattern)]
+
+        def floating_ip_get_by_address_pattern(self, context, pattern):
+            fixed_ips = dict((ip['id'], ip) for ip in self.fixed_ips)
+            return [dict(ip, fixed_ip=fixed_ips[ip['fixed_ip_id']])
+                    for ip in self.floating_ips
+                    if self._address_like(ip['address'], pattern)]
+
     def __init__(self):
         self.db = self.FakeDB()
         self.deallocate_called = None
@@ -204,6 +204,7 @@ policy_data = """
     "compute_extension:v3:os-hosts": "rule:admin_api",
     "compute_extension:hypervisors": "",
     "compute_extension:v3:os-hypervisors": "rule:admin_api",
+    "compute_extension:image_precache": "",
     "compute_extension:image_size": "",
     "compute_extension:instance_actions": "",
     "compute_extension:v3:os-instance-actions": "",
@@ -376,6 +376,14 @@
             "namespace": "http://docs.openstack.org/compute/ext/hosts/api/v1.1",
             "updated": "%(timestamp)s"
         },
+        {
+            "alias": "os-image-precache",
+            "description": "%(text)s",
+            "links": [],
+            "name": "ImagePrecache",
+            "namespace": "http://docs.openstack.org/compute/ext/image-precache/api/v2",
+            "updated": "%(timestamp)s"
+        },
         {
             "alias": "os-services",
             "description": "%(text)s",
@@ -0,0 +1,8 @@
+{
+    "precache": {
+        "image_id": "%(image_id)s",
+        "hosts": [
+            "%(host_name)s"
+        ]
+    }
+}
@@ -0,0 +1,4 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<precache image_id="%(image_id)s">
+    <host>%(host_name)s</host>
+</precache>
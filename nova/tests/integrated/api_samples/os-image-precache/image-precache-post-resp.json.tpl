@@ -0,0 +1,11 @@
+{
+    "precache": {
+        "hosts": [
+            {
+                "host": "%(host_name)s",
+                "state": "queued"
+            }
+        ],
+        "image_id": "%(image_id)s"
+    }
+}
@@ -383,6 +383,23 @@ class HostsSampleXmlTest(HostsSampleJsonTest):
     ctype = 'xml'
 
 
+class ImagePrecacheSampleJsonTest(ApiSampleTestBaseV2):
+    extension_name = ("nova.api.openstack.compute.contrib.image_precache."
+                      "Image_precache")
+
+    def test_image_precache(self):
+        subs = {'image_id': fake.get_valid_image_id(),
+                'host_name': self.compute.host}
+        response = self._do_post('os-image-precache',
+                                 'image-precache-post-req', subs)
+        subs.update(self._get_regexes())
+        self._verify_response('image-precache-post-resp', subs, response, 200)
+
+
+class ImagePrecacheSampleXmlTest(ImagePrecacheSampleJsonTest):
+    ctype = 'xml'
+
+
 class FlavorsSampleAllExtensionJsonTest(FlavorsSampleJsonTest):
     all_extensions = True
 
@@ -2256,8 +2273,8 @@ class ExtendedVolumesSampleJsonTests(ServersSampleBase):
 
     def test_detail(self):
         uuid = self._post_server()
-        self.stubs.Set(db, 'block_device_mapping_get_all_by_instance',
-                       fakes.stub_bdm_get_all_by_instance)
+        self.stubs.Set(db, 'block_device_mapping_get_all_by_instance_uuids',
+                       fakes.stub_bdm_get_all_by_instance_uuids)
         response = self._do_get('servers/detail')
         subs = self._get_regexes()
         subs['id'] = uuid
@@ -1655,6 +1655,35 @@ class CommonNetworkTestCase(test.TestCase):
         self.assertEqual(res[0]['instance_uuid'], _vifs[1]['instance_uuid'])
         self.assertEqual(res[1]['instance_uuid'], _vifs[2]['instance_uuid'])
 
+    def test_get_instance_uuids_by_floating_ip_regex(self):
+        manager = fake_network.FakeNetworkManager()
+        _vifs = manager.db.virtual_interface_get_all(None)
+        fake_context = context.RequestContext('user', 'project')
+
+        res = manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                      {'ip': '173.16.1.2'})
+        self.assertEqual([{'instance_uuid': _vifs[2]['instance_uuid'],
+                           'ip': '173.16.1.2'}], res)
+
+        # Instances matched by their fixed ip aren't listed again
+        res = manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                      {'ip': '172.16.'})
+        self.assertEqual(['172.16.0.1', '172.16.0.2'],
+                         [r['ip'] for r in res])
+
+    def test_ip_filter_address_pattern(self):
+        for ip_filter, pattern in [('10.0.0.1', '10_0_0_1%'),
+                                   ('^10\\.0\\.0\\.1$', '10.0.0.1'),
+                                   ('172.16.0.*', '172_16_0%'),
+                                   ('10.0.0.1?', '10_0_0_%'),
+                                   ('10.0.[12]', '10_0_%'),
+                                   ('.*', '%'),
+                                   ('10.0.0.1|10.0.0.2', '%'),
+                                   ('fe80::1', 'fe80::1%')]:
+            self.assertEqual(pattern,
+                             network_manager._ip_filter_address_pattern(
+                                 ip_filter))
+
     def test_get_instance_uuids_by_ipv6_regex(self):
         manager = fake_network.FakeNetworkManager()
         _vifs = manager.db.virtual_interface_get_all(None)
@@ -99,6 +99,18 @@ class TestSubclassedObject(RandomMixInWithNoFields, MyObj):
     fields = {'new_field': str}
 
 
+class MyCompactObj(base.NovaPersistentObject, base.NovaObject):
+    obj_compact_storage = True
+    __slots__ = ('_cached',)
+    fields = {'foo': int,
+              'bar': str,
+              }
+
+
+class MyCompactSubObj(MyCompactObj):
+    fields = {'baz': int}
+
+
 class TestMetaclass(test.TestCase):
     def test_obj_tracking(self):
 
@@ -671,6 +683,66 @@ class TestObjectListBase(test.TestCase):
                          [y.foo for y in obj2])
 
 
+class TestCompactStorage(test.TestCase):
+    def test_slots(self):
+        self.assertIn('_foo', MyCompactObj.__slots__)
+        self.assertIn('_created_at', MyCompactObj.__slots__)
+        self.assertIn('_cached', MyCompactObj.__slots__)
+        self.assertIn('_context', MyCompactObj.__slots__)
+        self.assertEqual(('_baz',), MyCompactSubObj.__slots__)
+        self.assertFalse(hasattr(MyObj, '__slots__'))
+
+    def test_fields_not_in_dict(self):
+        obj = MyCompactSubObj()
+        obj.foo = 1
+        obj.baz = 2
+        obj._cached = 'meow'
+        self.assertEqual({}, getattr(obj, '__dict__', {}))
+        self.assertEqual(1, obj.foo)
+        self.assertEqual(2, obj.baz)
+        self.assertFalse(obj.obj_attr_is_set('bar'))
+
+    def test_changes(self):
+        obj = MyCompactSubObj()
+        self.assertEqual(set(), obj.obj_what_changed())
+        obj.foo = 1
+        obj.baz = 2
+        self.assertEqual(set(['foo', 'baz']), obj.obj_what_changed())
+        obj.obj_reset_changes(['foo', 'nonexistent'])
+        self.assertEqual(set(['baz']), obj.obj_what_changed())
+        obj.obj_reset_changes()
+        self.assertEqual(set(), obj.obj_what_changed())
+
+    def test_primitive_round_trip(self):
+        obj = MyCompactSubObj()
+        obj.foo = 1
+        obj.bar = 'bar'
+        obj.obj_reset_changes()
+        obj.baz = 3
+        primitive = obj.obj_to_primitive()
+        self.assertEqual({'foo': 1, 'bar': 'bar', 'baz': 3},
+                         primitive['nova_object.data'])
+        self.assertEqual(['baz'], primitive['nova_object.changes'])
+        obj2 = base.NovaObject.obj_from_primitive(primitive)
+        self.assertTrue(isinstance(obj2, MyCompactSubObj))
+        self.assertEqual(3, obj2.baz)
+        self.assertEqual(set(['baz']), obj2.obj_what_changed())
+
+    def test_clone(self):
+        obj = MyCompactSubObj()
+        obj.foo = 1
+        obj.baz = 2
+        obj.obj_reset_changes(['foo'])
+        obj2 = obj.obj_clone()
+        self.assertFalse(obj is obj2)
+        self.assertEqual(1, obj2.foo)
+        self.assertEqual(2, obj2.baz)
+        self.assertFalse(obj2.obj_attr_is_set('bar'))
+        self.assertEqual(set(['baz']), obj2.obj_what_changed())
+        obj2.foo = 5
+        self.assertEqual(1, obj.foo)
+
+
 class TestObjectSerializer(_BaseTestCase):
     def test_serialize_entity_primitive(self):
         ser = base.NovaObjectSerializer()
@@ -19,6 +19,8 @@
 Tests For Scheduler
 """
 
+import datetime
+
 import mox
 from oslo.config import cfg
 
@@ -35,6 +37,7 @@ from nova.image import glance
 from nova import notifier as notify
 from nova.objects import instance as instance_obj
 from nova.openstack.common.rpc import common as rpc_common
+from nova.openstack.common import timeutils
 from nova.scheduler import driver
 from nova.scheduler import manager
 from nova import servicegroup
@@ -97,6 +100,40 @@ class SchedulerManagerTestCase(test.NoDBTestCase):
                 service_name=service_name, host=host,
                 capabilities=capabilities)
 
+    def test_rollup_project_usage(self):
+        self.flags(project_usage_rollup_max_days=2)
+        timeutils.set_time_override(datetime.datetime(2013, 10, 5, 12))
+        self.addCleanup(timeutils.clear_time_override)
+        days = [datetime.datetime(2013, 10, day) for day in range(1, 6)]
+        usage = {'project1': {'hours': 24.0}}
+
+        self.mox.StubOutWithMock(db, 'project_usage_rollup_get_next_day')
+        self.mox.StubOutWithMock(db, 'instance_usage_get_by_window')
+        self.mox.StubOutWithMock(db, 'project_usage_rollup_create')
+        db.project_usage_rollup_get_next_day(self.context).AndReturn(days[0])
+        # A day without usage counts towards the maximum, and the idle
+        # days after it are skipped
+        db.instance_usage_get_by_window(self.context, days[0],
+                                        days[1]).AndReturn({})
+        db.project_usage_rollup_get_next_day(
+            self.context, after=days[1]).AndReturn(days[2])
+        db.instance_usage_get_by_window(self.context, days[2],
+                                        days[3]).AndReturn(usage)
+        db.project_usage_rollup_create(self.context, days[2], usage)
+        self.mox.ReplayAll()
+        self.manager._rollup_project_usage(self.context)
+
+    def test_rollup_project_usage_up_to_date(self):
+        timeutils.set_time_override(datetime.datetime(2013, 10, 5, 12))
+        self.addCleanup(timeutils.clear_time_override)
+
+        self.mox.StubOutWithMock(db, 'project_usage_rollup_get_next_day')
+        self.mox.StubOutWithMock(db, 'instance_usage_get_by_window')
+        db.project_usage_rollup_get_next_day(self.context).AndReturn(
+            datetime.datetime(2013, 10, 5))
+        self.mox.ReplayAll()
+        self.manager._rollup_project_usage(self.context)
+
     def test_update_service_multiple_capabilities(self):
         service_name = 'fake_service'
         host = 'fake_host'
@@ -232,3 +232,31 @@ class AvailabilityZoneTestCases(test.TestCase):
 
         self.assertEqual(self.availability_zone,
                 az.get_instance_availability_zone(self.context, fake_inst))
+
+    def test_get_instances_availability_zones(self):
+        """Test get availability zones of many instances in bulk."""
+        host = 'host180'
+        service = self._create_service_with_topic('compute', host)
+        self._add_to_aggregate(service, self.agg)
+
+        insts = [fakes.stub_instance(181, host=host,
+                                     uuid=fakes.get_fake_uuid(181)),
+                 fakes.stub_instance(182, host=host,
+                                     uuid=fakes.get_fake_uuid(182)),
+                 fakes.stub_instance(183, host='host184',
+                                     uuid=fakes.get_fake_uuid(183)),
+                 fakes.stub_instance(185, host='',
+                                     uuid=fakes.get_fake_uuid(185))]
+
+        # Both hosts are looked up with one query, not one each
+        az.reset_cache()
+        self.mox.StubOutWithMock(az, 'get_host_availability_zone')
+        self.mox.ReplayAll()
+        zones = az.get_instances_availability_zones(self.context, insts)
+
+        self.assertEqual({insts[0]['uuid']: self.availability_zone,
+                          insts[1]['uuid']: self.availability_zone,
+                          insts[2]['uuid']: self.default_az,
+                          insts[3]['uuid']: None}, zones)
+        self.assertEqual(self.default_az,
+                az.get_instance_availability_zone(self.context, insts[2]))
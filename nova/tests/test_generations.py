@@ -0,0 +1,35 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for generation markers."""
+
+from nova import generations
+from nova import test
+
+
+class GenerationsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(GenerationsTestCase, self).setUp()
+        generations.reset_cache()
+        self.addCleanup(generations.reset_cache)
+
+    def test_get_stable(self):
+        self.assertEqual(generations.get(generations.FLAVORS),
+                         generations.get(generations.FLAVORS))
+
+    def test_bump(self):
+        flavors = generations.get(generations.FLAVORS)
+        services = generations.get(generations.SERVICES)
+        generations.bump(generations.FLAVORS)
+        self.assertNotEqual(flavors, generations.get(generations.FLAVORS))
+        self.assertEqual(services, generations.get(generations.SERVICES))
@@ -18,8 +18,16 @@
 Unit Tests for nova.manager
 """
 
+import random
+
+from eventlet import event
+
+from nova import context
 from nova import manager
+from nova.openstack.common import periodic_task
+from nova import rpcstats
 from nova import test
+from nova.tests import fake_notifier
 
 
 class ManagerTestCase(test.NoDBTestCase):
@@ -33,3 +41,120 @@ class ManagerTestCase(test.NoDBTestCase):
 
         self.assertEqual(len(dispatch.callbacks), 3)
         self.assertTrue(api in dispatch.callbacks)
+
+    def test_dispatcher_topic(self):
+        m = manager.Manager(service_name='fake-service')
+        dispatch = m.create_rpc_dispatcher()
+        self.assertEqual('fake-service', dispatch.topic)
+
+    def test_emit_rpc_dispatch_stats(self):
+        fake_notifier.stub_notifier(self.stubs)
+        self.addCleanup(fake_notifier.reset)
+        self.addCleanup(rpcstats.STATS.reset)
+        rpcstats.STATS.reset()
+        rpcstats.STATS.record('fake', 'ping', 0.2, lag=0.02)
+
+        m = manager.Manager(service_name='fake-service')
+        ctxt = context.get_admin_context()
+        m._emit_rpc_dispatch_stats(ctxt)
+        self.assertEqual(0, len(fake_notifier.NOTIFICATIONS))
+
+        self.flags(rpc_dispatch_stats=True)
+        m._emit_rpc_dispatch_stats(ctxt)
+        self.assertEqual(1, len(fake_notifier.NOTIFICATIONS))
+        msg = fake_notifier.NOTIFICATIONS[0]
+        self.assertEqual('rpc.dispatch.stats', msg.event_type)
+        methods = msg.payload['methods']
+        self.assertEqual(1, len(methods))
+        self.assertEqual(1, methods[0]['lag_count'])
+        self.assertEqual(1, methods[0]['duration_buckets'][3])
+
+    def test_periodic_tasks_skip_overlapping_runs(self):
+        self.flags(periodic_task_max_concurrency=2)
+        started = event.Event()
+        release = event.Event()
+
+        class MyManager(manager.Manager):
+            @periodic_task.periodic_task
+            def _slow_task(self, context):
+                started.send()
+                release.wait()
+
+        m = MyManager()
+        ctxt = context.get_admin_context()
+        m.periodic_tasks(ctxt)
+        started.wait()
+        # The first run is still in progress, so this one is skipped
+        m.periodic_tasks(ctxt)
+        release.send()
+        m._periodic_pool.waitall()
+
+        stats = m.get_periodic_task_stats()['_slow_task']
+        self.assertEqual(1, stats['runs'])
+        self.assertEqual(1, stats['skipped'])
+        self.assertFalse(m._periodic_running)
+
+    def test_periodic_task_overrun(self):
+        class MyManager(manager.Manager):
+            @periodic_task.periodic_task(spacing=10, run_immediately=True)
+            def _task(self, context):
+                pass
+
+        m = MyManager()
+        m.periodic_tasks(context.get_admin_context())
+        m._record_periodic_task_run('_task', 12.5)
+
+        stats = m.get_periodic_task_stats()['_task']
+        self.assertEqual(2, stats['runs'])
+        self.assertEqual(1, stats['overruns'])
+        self.assertEqual(12.5, stats['last_duration'])
+        self.assertEqual(12.5, stats['max_duration'])
+
+    def test_periodic_task_initial_jitter(self):
+        self.flags(periodic_task_initial_jitter=30)
+        self.stubs.Set(random, 'uniform', lambda low, high: high)
+
+        class MyManager(manager.Manager):
+            @periodic_task.periodic_task(spacing=60, run_immediately=True)
+            def _task(self, context):
+                pass
+
+        m = MyManager()
+        idle_for = m.periodic_tasks(context.get_admin_context())
+        self.assertEqual(0, m.get_periodic_task_stats()['_task']['runs'])
+        self.assertTrue(29 < idle_for <= 30)
+
+    def test_print_rpc_dispatch_stats(self):
+        printed = []
+        self.stubs.Set(manager.pprint, 'pprint', printed.append)
+        self.addCleanup(rpcstats.STATS.reset)
+        rpcstats.STATS.reset()
+        rpcstats.STATS.record('fake', 'ping', 0.2)
+        rpcstats.STATS.record('fake', 'pong', 0.5)
+
+        manager.print_rpc_dispatch_stats()
+        self.assertEqual(rpcstats.get_stats(), printed)
+
+    def test_print_image_downloads(self):
+        printed = []
+        self.stubs.Set(manager.pprint, 'pprint', printed.append)
+        modules = dict(manager.sys.modules)
+        modules.pop('nova.virt.libvirt.imagedownload', None)
+        # Nothing is printed unless the libvirt driver is in use
+        self.stubs.Set(manager.sys, 'modules', modules)
+        manager.print_image_downloads()
+        self.assertEqual([], printed)
+
+        downloads = [{'target': '/base/image', 'state': 'downloading'}]
+
+        class FakeCoordinator(object):
+            def get_downloads(self):
+                return downloads
+
+        class FakeImageDownload(object):
+            def get_coordinator(self):
+                return FakeCoordinator()
+
+        modules['nova.virt.libvirt.imagedownload'] = FakeImageDownload()
+        manager.print_image_downloads()
+        self.assertEqual(downloads, printed)
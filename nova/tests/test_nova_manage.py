@@ -20,6 +20,7 @@ import StringIO
 import sys
 
 from nova.cmd import manage
+from nova.compute import utils as compute_utils
 from nova import context
 from nova import db
 from nova import exception
@@ -392,6 +393,22 @@ class DBCommandsTestCase(test.TestCase):
     def test_archive_deleted_rows_negative(self):
         self.assertEqual(1, self.commands.archive_deleted_rows(-1))
 
+    def test_rollup_usage(self):
+        self.flags(project_usage_rollup_max_days=10)
+        calls = []
+
+        def fake_rollup(ctxt, max_days):
+            calls.append(max_days)
+            return max_days
+
+        self.stubs.Set(compute_utils, 'rollup_project_usage', fake_rollup)
+        self.commands.rollup_usage()
+        self.commands.rollup_usage('5')
+        self.assertEqual([10, 5], calls)
+
+    def test_rollup_usage_negative(self):
+        self.assertEqual(1, self.commands.rollup_usage(0))
+
 
 class ServiceCommandsTestCase(test.TestCase):
     def setUp(self):
@@ -146,6 +146,107 @@ class PolicyTestCase(test.NoDBTestCase):
         policy.enforce(admin_context, lowercase_action, self.target)
         policy.enforce(admin_context, uppercase_action, self.target)
 
+    def test_enforce_remembers_decisions(self):
+        checked = []
+        real_check = policy._check
+
+        def fake_check(action, target, credentials):
+            checked.append(target)
+            return real_check(action, target, credentials)
+        self.stubs.Set(policy, '_check', fake_check)
+
+        action = "example:my_file"
+        policy.enforce(self.context, action,
+                       {'project_id': 'fake', 'name': 'one'})
+        policy.enforce(self.context, action,
+                       {'project_id': 'fake', 'name': 'two'})
+        self.assertEqual(1, len(checked))
+
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'project_id': 'another'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, {'project_id': 'another'})
+        self.assertEqual(2, len(checked))
+
+        other_context = context.RequestContext('fake', 'fake',
+                                               roles=['compute_admin'])
+        policy.enforce(other_context, action, {'project_id': 'another'})
+        self.assertEqual(3, len(checked))
+
+    def test_enforce_decisions_reset_with_rules(self):
+        action = "example:allowed"
+        policy.enforce(self.context, action, self.target)
+        self.policy.set_rules({action: '!'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, self.target)
+
+    def test_enforce_http_not_remembered(self):
+        responses = ["True", "False"]
+
+        def fakeurlopen(url, post_data):
+            return StringIO.StringIO(responses.pop(0))
+        self.stubs.Set(urllib2, 'urlopen', fakeurlopen)
+        action = "example:get_http"
+        policy.enforce(self.context, action, self.target)
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action, self.target)
+
+    def test_compiled_rules_match_checks(self):
+        self.policy.set_rules({
+            "admin": "role:admin or is_admin:True",
+            "owner": "project_id:%(project_id)s",
+            "example:rule": "rule:admin or (rule:owner and not role:dunce)",
+            "example:list": [["role:admin"], ["user_id:fake", "rule:owner"]],
+            "example:missing": "rule:noexist",
+            "example:owner_first": "rule:owner or role:admin",
+            "example:no_cred": "user:%(user_id)s or role:admin",
+        })
+        contexts = [
+            self.context,
+            context.RequestContext('fake', 'fake', roles=['dunce']),
+            context.RequestContext('other', 'fake', roles=['Admin']),
+            context.RequestContext('other', 'other', is_admin=True),
+        ]
+        targets = [{'project_id': 'fake'}, {'project_id': 'other'}, {}]
+        for action in ("example:rule", "example:list", "example:missing",
+                       "example:owner_first", "example:no_cred"):
+            for ctxt in contexts:
+                for target in targets:
+                    creds = ctxt.to_dict()
+                    self.assertEqual(
+                        common_policy.check(action, target, creds),
+                        policy.enforce(ctxt, action, target, False))
+
+    def test_enforce_unusual_target_keys(self):
+        checked = []
+        real_check = policy._check
+
+        def fake_check(action, target, credentials):
+            checked.append(target)
+            return real_check(action, target, credentials)
+        self.stubs.Set(policy, '_check', fake_check)
+
+        action = "example:dashed"
+        self.policy.set_rules(
+            {action: "project_id:%(first)s%(last-part)s"})
+        policy.enforce(self.context, action,
+                       {'first': 'fa', 'last-part': 'ke'})
+        # Decisions depend on both keys, not just the first one
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, action,
+                          {'first': 'fa', 'last-part': 'll'})
+        self.assertEqual(2, len(checked))
+
+    def test_enforce_missing_target_key_fails_closed(self):
+        action = "example:missing_key"
+        self.policy.set_rules({action: "user:%(user_id)s or role:admin"})
+        admin_context = context.RequestContext('admin', 'fake',
+                                               roles=['admin'])
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          admin_context, action, {})
+        self.assertFalse(common_policy.check(action, {},
+                                             admin_context.to_dict()))
+
 
 class DefaultPolicyTestCase(test.NoDBTestCase):
 
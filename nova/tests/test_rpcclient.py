@@ -0,0 +1,125 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the async calls of nova.rpcclient."""
+
+import eventlet
+
+from nova import context
+from nova.openstack.common import rpc
+from nova.openstack.common.rpc import common as rpc_common
+from nova import rpcclient
+from nova import test
+
+
+class GatherTestCase(test.NoDBTestCase):
+
+    def _future(self, result, delay=0):
+        def func():
+            eventlet.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        return rpcclient.CallFuture(func)
+
+    def test_gather_order(self):
+        # The first future completes last
+        futures = [self._future(1, 0.03), self._future(2, 0.02),
+                   self._future(3)]
+        self.assertEqual([1, 2, 3], rpcclient.gather(futures))
+
+    def test_gather_raises_first_failure(self):
+        completed = []
+
+        def func():
+            eventlet.sleep(0.01)
+            completed.append(True)
+            return 3
+
+        futures = [self._future(1), self._future(ValueError('first')),
+                   self._future(KeyError('second')),
+                   rpcclient.CallFuture(func)]
+        exc = self.assertRaises(ValueError, rpcclient.gather, futures)
+        self.assertEqual('first', str(exc))
+        # The failure is raised once all of the futures are done
+        self.assertEqual([True], completed)
+
+    def test_gather_return_exceptions(self):
+        error = ValueError('failed')
+        futures = [self._future(1), self._future(error), self._future(3)]
+        self.assertEqual([1, error, 3],
+                         rpcclient.gather(futures, return_exceptions=True))
+
+    def test_ready(self):
+        future = self._future(1, 0.01)
+        self.assertFalse(future.ready())
+        self.assertEqual(1, future.result())
+        self.assertTrue(future.ready())
+
+
+class CallAsyncTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(CallAsyncTestCase, self).setUp()
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.proxy = rpcclient.RpcProxy('fake_topic', '1.0')
+        self.sent = []
+
+    def _stub_multicall(self, replies):
+        def fake_multicall(ctxt, topic, msg, timeout):
+            self.sent.append((topic, msg, timeout))
+            return replies
+
+        self.stubs.Set(rpc, 'multicall', fake_multicall)
+
+    def test_call_async(self):
+        self._stub_multicall(iter(['partial', 'last']))
+        client = self.proxy.get_client().prepare(server='host', version='1.1',
+                                                 timeout=5)
+
+        future = client.call_async(self.context, 'fake_method', arg=1)
+
+        # The message is sent before call_async() returns
+        self.assertEqual(1, len(self.sent))
+        topic, msg, timeout = self.sent[0]
+        self.assertEqual('fake_topic.host', topic)
+        self.assertEqual('fake_method', msg['method'])
+        self.assertEqual({'arg': 1}, msg['args'])
+        self.assertEqual('1.1', msg['version'])
+        self.assertEqual(5, timeout)
+        self.assertEqual('last', future.result())
+
+    def test_call_async_timeout(self):
+        def replies():
+            raise rpc_common.Timeout()
+            yield
+
+        self._stub_multicall(replies())
+        future = self.proxy.call_async(
+            self.context, self.proxy.make_msg('fake_method'))
+
+        exc = self.assertRaises(rpc_common.Timeout, future.result)
+        self.assertEqual('fake_topic', exc.topic)
+        self.assertEqual('fake_method', exc.method)
+
+    def test_call_async_remote_error(self):
+        def replies():
+            raise rpc_common.RemoteError('FakeError', 'failed')
+            yield
+
+        self._stub_multicall(replies())
+        futures = [self.proxy.call_async(self.context,
+                                         self.proxy.make_msg('fake_method'))]
+
+        results = rpcclient.gather(futures, return_exceptions=True)
+        self.assertIsInstance(results[0], rpc_common.RemoteError)
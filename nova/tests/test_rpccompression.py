@@ -0,0 +1,112 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the compression of large rpc arguments and return values."""
+
+from nova import exception
+from nova.objects import base as objects_base
+from nova.openstack.common.rpc import serializer as rpc_serializer
+from nova import rpcclient
+from nova import rpccompression
+from nova import test
+
+
+class RpcCompressionTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(RpcCompressionTestCase, self).setUp()
+        self.flags(rpc_compression='zlib', rpc_compression_threshold=100)
+        self.large = {'key': 'x' * 200, 'list': [1, 2, 3]}
+
+    def test_round_trip(self):
+        compressed = rpccompression.compress(self.large)
+        self.assertTrue(rpccompression.is_compressed(compressed))
+        self.assertEqual('zlib', compressed['nova_compressed.codec'])
+        self.assertEqual(self.large, rpccompression.decompress(compressed))
+
+    def test_below_threshold(self):
+        small = {'key': 'value'}
+        self.assertEqual(small, rpccompression.compress(small))
+
+    def test_disabled(self):
+        self.flags(rpc_compression='none')
+        self.assertEqual(self.large, rpccompression.compress(self.large))
+
+    def test_decompress_when_disabled(self):
+        # Values compressed by an upgraded sender are still understood
+        compressed = rpccompression.compress(self.large)
+        self.flags(rpc_compression='none')
+        self.assertEqual(self.large, rpccompression.decompress(compressed))
+
+    def test_already_compressed(self):
+        compressed = rpccompression.compress(self.large)
+        self.assertEqual(compressed, rpccompression.compress(compressed))
+
+    def test_decompress_uncompressed(self):
+        for thing in (1, 'foo', [1, 2], {'foo': 'bar'}, None):
+            self.assertEqual(thing, rpccompression.decompress(thing))
+
+    def test_decompress_unknown_codec(self):
+        compressed = rpccompression.compress(self.large)
+        compressed['nova_compressed.codec'] = 'bogus'
+        self.assertRaises(exception.UnsupportedRpcCompression,
+                          rpccompression.decompress, compressed)
+
+    def test_compress_unknown_codec(self):
+        self.flags(rpc_compression='bogus')
+        self.assertRaises(exception.UnsupportedRpcCompression,
+                          rpccompression.compress, self.large)
+
+    def test_check_config(self):
+        rpccompression.check_config()
+        self.flags(rpc_compression='none')
+        rpccompression.check_config()
+
+    def test_check_config_unknown_codec(self):
+        self.flags(rpc_compression='bogus')
+        self.assertRaises(exception.UnsupportedRpcCompression,
+                          rpccompression.check_config)
+
+    def test_check_config_codec_not_installed(self):
+        self.stubs.Set(rpccompression, '_CODECS',
+                       {'zlib': rpccompression._CODECS['zlib']})
+        self.flags(rpc_compression='lz4')
+        self.assertRaises(exception.UnsupportedRpcCompression,
+                          rpccompression.check_config)
+
+    def test_object_serializer(self):
+        ser = objects_base.NovaObjectSerializer()
+        compressed = ser.serialize_entity(None, self.large)
+        self.assertTrue(rpccompression.is_compressed(compressed))
+        self.assertEqual(self.large, ser.deserialize_entity(None, compressed))
+
+    def test_object_serializer_compresses_top_level_only(self):
+        ser = objects_base.NovaObjectSerializer()
+        compressed = ser.serialize_entity(None, [self.large, self.large])
+        self.assertTrue(rpccompression.is_compressed(compressed))
+        decompressed = rpccompression.decompress(compressed)
+        self.assertEqual([self.large, self.large], decompressed)
+
+    def test_decompressing_serializer(self):
+        ser = rpccompression.DecompressingSerializer(
+            rpc_serializer.NoOpSerializer())
+        compressed = rpccompression.compress(self.large)
+        # Only NovaObjectSerializer compresses
+        self.assertEqual(self.large, ser.serialize_entity(None, self.large))
+        self.assertEqual(self.large, ser.deserialize_entity(None, compressed))
+
+    def test_rpc_proxy_decompresses(self):
+        proxy = rpcclient.RpcProxy('fake_topic', '1.0')
+        compressed = rpccompression.compress(self.large)
+        self.assertEqual(self.large,
+                         proxy.serializer.deserialize_entity(None,
+                                                             compressed))
@@ -0,0 +1,153 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the rpc connection pool warm-up and health checks."""
+
+import time
+
+from oslo.config import cfg
+
+from nova.openstack.common import rpc
+from nova import rpcpool
+from nova import test
+
+CONF = cfg.CONF
+
+
+class FakeBroker(object):
+    def __init__(self):
+        self.connected = True
+        self.transport = object()
+
+
+class FakeQpidBroker(object):
+    def __init__(self, opened):
+        self._opened = opened
+
+    def opened(self):
+        return self._opened
+
+
+class FakeConnection(object):
+    pool = None
+    fail = 0
+
+    def __init__(self, conf):
+        if FakeConnection.fail:
+            FakeConnection.fail -= 1
+            raise test.TestingException()
+        self.connection = FakeBroker()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeImpl(object):
+    Connection = FakeConnection
+
+
+class RpcPoolTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(RpcPoolTestCase, self).setUp()
+        self.flags(rpc_conn_pool_size=5, rpc_conn_pool_min_size=2)
+        self.stubs.Set(FakeConnection, 'pool', None)
+        self.stubs.Set(FakeConnection, 'fail', 0)
+        self.pool = rpcpool.Pool(CONF, FakeConnection)
+
+    def test_warm_up(self):
+        self.pool.warm_up()
+        self.assertEqual(2, self.pool.current_size)
+        self.assertEqual(2, len(self.pool.free_items))
+        self.assertEqual(2, self.pool.connections_created)
+
+        # Already warm
+        self.pool.warm_up()
+        self.assertEqual(2, self.pool.connections_created)
+
+    def test_warm_up_max_size(self):
+        self.pool.warm_up(10)
+        self.assertEqual(5, self.pool.current_size)
+
+    def test_warm_up_failure(self):
+        FakeConnection.fail = 1
+        self.pool.warm_up()
+        self.assertEqual(1, self.pool.current_size)
+        self.assertEqual(1, len(self.pool.free_items))
+
+    def test_check_health(self):
+        self.pool.warm_up()
+        dead = self.pool.free_items[0]
+        dead.connection.connected = False
+
+        self.pool.check_health()
+
+        self.assertTrue(dead.closed)
+        self.assertNotIn(dead, self.pool.free_items)
+        self.assertEqual(1, self.pool.connections_evicted)
+        # The pool was topped back up
+        self.assertEqual(2, self.pool.current_size)
+        self.assertEqual(3, self.pool.connections_created)
+
+    def test_check_health_leaves_connections_in_use(self):
+        self.pool.warm_up()
+        in_use = self.pool.get()
+        in_use.connection.connected = False
+
+        self.pool.check_health()
+
+        self.assertFalse(in_use.closed)
+        self.assertEqual(0, self.pool.connections_evicted)
+
+    def test_get_stats(self):
+        now = time.time()
+        self.stubs.Set(time, 'time', lambda: now)
+        self.pool.warm_up(5)
+        self.pool.get()
+
+        stats = self.pool.get_stats()
+        self.assertEqual(5, stats['size'])
+        self.assertEqual(4, stats['free'])
+        self.assertEqual(1, stats['in_use'])
+        self.assertEqual(5, stats['created'])
+        self.assertEqual(0, stats['evicted'])
+        # 5 connections averaged over the five minute window
+        self.assertEqual(1.0, stats['created_per_minute'])
+
+        self.stubs.Set(time, 'time',
+                       lambda: now + rpcpool.Pool.CREATION_RATE_WINDOW + 1)
+        self.assertEqual(0.0, self.pool.get_stats()['created_per_minute'])
+
+    def test_is_healthy(self):
+        connection = FakeConnection(CONF)
+        self.assertTrue(rpcpool._is_healthy(connection))
+        connection.connection.connected = False
+        self.assertFalse(rpcpool._is_healthy(connection))
+        connection.connection = FakeQpidBroker(True)
+        self.assertTrue(rpcpool._is_healthy(connection))
+        connection.connection = FakeQpidBroker(False)
+        self.assertFalse(rpcpool._is_healthy(connection))
+        connection.connection = None
+        self.assertFalse(rpcpool._is_healthy(connection))
+
+    def test_setup(self):
+        self.stubs.Set(rpc, '_get_impl', lambda: FakeImpl)
+        self.stubs.Set(rpcpool.Pool, 'start', lambda self: None)
+        rpcpool.setup()
+        self.assertIsInstance(FakeConnection.pool, rpcpool.Pool)
+
+    def test_setup_disabled(self):
+        self.flags(rpc_conn_pool_min_size=0)
+        self.stubs.Set(rpc, '_get_impl', lambda: FakeImpl)
+        rpcpool.setup()
+        self.assertEqual(None, FakeConnection.pool)
@@ -0,0 +1,93 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the rpc dispatch stats."""
+
+from oslo.config import cfg
+
+from nova import context
+from nova.openstack.common import rpc
+from nova.openstack.common.rpc import amqp as rpc_amqp
+from nova import rpcclient
+from nova import rpcstats
+from nova import test
+
+CONF = cfg.CONF
+
+
+class FakeAPI(object):
+    def ping(self, ctxt, arg):
+        return arg
+
+    def fail(self, ctxt):
+        raise test.TestingException()
+
+
+class RpcStatsTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(RpcStatsTestCase, self).setUp()
+        self.flags(rpc_dispatch_stats=True)
+        self.addCleanup(rpcstats.STATS.reset)
+        rpcstats.STATS.reset()
+        self.context = context.get_admin_context()
+        self.dispatcher = rpcstats.RpcDispatcher([FakeAPI()], topic='fake')
+
+    def _unpacked_context(self, msg):
+        rpc_amqp.pack_context(msg, self.context)
+        return rpc_amqp.unpack_context(CONF, msg)
+
+    def test_dispatch_records_stats(self):
+        self.assertEqual('pong', self.dispatcher.dispatch(
+            self.context, '1.0', 'ping', None, arg='pong'))
+        self.assertRaises(test.TestingException, self.dispatcher.dispatch,
+                          self.context, '1.0', 'fail', None)
+
+        stats = dict((entry['method'], entry)
+                     for entry in rpcstats.get_stats())
+        self.assertEqual('fake', stats['ping']['topic'])
+        self.assertEqual(1, stats['ping']['count'])
+        self.assertEqual(0, stats['ping']['failures'])
+        self.assertEqual(0, stats['ping']['lag_count'])
+        self.assertEqual(1, stats['fail']['failures'])
+
+    def test_dispatch_records_lag(self):
+        msg = {'method': 'ping', 'args': {'arg': 'pong'}}
+        rpcstats.add_send_time(msg)
+        ctxt = self._unpacked_context(msg)
+
+        self.dispatcher.dispatch(ctxt, '1.0', 'ping', None, arg='pong')
+
+        self.assertEqual(1, rpcstats.get_stats()[0]['lag_count'])
+        # The send time is not passed on with the context
+        self.assertNotIn('sent_at', ctxt.to_dict())
+
+    def test_disabled(self):
+        self.flags(rpc_dispatch_stats=False)
+        msg = {'method': 'ping', 'args': {'arg': 'pong'}}
+        rpcstats.add_send_time(msg)
+        self.assertEqual({'method': 'ping', 'args': {'arg': 'pong'}}, msg)
+
+        self.dispatcher.dispatch(self.context, '1.0', 'ping', None,
+                                 arg='pong')
+        self.assertEqual([], rpcstats.get_stats())
+
+    def test_rpc_proxy_adds_send_time(self):
+        sent = []
+        self.stubs.Set(rpc, 'cast',
+                       lambda ctxt, topic, msg: sent.append(msg))
+        proxy = rpcclient.RpcProxy('fake_topic', '1.0')
+        proxy.cast(self.context, proxy.make_msg('ping', arg='pong'))
+
+        ctxt = self._unpacked_context(sent[0])
+        self.dispatcher.dispatch(ctxt, '1.0', 'ping', None, arg='pong')
+        self.assertEqual(1, rpcstats.get_stats()[0]['lag_count'])
@@ -26,10 +26,12 @@ import testtools
 import mox
 from oslo.config import cfg
 
+from nova.api.openstack import xmlutil
 from nova import context
 from nova import db
 from nova import exception
 from nova import manager
+from nova import policy
 from nova import service
 from nova import test
 from nova.tests import utils
@@ -45,6 +47,8 @@ test_service_opts = [
     cfg.IntOpt("test_service_listen_port",
                default=0,
                help="Port number to bind test service to"),
+    cfg.IntOpt("test_service_workers",
+               help="Number of workers for test service"),
     ]
 
 CONF = cfg.CONF
@@ -173,6 +177,14 @@ class ServiceTestCase(test.TestCase):
                                'nova.tests.test_service.FakeManager')
         serv.start()
 
+    def test_start_unsupported_rpc_compression(self):
+        self.flags(rpc_compression='bogus')
+        serv = service.Service(self.host,
+                               self.binary,
+                               self.topic,
+                               'nova.tests.test_service.FakeManager')
+        self.assertRaises(SystemExit, serv.start)
+
 
 class TestWSGIService(test.TestCase):
 
@@ -195,6 +207,29 @@ class TestWSGIService(test.TestCase):
         self.assertNotEqual(0, test_service.port)
         test_service.stop()
 
+    def test_service_workers_preload(self):
+        self.flags(test_service_workers=2, wsgi_worker_max_requests=100,
+                   wsgi_worker_max_requests_jitter=10)
+        self.mox.StubOutWithMock(policy, 'init')
+        self.mox.StubOutWithMock(xmlutil, 'preload_templates')
+        policy.init()
+        xmlutil.preload_templates()
+        self.mox.ReplayAll()
+
+        test_service = service.WSGIService("test_service")
+        self.assertEqual(2, test_service.workers)
+        self.assertEqual(100, test_service.server._max_requests)
+        self.assertEqual(10, test_service.server._max_requests_jitter)
+
+    def test_service_no_workers_no_recycle(self):
+        self.flags(wsgi_worker_max_requests=100)
+        self.mox.StubOutWithMock(policy, 'init')
+        self.mox.StubOutWithMock(xmlutil, 'preload_templates')
+        self.mox.ReplayAll()
+
+        test_service = service.WSGIService("test_service")
+        self.assertEqual(None, test_service.server._max_requests)
+
 
 class TestLauncher(test.TestCase):
 
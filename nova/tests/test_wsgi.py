@@ -19,6 +19,7 @@
 """Unit tests for `nova.wsgi`."""
 
 import os.path
+import random
 import tempfile
 import testtools
 
@@ -131,6 +132,63 @@ class TestWSGIServer(test.NoDBTestCase):
         server.stop()
         server.wait()
 
+    def test_pool_size(self):
+        self.flags(wsgi_default_pool_size=10)
+        server = nova.wsgi.Server("test_pool_size", None)
+        self.assertEqual(10, server._pool.size)
+        server = nova.wsgi.Server("test_pool_size", None, pool_size=20)
+        self.assertEqual(20, server._pool.size)
+
+    def test_max_requests(self):
+        def hello_world(env, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return ['hello']
+
+        server = nova.wsgi.Server("test_max_requests", hello_world,
+                                  host="127.0.0.1", max_requests=2)
+        server.start()
+        uri = "http://127.0.0.1:%d/" % server.port
+
+        resp = requests.get(uri)
+        self.assertEqual('hello', resp.text)
+        self.assertNotIn('close', resp.headers.get('connection', ''))
+        resp = requests.get(uri)
+        self.assertEqual('hello', resp.text)
+        self.assertIn('close', resp.headers.get('connection', ''))
+
+        # The server stopped by itself after the second request
+        server.wait()
+        self.assertEqual(2, server._requests)
+
+    def test_max_requests_http10_keep_alive(self):
+        def hello_world(env, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain'),
+                                      ('Content-Length', '5')])
+            return ['hello']
+
+        server = nova.wsgi.Server("test_max_requests", hello_world,
+                                  host="127.0.0.1", max_requests=1)
+        server.start()
+
+        cli = eventlet.connect(("127.0.0.1", server.port))
+        cli.sendall('GET / HTTP/1.0\r\nConnection: keep-alive\r\n\r\n')
+        # The server closes the connection instead of keeping it alive
+        response = cli.makefile().read()
+        self.assertIn('Connection: close', response)
+        self.assertNotIn('keep-alive', response)
+        self.assertTrue(response.endswith('hello'))
+        server.wait()
+
+    def test_max_requests_jitter(self):
+        self.stubs.Set(random.SystemRandom, 'randint',
+                       lambda self, low, high: high)
+        server = nova.wsgi.Server("test_max_requests", None,
+                                  host="127.0.0.1", max_requests=2,
+                                  max_requests_jitter=3)
+        server.start()
+        self.assertEqual(5, server._requests_limit)
+        server.stop()
+
 
 class TestWSGIServerWithSSL(test.NoDBTestCase):
     """WSGI server with SSL tests."""
@@ -106,7 +106,7 @@ def get_disk_type(path):
     return disk_type
 
 
-def copy_image(src, dest):
+def copy_image(src, dest, host=None, reflink=False):
     pass
 
 
@@ -118,10 +118,26 @@ def create_lvm_image(vg, lv, size, sparse=False):
     pass
 
 
+def create_lvm_thin_volume(vg, pool, lv, size):
+    pass
+
+
+def create_lvm_thin_snapshot(vg, origin, lv):
+    pass
+
+
+def extend_logical_volume(path, size):
+    pass
+
+
 def import_rbd_image(path, *args):
     pass
 
 
+def clone_rbd_image(src, dest, *args):
+    pass
+
+
 def volume_group_free_space(vg):
     pass
 
@@ -130,6 +146,10 @@ def remove_logical_volumes(*paths):
     pass
 
 
+def remove_thin_volume(vg, lv):
+    pass
+
+
 def write_to_file(path, contents, umask=None):
     pass
 
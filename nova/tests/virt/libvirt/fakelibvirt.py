@@ -582,6 +582,9 @@ class Connection(object):
     def listDomainsID(self):
         return self._running_vms.keys()
 
+    def listAllDomains(self, flags):
+        return self._vms.values()
+
     def lookupByID(self, id):
         if id in self._running_vms:
             return self._running_vms[id]
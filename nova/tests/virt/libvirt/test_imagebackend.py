@@ -170,7 +170,21 @@ class RawTestCase(_ImageTestCase, test.NoDBTestCase):
     def test_create_image(self):
         fn = self.prepare_mocks()
         fn(target=self.TEMPLATE_PATH, image_id=None)
-        imagebackend.libvirt_utils.copy_image(self.TEMPLATE_PATH, self.PATH)
+        imagebackend.libvirt_utils.copy_image(self.TEMPLATE_PATH, self.PATH,
+                                              reflink=False)
+        self.mox.ReplayAll()
+
+        image = self.image_class(self.INSTANCE, self.NAME)
+        image.create_image(fn, self.TEMPLATE_PATH, None, image_id=None)
+
+        self.mox.VerifyAll()
+
+    def test_create_image_reflink(self):
+        self.flags(libvirt_images_reflink=True)
+        fn = self.prepare_mocks()
+        fn(target=self.TEMPLATE_PATH, image_id=None)
+        imagebackend.libvirt_utils.copy_image(self.TEMPLATE_PATH, self.PATH,
+                                              reflink=True)
         self.mox.ReplayAll()
 
         image = self.image_class(self.INSTANCE, self.NAME)
@@ -191,7 +205,8 @@ class RawTestCase(_ImageTestCase, test.NoDBTestCase):
     def test_create_image_extend(self):
         fn = self.prepare_mocks()
         fn(target=self.TEMPLATE_PATH, image_id=None)
-        imagebackend.libvirt_utils.copy_image(self.TEMPLATE_PATH, self.PATH)
+        imagebackend.libvirt_utils.copy_image(self.TEMPLATE_PATH, self.PATH,
+                                              reflink=False)
         imagebackend.disk.extend(self.PATH, self.SIZE, use_cow=False)
         self.mox.ReplayAll()
 
@@ -440,6 +455,51 @@ class LvmTestCase(_ImageTestCase, test.NoDBTestCase):
         self.flags(libvirt_sparse_logical_volumes=True)
         self._create_image_resize(True)
 
+    def _create_image_thin(self, base_exists):
+        self.flags(libvirt_images_lvm_thin_pool='FakePool')
+        fn = self.prepare_mocks()
+        self.mox.StubOutWithMock(self.libvirt_utils, 'list_logical_volumes')
+        self.mox.StubOutWithMock(self.libvirt_utils,
+                                 'create_lvm_thin_volume')
+        self.mox.StubOutWithMock(self.libvirt_utils,
+                                 'create_lvm_thin_snapshot')
+        self.mox.StubOutWithMock(self.libvirt_utils, 'logical_volume_size')
+        self.mox.StubOutWithMock(self.libvirt_utils, 'extend_logical_volume')
+        base_lv = '_base_%s' % self.TEMPLATE
+        base_path = os.path.join('/dev', self.VG, base_lv)
+
+        fn(target=self.TEMPLATE_PATH)
+        if base_exists:
+            self.libvirt_utils.list_logical_volumes(self.VG).AndReturn(
+                [base_lv])
+        else:
+            self.libvirt_utils.list_logical_volumes(self.VG).AndReturn([])
+            self.disk.get_disk_size(self.TEMPLATE_PATH).AndReturn(
+                self.TEMPLATE_SIZE)
+            self.libvirt_utils.create_lvm_thin_volume(
+                self.VG, 'FakePool', base_lv, self.TEMPLATE_SIZE)
+            cmd = ('qemu-img', 'convert', '-O', 'raw', self.TEMPLATE_PATH,
+                   base_path)
+            self.utils.execute(*cmd, run_as_root=True)
+        self.libvirt_utils.create_lvm_thin_snapshot(self.VG, base_lv,
+                                                    self.LV)
+        self.libvirt_utils.logical_volume_size(self.PATH).AndReturn(
+            self.TEMPLATE_SIZE)
+        self.libvirt_utils.extend_logical_volume(self.PATH, self.SIZE)
+        self.disk.resize2fs(self.PATH, run_as_root=True)
+        self.mox.ReplayAll()
+
+        image = self.image_class(self.INSTANCE, self.NAME)
+        image.create_image(fn, self.TEMPLATE_PATH, self.SIZE)
+
+        self.mox.VerifyAll()
+
+    def test_create_image_thin(self):
+        self._create_image_thin(False)
+
+    def test_create_image_thin_base_exists(self):
+        self._create_image_thin(True)
+
     def test_create_image_negative(self):
         fn = self.prepare_mocks()
         fn(target=self.TEMPLATE_PATH)
@@ -602,6 +662,77 @@ class RbdTestCase(_ImageTestCase, test.NoDBTestCase):
 
         self.mox.VerifyAll()
 
+    def _stub_clone(self, disk_format, url):
+        self.flags(libvirt_images_rbd_clone=True)
+        self.rbd.RBD_FEATURE_LAYERING = 1
+        image = self.image_class(self.INSTANCE, self.NAME, rbd=self.rbd)
+        self.mox.StubOutWithMock(image, 'check_image_exists')
+        self.mox.StubOutWithMock(imagebackend.images, 'get_image_locations')
+        self.mox.StubOutWithMock(self.utils, 'execute')
+        self.mox.StubOutWithMock(self.libvirt_utils, 'clone_rbd_image')
+        image.check_image_exists().AndReturn(False)
+        imagebackend.images.get_image_locations(
+            'fake-context', 'fake-image').AndReturn(
+                ({'disk_format': disk_format}, [url]))
+        return image
+
+    def test_create_image_clone(self):
+        image = self._stub_clone(
+            'raw', 'rbd://fake-fsid/images/fake-image/snap')
+        self.utils.execute('ceph', 'fsid', '--id', self.USER,
+                           '--conf', self.CONF).AndReturn(('fake-fsid\n', ''))
+        rbd_name = "%s/%s" % (self.INSTANCE['name'], self.NAME)
+        self.libvirt_utils.clone_rbd_image(
+            'images/fake-image@snap', '%s/%s' % (self.POOL, rbd_name),
+            '--id', self.USER, '--conf', self.CONF)
+        self.mox.ReplayAll()
+
+        fn = self.mox.CreateMockAnything()
+        image.create_image(fn, self.TEMPLATE_PATH, None,
+                           context='fake-context', image_id='fake-image')
+
+        self.mox.VerifyAll()
+
+    def test_create_image_clone_other_cluster(self):
+        image = self._stub_clone(
+            'raw', 'rbd://other-fsid/images/fake-image/snap')
+        self.utils.execute('ceph', 'fsid', '--id', self.USER,
+                           '--conf', self.CONF).AndReturn(('fake-fsid\n', ''))
+        self.mox.StubOutWithMock(os.path, 'exists')
+        os.path.exists(self.TEMPLATE_PATH).AndReturn(True)
+        self.mox.ReplayAll()
+
+        fn = self.mox.CreateMockAnything()
+        image.create_image(fn, self.TEMPLATE_PATH, None,
+                           context='fake-context', image_id='fake-image')
+
+        self.mox.VerifyAll()
+
+    def test_create_image_clone_not_raw(self):
+        image = self._stub_clone(
+            'qcow2', 'rbd://fake-fsid/images/fake-image/snap')
+        self.mox.StubOutWithMock(os.path, 'exists')
+        os.path.exists(self.TEMPLATE_PATH).AndReturn(False)
+        fn = self.mox.CreateMockAnything()
+        fn(target=self.TEMPLATE_PATH, context='fake-context',
+           image_id='fake-image')
+        self.mox.ReplayAll()
+
+        image.create_image(fn, self.TEMPLATE_PATH, None,
+                           context='fake-context', image_id='fake-image')
+
+        self.mox.VerifyAll()
+
+    def test_parse_location(self):
+        parse = self.image_class._parse_location
+        self.assertEqual(['fsid', 'pool', 'image', 'snap'],
+                         parse('rbd://fsid/pool/image/snap'))
+        self.assertEqual(['fsid', 'pool', 'im/age', 'snap'],
+                         parse('rbd://fsid/pool/im%2Fage/snap'))
+        self.assertEqual(None, parse('rbd://fsid/pool/image'))
+        self.assertEqual(None, parse('rbd://fsid//image/snap'))
+        self.assertEqual(None, parse('file:///images/image'))
+
     def test_prealloc_image(self):
         CONF.set_override('preallocate_images', 'space')
 
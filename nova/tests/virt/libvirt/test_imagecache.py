@@ -16,6 +16,7 @@
 #    under the License.
 
 
+import collections
 import contextlib
 import cStringIO
 import hashlib
@@ -160,6 +161,48 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
                                 '10737418240')
         self.assertFalse(unexpected in image_cache_manager.originals)
 
+    def test_list_base_images_cached(self):
+        self.flags(base_dir_listing_max_age=600)
+        listings = []
+
+        def fake_listdir(path):
+            listings.append(path)
+            return ['e97222e91fc4241f49a7f520d1dcf446751129b3']
+
+        self.stubs.Set(os, 'listdir', fake_listdir)
+        self.stubs.Set(os.path, 'isfile', lambda x: True)
+        stat = collections.namedtuple('stat', 'st_mtime st_ctime st_nlink')
+        dir_stat = [stat(1000, 1000, 2)]
+        self.stubs.Set(os, 'stat', lambda x: dir_stat[0])
+        now = [1000000]
+        self.stubs.Set(time, 'time', lambda: now[0])
+
+        base_dir = '/var/lib/nova/instances/_base'
+        image_cache_manager = imagecache.ImageCacheManager()
+
+        def list_base_images():
+            image_cache_manager._reset_state()
+            image_cache_manager._list_base_images(base_dir)
+            self.assertEqual(1, len(image_cache_manager.unexplained_images))
+
+        list_base_images()
+        list_base_images()
+        self.assertEqual(1, len(listings))
+
+        # A changed ctime is enough to list the directory again
+        dir_stat[0] = stat(1000, 1001, 2)
+        list_base_images()
+        self.assertEqual(2, len(listings))
+
+        # As is an old listing, even if the directory looks unchanged
+        now[0] += 600
+        list_base_images()
+        self.assertEqual(3, len(listings))
+
+        self.flags(base_dir_listing_max_age=0)
+        list_base_images()
+        self.assertEqual(4, len(listings))
+
     def test_list_running_instances(self):
         all_instances = [{'image_ref': '1',
                           'host': CONF.host,
@@ -247,6 +290,71 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
         self.assertEquals(inuse_images, [found])
         self.assertEquals(len(image_cache_manager.unexplained_images), 0)
 
+    def _stub_disk_stat(self, **changes):
+        stat = collections.namedtuple('stat',
+                                      'st_ino st_dev st_ctime st_size')
+        values = dict(st_ino=42, st_dev=2049, st_ctime=1000, st_size=4096)
+        values.update(changes)
+        self.stubs.Set(os, 'stat', lambda x: stat(**values))
+
+    def test_list_backing_images_cached(self):
+        self.flags(cache_disk_backing_files=True)
+        self.stubs.Set(os, 'listdir',
+                       lambda x: ['_base', 'instance-00000001'])
+        self.stubs.Set(os.path, 'exists',
+                       lambda x: x.find('instance-') != -1)
+        self._stub_disk_stat()
+        lookups = []
+
+        def fake_get_disk_backing_file(path):
+            lookups.append(path)
+            return 'e97222e91fc4241f49a7f520d1dcf446751129b3_sm'
+
+        self.stubs.Set(virtutils, 'get_disk_backing_file',
+                       fake_get_disk_backing_file)
+
+        found = os.path.join(CONF.instances_path, CONF.base_dir_name,
+                             'e97222e91fc4241f49a7f520d1dcf446751129b3_sm')
+
+        image_cache_manager = imagecache.ImageCacheManager()
+        image_cache_manager.instance_names = self.stock_instance_names
+        for i in range(2):
+            self.assertEqual([found],
+                             image_cache_manager._list_backing_images())
+        self.assertEqual(1, len(lookups))
+
+        # A disk recreated with the same inode, or rebased in place, has
+        # a new ctime
+        self._stub_disk_stat(st_ctime=1001)
+        image_cache_manager._list_backing_images()
+        self.assertEqual(2, len(lookups))
+
+        # A disk that is no longer there is forgotten
+        self.stubs.Set(os, 'listdir', lambda x: ['_base'])
+        image_cache_manager._list_backing_images()
+        self.assertEqual({}, image_cache_manager._backing_files)
+
+    def test_list_backing_images_not_cached(self):
+        self.stubs.Set(os, 'listdir',
+                       lambda x: ['_base', 'instance-00000001'])
+        self.stubs.Set(os.path, 'exists',
+                       lambda x: x.find('instance-') != -1)
+        self._stub_disk_stat()
+        lookups = []
+
+        def fake_get_disk_backing_file(path):
+            lookups.append(path)
+            return 'e97222e91fc4241f49a7f520d1dcf446751129b3_sm'
+
+        self.stubs.Set(virtutils, 'get_disk_backing_file',
+                       fake_get_disk_backing_file)
+
+        image_cache_manager = imagecache.ImageCacheManager()
+        image_cache_manager.instance_names = self.stock_instance_names
+        for i in range(2):
+            image_cache_manager._list_backing_images()
+        self.assertEqual(2, len(lookups))
+
     def test_list_backing_images_resized(self):
         self.stubs.Set(os, 'listdir',
                        lambda x: ['_base', 'instance-00000001',
@@ -684,6 +792,10 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
         self.stubs.Set(image_cache_manager, '_verify_checksum',
                        lambda x, y: True)
 
+        # Nothing has been pre-cached, that is tested elsewhere too
+        self.stubs.Set(image_cache_manager, '_is_precached',
+                       lambda x: False)
+
         # Fake getmtime as well
         orig_getmtime = os.path.getmtime
 
@@ -725,6 +837,105 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
         # Ensure there are no "corrupt" images as well
         self.assertEqual(len(image_cache_manager.corrupt_base_files), 0)
 
+    def test_verify_base_images_precached(self):
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            self.flags(remove_unused_base_images=True)
+            base_dir = os.path.join(tmpdir, '_base')
+            os.mkdir(base_dir)
+
+            old = time.time() - (25 * 3600)
+            precached = os.path.join(base_dir, hashlib.sha1('1').hexdigest())
+            expired = os.path.join(base_dir, hashlib.sha1('2').hexdigest())
+            for base_file in (precached, expired):
+                with open(base_file, 'w') as f:
+                    f.write('data')
+                os.utime(base_file, (old, old))
+
+            def fake_read_stored_info(base_file, field, timestamped):
+                # Only one of the images was pre-cached recently
+                if base_file == precached:
+                    return 'image', time.time()
+                return 'image', old
+
+            self.flags(precached_image_keep_seconds=3600)
+            self.stubs.Set(imagecache, 'read_stored_info',
+                           fake_read_stored_info)
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.verify_base_images(None, [])
+
+            self.assertEqual([precached],
+                             image_cache_manager.active_base_files)
+            self.assertTrue(os.path.exists(precached))
+            self.assertFalse(os.path.exists(expired))
+
+    def test_remove_base_volumes(self):
+        removed = []
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir,
+                       libvirt_images_volume_group='vg',
+                       libvirt_images_lvm_thin_pool='pool')
+            base_dir = os.path.join(tmpdir, '_base')
+            os.mkdir(base_dir)
+            kept = hashlib.sha1('1').hexdigest() + '_10'
+            gone = hashlib.sha1('2').hexdigest()
+            with open(os.path.join(base_dir, kept), 'w') as f:
+                f.write('data')
+
+            self.stubs.Set(virtutils, 'list_logical_volumes',
+                           lambda vg: ['_base_%s' % kept.replace('_', '__'),
+                                       '_base_%s' % gone,
+                                       'instance-00000001_disk',
+                                       '__base_disk'])
+            self.stubs.Set(virtutils, 'remove_thin_volume',
+                           lambda vg, lv: removed.append((vg, lv)))
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager._remove_base_volumes(base_dir)
+
+        self.assertEqual([('vg', '_base_%s' % gone)], removed)
+
+    def test_remove_base_volumes_no_thin_pool(self):
+        self.flags(libvirt_images_volume_group='vg')
+
+        def fake_list_logical_volumes(vg):
+            self.fail('Volumes listed without a thin pool')
+
+        self.stubs.Set(virtutils, 'list_logical_volumes',
+                       fake_list_logical_volumes)
+        image_cache_manager = imagecache.ImageCacheManager()
+        image_cache_manager._remove_base_volumes('/tmp/_base')
+
+    def test_verify_base_images_removes_base_volumes(self):
+        removed = []
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir,
+                       remove_unused_base_images=True,
+                       libvirt_images_volume_group='vg',
+                       libvirt_images_lvm_thin_pool='pool')
+            base_dir = os.path.join(tmpdir, '_base')
+            os.mkdir(base_dir)
+
+            # An unused base file old enough to be removed
+            fname = hashlib.sha1('1').hexdigest()
+            base_file = os.path.join(base_dir, fname)
+            with open(base_file, 'w') as f:
+                f.write('data')
+            old = time.time() - (25 * 3600)
+            os.utime(base_file, (old, old))
+
+            self.stubs.Set(virtutils, 'list_logical_volumes',
+                           lambda vg: ['_base_%s' % fname])
+            self.stubs.Set(virtutils, 'remove_thin_volume',
+                           lambda vg, lv: removed.append(lv))
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.verify_base_images(None, [])
+
+            self.assertFalse(os.path.exists(base_file))
+        self.assertEqual(['_base_%s' % fname], removed)
+
     def test_verify_base_images_no_base(self):
         self.flags(instances_path='/tmp/no/such/dir/name/please')
         image_cache_manager = imagecache.ImageCacheManager()
@@ -866,6 +1077,44 @@ class VerifyChecksumTestCase(test.NoDBTestCase):
             res = image_cache_manager._verify_checksum(self.img, fname)
             self.assertTrue(res)
 
+    def test_verify_checksum_unchanged(self):
+        self.flags(checksum_only_changed_base_images=True)
+        with utils.tempdir() as tmpdir:
+            image_cache_manager, fname = self._check_body(tmpdir, "csum valid")
+            self.assertTrue(image_cache_manager._verify_checksum(self.img,
+                                                                 fname))
+
+            hashed = []
+
+            def fake_hash(target):
+                hashed.append(target)
+                return 'banana'
+
+            self.stubs.Set(imagecache, '_hash_base_file', fake_hash)
+            self.assertTrue(image_cache_manager._verify_checksum(self.img,
+                                                                 fname))
+            self.assertEqual([], hashed)
+
+            with open(fname, 'a') as f:
+                f.write('changed')
+            self.assertFalse(image_cache_manager._verify_checksum(self.img,
+                                                                  fname))
+            self.assertEqual([fname], hashed)
+
+    def test_hash_base_file_rate_limited(self):
+        self.flags(checksum_max_read_rate=1)
+        sleeps = []
+        self.stubs.Set(time, 'sleep', lambda secs: sleeps.append(secs))
+        with utils.tempdir() as tmpdir:
+            fname = os.path.join(tmpdir, 'aaa')
+            with open(fname, 'w') as f:
+                f.write('x' * (3 * 1024 * 1024 + 1))
+            with open(fname, 'r') as f:
+                expected = utils.hash_file(f)
+
+            self.assertEqual(expected, imagecache._hash_base_file(fname))
+            self.assertEqual(4, len(sleeps))
+
     def test_verify_checksum_disabled(self):
         self.flags(checksum_base_images=False)
         with utils.tempdir() as tmpdir:
@@ -0,0 +1,113 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from eventlet import event
+from eventlet import greenthread
+
+from nova import exception
+from nova import test
+from nova.virt.libvirt import imagedownload
+
+
+class DownloadCoordinatorTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(DownloadCoordinatorTestCase, self).setUp()
+        self.release = event.Event()
+        self.calls = []
+
+    def _fetch(self, target, fail=0):
+        self.calls.append(target)
+        self.release.wait()
+        if len(self.calls) <= fail:
+            raise test.TestingException()
+        return target
+
+    def test_fetch_shared(self):
+        coordinator = imagedownload.DownloadCoordinator()
+        threads = [greenthread.spawn(coordinator.fetch, '/base/image',
+                                     self._fetch, '/base/image')
+                   for i in range(3)]
+        greenthread.sleep(0)
+
+        downloads = coordinator.get_downloads()
+        self.assertEqual(1, len(downloads))
+        self.assertEqual('downloading', downloads[0]['state'])
+        self.assertEqual(2, downloads[0]['waiters'])
+
+        self.release.send()
+        self.assertEqual(['/base/image'] * 3,
+                         [thread.wait() for thread in threads])
+        self.assertEqual(['/base/image'], self.calls)
+        self.assertEqual([], coordinator.get_downloads())
+
+    def test_fetch_failure_shared(self):
+        coordinator = imagedownload.DownloadCoordinator()
+        threads = [greenthread.spawn(coordinator.fetch, '/base/image',
+                                     self._fetch, '/base/image', fail=1)
+                   for i in range(2)]
+        greenthread.sleep(0)
+        self.release.send()
+
+        for thread in threads:
+            self.assertRaises(test.TestingException, thread.wait)
+        self.assertEqual(1, len(self.calls))
+
+    def test_fetch_retries(self):
+        self.flags(image_download_retries=1)
+        coordinator = imagedownload.DownloadCoordinator()
+        self.release.send()
+
+        self.assertEqual('/base/image',
+                         coordinator.fetch('/base/image', self._fetch,
+                                           '/base/image', fail=1))
+        self.assertEqual(2, len(self.calls))
+
+    def test_fetch_queued(self):
+        self.flags(max_concurrent_image_downloads=1)
+        coordinator = imagedownload.DownloadCoordinator()
+        threads = [greenthread.spawn(coordinator.fetch, target,
+                                     self._fetch, target)
+                   for target in ('/base/one', '/base/two')]
+        greenthread.sleep(0)
+
+        states = dict((download['target'], download['state'])
+                      for download in coordinator.get_downloads())
+        self.assertEqual({'/base/one': 'downloading',
+                          '/base/two': 'queued'}, states)
+        self.assertEqual(['/base/one'], self.calls)
+
+        self.release.send()
+        self.assertEqual(['/base/one', '/base/two'],
+                         [thread.wait() for thread in threads])
+
+    def test_wait_timeout(self):
+        self.flags(image_download_wait_timeout=30)
+        coordinator = imagedownload.DownloadCoordinator()
+        owner = greenthread.spawn(coordinator.fetch, '/base/image',
+                                  self._fetch, '/base/image')
+        greenthread.sleep(0)
+
+        # Each look at the clock finds the wait has gone on for too long
+        now = [1000]
+
+        def fake_time():
+            now[0] += 31
+            return now[0]
+
+        self.stubs.Set(imagedownload.time, 'time', fake_time)
+        self.assertRaises(exception.ImageDownloadTimeout, coordinator.fetch,
+                          '/base/image', self._fetch, '/base/image')
+        self.release.send()
+        self.assertEqual('/base/image', owner.wait())
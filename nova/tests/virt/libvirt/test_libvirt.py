@@ -48,6 +48,7 @@ from nova.openstack.common import importutils
 from nova.openstack.common import jsonutils
 from nova.openstack.common import loopingcall
 from nova.openstack.common import processutils
+from nova.openstack.common import timeutils
 from nova.openstack.common import uuidutils
 from nova import test
 from nova.tests import fake_network
@@ -68,6 +69,7 @@ from nova.virt.libvirt import config as vconfig
 from nova.virt.libvirt import driver as libvirt_driver
 from nova.virt.libvirt import firewall
 from nova.virt.libvirt import imagebackend
+from nova.virt.libvirt import imagecache
 from nova.virt.libvirt import utils as libvirt_utils
 from nova.virt import netutils
 
@@ -675,6 +677,22 @@ class LibvirtConnTestCase(test.TestCase):
 
         conn._get_connection()
 
+    def test_lifecycle_events_healthy(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
+        self.assertFalse(conn.lifecycle_events_healthy())
+
+        # A fresh connection with the event loop running
+        conn._event_queue = object()
+        conn._wrapped_conn = self.conn
+        conn._events_registered = True
+        conn._events_interrupted = True
+        # Events may have been missed before the connection was made
+        self.assertFalse(conn.lifecycle_events_healthy())
+        self.assertTrue(conn.lifecycle_events_healthy())
+
+        conn._close_callback(self.conn, 1, None)
+        self.assertFalse(conn.lifecycle_events_healthy())
+
     def test_get_guest_config(self):
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
         instance_ref = db.instance_create(self.context, self.test_instance)
@@ -1586,6 +1604,57 @@ class LibvirtConnTestCase(test.TestCase):
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
         self.assertRaises(exception.NovaException, conn.list_instance_uuids)
 
+    def test_list_instance_power_states(self):
+        class FakeDomain(object):
+            def __init__(self, name, state):
+                self._name = name
+                self._state = state
+
+            def name(self):
+                return self._name
+
+            def info(self):
+                return [self._state, None, None, None, None]
+
+        domains = [FakeDomain('running', libvirt_driver.VIR_DOMAIN_RUNNING),
+                   FakeDomain('shutoff', libvirt_driver.VIR_DOMAIN_SHUTOFF)]
+        self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
+        libvirt_driver.LibvirtDriver._conn.listAllDomains = (
+            lambda flags: domains)
+
+        self.mox.ReplayAll()
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        instances = [{'uuid': 'uuid1', 'name': 'running'},
+                     {'uuid': 'uuid2', 'name': 'shutoff'},
+                     {'uuid': 'uuid3', 'name': 'missing'}]
+        self.assertEqual({'uuid1': power_state.RUNNING,
+                          'uuid2': power_state.SHUTDOWN,
+                          'uuid3': power_state.NOSTATE},
+                         conn.list_instance_power_states(instances))
+
+    def test_list_instance_power_states_without_list_all_domains(self):
+        class FakeDomain(object):
+            def info(self):
+                return [libvirt_driver.VIR_DOMAIN_PAUSED, 0, 0, 1, 0]
+
+            def ID(self):
+                return 1
+
+        def fake_lookup(instance_name):
+            if instance_name != 'paused':
+                raise exception.InstanceNotFound(instance_id=instance_name)
+            return FakeDomain()
+
+        # A connection from an old libvirt without listAllDomains()
+        self.stubs.Set(libvirt_driver.LibvirtDriver, '_conn', object())
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self.stubs.Set(conn, '_lookup_by_name', fake_lookup)
+        instances = [{'uuid': 'uuid1', 'name': 'paused'},
+                     {'uuid': 'uuid2', 'name': 'missing'}]
+        self.assertEqual({'uuid1': power_state.PAUSED,
+                          'uuid2': power_state.NOSTATE},
+                         conn.list_instance_power_states(instances))
+
     def test_get_all_block_devices(self):
         xml = [
             # NOTE(vish): id 0 is skipped
@@ -3427,6 +3496,55 @@ class LibvirtConnTestCase(test.TestCase):
 
         conn.spawn(self.context, instance, None, [], None)
 
+    def test_cache_image(self):
+        fetched = []
+
+        def fake_fetch_image(context, target, image_id, user_id, project_id):
+            fetched.append(image_id)
+            with open(target, 'w') as f:
+                f.write('image')
+
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            self.stubs.Set(libvirt_driver.libvirt_utils, 'fetch_image',
+                           fake_fetch_image)
+            conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+            base = os.path.join(tmpdir, '_base',
+                                imagecache.get_cache_fname(
+                                    {'image_id': 'fake-image'}, 'image_id'))
+
+            conn.cache_image(self.context, 'fake-image')
+            conn.cache_image(self.context, 'fake-image')
+
+            self.assertEqual(['fake-image'], fetched)
+            self.assertTrue(os.path.exists(base))
+            self.assertEqual('fake-image',
+                             imagecache.read_stored_info(base, 'precached'))
+
+    def test_manage_image_cache_background(self):
+        self.flags(image_cache_manager_background=True)
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        release = eventlet.event.Event()
+        passes = []
+
+        def fake_verify_base_images(context, all_instances):
+            passes.append(all_instances)
+            release.wait()
+
+        self.stubs.Set(conn.image_cache_manager, 'verify_base_images',
+                       fake_verify_base_images)
+
+        conn.manage_image_cache(self.context, ['one'])
+        eventlet.sleep(0)
+        # A pass that is still running is not overlapped by the next one
+        conn.manage_image_cache(self.context, ['two'])
+        release.send()
+        eventlet.sleep(0)
+        conn.manage_image_cache(self.context, ['three'])
+        eventlet.sleep(0)
+
+        self.assertEqual([['one'], ['three']], passes)
+
     def test_create_image_plain(self):
         gotFiles = []
 
@@ -3486,6 +3604,69 @@ class LibvirtConnTestCase(test.TestCase):
             ]
         self.assertEquals(gotFiles, wantFiles)
 
+    def test_run_image_steps_concurrently(self):
+        self.flags(libvirt_image_prep_concurrency=2)
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        events = []
+        running = []
+        done = []
+
+        def fake_record(context, instance, name, start_time, exc_info):
+            events.append((name, exc_info[0]))
+
+        def step(name):
+            def _step():
+                running.append(name)
+                # Both steps get to start before either one finishes
+                greenthread.sleep(0)
+                self.assertEqual(2, len(running))
+                done.append(name)
+                if name == 'disk.swap':
+                    raise test.TestingException()
+            return _step
+
+        self.stubs.Set(conn, '_record_image_step_event', fake_record)
+        instance = {'uuid': 'fake-uuid'}
+        self.assertRaises(test.TestingException, conn._run_image_steps,
+                          self.context, instance,
+                          [('disk', step('disk')),
+                           ('disk.swap', step('disk.swap'))])
+        # A failure does not abandon the other steps
+        self.assertEqual(['disk', 'disk.swap'], sorted(done))
+        self.assertEqual([('disk', None),
+                          ('disk.swap', test.TestingException)],
+                         sorted(events))
+
+    def test_run_image_steps_serially(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        done = []
+
+        def fake_record(context, instance, name, start_time, exc_info):
+            self.fail('Event recorded for a serial step')
+
+        self.stubs.Set(conn, '_record_image_step_event', fake_record)
+        conn._run_image_steps(self.context, {'uuid': 'fake-uuid'},
+                              [('disk', lambda: done.append('disk')),
+                               ('disk.swap',
+                                lambda: done.append('disk.swap'))])
+        self.assertEqual(['disk', 'disk.swap'], done)
+
+    def test_record_image_step_event(self):
+        virtapi = fake.FakeVirtAPI()
+        conn = libvirt_driver.LibvirtDriver(virtapi, False)
+        start_time = timeutils.utcnow()
+        self.mox.StubOutWithMock(virtapi, 'action_event_start')
+        self.mox.StubOutWithMock(virtapi, 'action_event_finish')
+        virtapi.action_event_start(self.context, mox.And(
+            mox.ContainsKeyValue('event', 'libvirt_create_image_disk'),
+            mox.ContainsKeyValue('start_time', start_time)))
+        virtapi.action_event_finish(self.context, mox.And(
+            mox.ContainsKeyValue('event', 'libvirt_create_image_disk'),
+            mox.ContainsKeyValue('result', 'Success')))
+        self.mox.ReplayAll()
+        conn._record_image_step_event(self.context, {'uuid': 'fake-uuid'},
+                                      'disk', start_time, (None, None, None))
+
     def test_create_image_with_swap(self):
         gotFiles = []
 
@@ -4247,14 +4428,32 @@ class LibvirtConnTestCase(test.TestCase):
         # instance disappears
         conn._undefine_domain(instance)
 
+    def _stub_disk_over_committed_domains(self, conn, fake_disks):
+        class FakeDomain(object):
+            def __init__(self, name):
+                self._name = name
+
+            def UUIDString(self):
+                return 'uuid-%s' % self._name
+
+            def XMLDesc(self, flags):
+                return "<domain><name>%s</name></domain>" % self._name
+
+        disk_info_calls = []
+
+        def get_info(instance_name, xml=None):
+            disk_info_calls.append(instance_name)
+            return jsonutils.dumps(fake_disks.get(instance_name))
+
+        self.stubs.Set(conn, 'list_instances', lambda: fake_disks.keys())
+        self.stubs.Set(conn, '_lookup_by_name', FakeDomain)
+        self.stubs.Set(conn, 'get_instance_disk_info', get_info)
+        return disk_info_calls
+
     def test_disk_over_committed_size_total(self):
         # Ensure destroy calls managedSaveRemove for saved instance.
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
 
-        def list_instances():
-            return ['fake1', 'fake2']
-        self.stubs.Set(conn, 'list_instances', list_instances)
-
         fake_disks = {'fake1': [{'type': 'qcow2', 'path': '/somepath/disk1',
                                  'virt_disk_size': '10737418240',
                                  'backing_file': '/somepath/disk1',
@@ -4265,14 +4464,52 @@ class LibvirtConnTestCase(test.TestCase):
                                  'backing_file': '/somepath/disk2',
                                  'disk_size': '10737418240',
                                  'over_committed_disk_size': '0'}]}
-
-        def get_info(instance_name):
-            return jsonutils.dumps(fake_disks.get(instance_name))
-        self.stubs.Set(conn, 'get_instance_disk_info', get_info)
+        self._stub_disk_over_committed_domains(conn, fake_disks)
 
         result = conn.get_disk_over_committed_size_total()
         self.assertEqual(result, 10653532160)
 
+    def test_disk_over_committed_size_total_cached(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        fake_disks = {'fake1': [{'over_committed_disk_size': '1024'}],
+                      'fake2': [{'over_committed_disk_size': '2048'}]}
+        calls = self._stub_disk_over_committed_domains(conn, fake_disks)
+
+        self.assertEqual(3072, conn.get_disk_over_committed_size_total())
+        self.assertEqual(3072, conn.get_disk_over_committed_size_total())
+        # Unchanged domains are only inspected once
+        self.assertEqual(2, len(calls))
+
+        del fake_disks['fake2']
+        self.assertEqual(1024, conn.get_disk_over_committed_size_total())
+        self.assertEqual(['uuid-fake1'], conn._disk_over_commit_cache.keys())
+
+    def _stub_disk_over_committed_error(self, conn, error_code):
+        class FakeDomain(object):
+            def __init__(self, name):
+                pass
+
+            def UUIDString(self):
+                raise libvirt.libvirtError('domain error')
+
+        self.stubs.Set(conn, 'list_instances', lambda: ['fake1'])
+        self.stubs.Set(conn, '_lookup_by_name', FakeDomain)
+        self.mox.StubOutWithMock(libvirt.libvirtError, 'get_error_code')
+        libvirt.libvirtError.get_error_code().AndReturn(error_code)
+        self.mox.ReplayAll()
+
+    def test_disk_over_committed_size_total_domain_deleted(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self._stub_disk_over_committed_error(conn, libvirt.VIR_ERR_NO_DOMAIN)
+        self.assertEqual(0, conn.get_disk_over_committed_size_total())
+
+    def test_disk_over_committed_size_total_libvirt_error(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self._stub_disk_over_committed_error(conn,
+                                             libvirt.VIR_ERR_INTERNAL_ERROR)
+        self.assertRaises(libvirt.libvirtError,
+                          conn.get_disk_over_committed_size_total)
+
     def test_cpu_info(self):
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
 
@@ -4319,6 +4556,15 @@ class LibvirtConnTestCase(test.TestCase):
         got = jsonutils.loads(conn.get_cpu_info())
         self.assertEqual(want, got)
 
+        # The capabilities are not looked at again on the same connection
+        def get_host_capabilities_fail(self):
+            raise test.TestingException('capabilities not cached')
+
+        self.stubs.Set(libvirt_driver.LibvirtDriver,
+                       'get_host_capabilities',
+                       get_host_capabilities_fail)
+        self.assertEqual(want, jsonutils.loads(conn.get_cpu_info()))
+
     def test_get_pcidev_info(self):
 
         def fake_nodeDeviceLookupByName(name):
@@ -21,6 +21,7 @@ import sys
 import traceback
 
 from nova.compute import manager
+from nova.compute import power_state
 from nova import exception
 from nova.openstack.common import importutils
 from nova.openstack.common import log as logging
@@ -488,6 +489,15 @@ class _VirtDriverTestCase(_FakeDriverBackendTestCase):
                           self.connection.get_info,
                           {'name': 'I just made this name up'})
 
+    @catch_notimplementederror
+    def test_list_instance_power_states(self):
+        instance_ref, network_info = self._get_running_instance()
+        unknown = {'uuid': 'fake-uuid', 'name': 'I just made this name up'}
+        states = self.connection.list_instance_power_states([instance_ref,
+                                                             unknown])
+        self.assertEqual({instance_ref['uuid']: power_state.RUNNING,
+                          unknown['uuid']: power_state.NOSTATE}, states)
+
     @catch_notimplementederror
     def test_get_diagnostics(self):
         instance_ref, network_info = self._get_running_instance()
@@ -699,6 +709,28 @@ class FakeConnectionTestCase(_VirtDriverTestCase, test.TestCase):
         fake.set_nodes(['myhostname'])
         super(FakeConnectionTestCase, self).setUp()
 
+    def test_lifecycle_events(self):
+        got_events = []
+        self.connection.register_event_listener(got_events.append)
+
+        instance_ref, network_info = self._get_running_instance()
+        self.connection.power_off(instance_ref)
+        self.assertEqual(power_state.SHUTDOWN,
+                         self.connection.get_info(instance_ref)['state'])
+        self.connection.power_on(self.ctxt, instance_ref, network_info, None)
+        self.connection.pause(instance_ref)
+        self.connection.unpause(instance_ref)
+
+        self.assertEqual([virtevent.EVENT_LIFECYCLE_STARTED,
+                          virtevent.EVENT_LIFECYCLE_STOPPED,
+                          virtevent.EVENT_LIFECYCLE_STARTED,
+                          virtevent.EVENT_LIFECYCLE_PAUSED,
+                          virtevent.EVENT_LIFECYCLE_RESUMED],
+                         [e.get_transition() for e in got_events])
+        for event in got_events:
+            self.assertEqual(instance_ref['uuid'], event.get_instance_uuid())
+        self.assertTrue(self.connection.lifecycle_events_healthy())
+
 
 class LibvirtConnTestCase(_VirtDriverTestCase, test.TestCase):
     def setUp(self):
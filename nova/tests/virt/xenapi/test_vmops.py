@@ -272,6 +272,26 @@ class GetConsoleOutputTestCase(VMOpsTestBase):
                          self.vmops._get_dom_id(vm_ref=vm_ref))
 
 
+class ListInstancePowerStatesTestCase(VMOpsTestBase):
+    def _create_vm(self, name, state, **kwargs):
+        vm_ref = xenapi_fake.create_vm(name, state, **kwargs)
+        self.vms.append(vm_ref)
+
+    def test_list_instance_power_states(self):
+        host_ref = self._session.get_xenapi_host()
+        self._create_vm('running', 'Running', resident_on=host_ref)
+        # Halted VMs are not resident on any host
+        self._create_vm('halted', 'Halted', resident_on='OpaqueRef:NULL')
+        instances = [{'uuid': 'uuid-running', 'name': 'running'},
+                     {'uuid': 'uuid-halted', 'name': 'halted'},
+                     {'uuid': 'uuid-missing', 'name': 'missing'}]
+
+        self.assertEqual({'uuid-running': power_state.RUNNING,
+                          'uuid-halted': power_state.SHUTDOWN,
+                          'uuid-missing': power_state.NOSTATE},
+                         self.vmops.list_instance_power_states(instances))
+
+
 class SpawnTestCase(VMOpsTestBase):
     def _stub_out_common(self):
         self.mox.StubOutWithMock(self.vmops, '_ensure_instance_name_unique')
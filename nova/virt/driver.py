@@ -26,6 +26,8 @@ import sys
 
 from oslo.config import cfg
 
+from nova.compute import power_state
+from nova import exception
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import importutils
 from nova.openstack.common import log as logging
@@ -128,6 +130,7 @@ class ComputeDriver(object):
     capabilities = {
         "has_imagecache": False,
         "supports_recreate": False,
+        "emits_lifecycle_events": False,
         }
 
     def __init__(self, virtapi):
@@ -155,6 +158,30 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def list_instance_power_states(self, instances):
+        """Get the current power state of several instances at once.
+
+        :param instances: list of instances to look up
+
+        Returns a dict mapping each instance uuid to one of the power_state
+        codes.  Instances unknown to the hypervisor map to
+        power_state.NOSTATE.
+
+        .. note::
+
+            This implementation works for all drivers, but it calls
+            get_info() once per instance. Maintainers of the virt drivers
+            are encouraged to override this method with something that
+            queries the hypervisor once for all instances.
+        """
+        states = {}
+        for instance in instances:
+            try:
+                states[instance['uuid']] = self.get_info(instance)['state']
+            except exception.InstanceNotFound:
+                states[instance['uuid']] = power_state.NOSTATE
+        return states
+
     def get_num_instances(self):
         """Return the total number of virtual machines.
 
@@ -916,6 +943,16 @@ class ComputeDriver(object):
         """
         pass
 
+    def cache_image(self, context, image_id):
+        """
+        Download an image into the driver's local image cache.
+
+        This lets images be fetched ahead of the instances that use them
+        being spawned. The image must be kept in the cache for a while
+        even though no instance uses it yet.
+        """
+        raise NotImplementedError()
+
     def add_to_aggregate(self, context, aggregate, host, **kwargs):
         """Add a compute host to an aggregate."""
         #NOTE(jogo) Currently only used for XenAPI-Pool
@@ -997,6 +1034,18 @@ class ComputeDriver(object):
 
         self._compute_event_callback = callback
 
+    def lifecycle_events_healthy(self):
+        """Check whether lifecycle events are being delivered reliably.
+
+        Returns True if every power state change of the instances on this
+        host since the previous call was reported through emit_event(), so
+        the compute manager can rely on events rather than polling. Drivers
+        that advertise the "emits_lifecycle_events" capability should
+        override this if delivery can be interrupted, e.g. while
+        reconnecting to the hypervisor.
+        """
+        return self.capabilities.get('emits_lifecycle_events', False)
+
     def emit_event(self, event):
         """Dispatches an event to the compute manager.
 
@@ -35,6 +35,7 @@ from nova import exception
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.virt import driver
+from nova.virt import event as virtevent
 from nova.virt import virtapi
 
 CONF = cfg.CONF
@@ -83,6 +84,7 @@ class FakeDriver(driver.ComputeDriver):
     capabilities = {
         "has_imagecache": True,
         "supports_recreate": True,
+        "emits_lifecycle_events": True,
         }
 
     """Fake hypervisor driver."""
@@ -128,6 +130,17 @@ class FakeDriver(driver.ComputeDriver):
         state = power_state.RUNNING
         fake_instance = FakeInstance(name, state)
         self.instances[name] = fake_instance
+        self._emit_lifecycle_event(instance, virtevent.EVENT_LIFECYCLE_STARTED)
+
+    def _set_power_state(self, instance, state, transition):
+        fake_instance = self.instances.get(instance['name'])
+        if fake_instance is not None:
+            fake_instance.state = state
+        self._emit_lifecycle_event(instance, transition)
+
+    def _emit_lifecycle_event(self, instance, transition):
+        self.emit_event(virtevent.LifecycleEvent(instance['uuid'],
+                                                 transition))
 
     def live_snapshot(self, context, instance, name, update_task_state):
         if instance['name'] not in self.instances:
@@ -141,7 +154,8 @@ class FakeDriver(driver.ComputeDriver):
 
     def reboot(self, context, instance, network_info, reboot_type,
                block_device_info=None, bad_volumes_callback=None):
-        pass
+        self._set_power_state(instance, power_state.RUNNING,
+                              virtevent.EVENT_LIFECYCLE_STARTED)
 
     @staticmethod
     def get_host_ip_addr():
@@ -183,10 +197,12 @@ class FakeDriver(driver.ComputeDriver):
         pass
 
     def power_off(self, instance):
-        pass
+        self._set_power_state(instance, power_state.SHUTDOWN,
+                              virtevent.EVENT_LIFECYCLE_STOPPED)
 
     def power_on(self, context, instance, network_info, block_device_info):
-        pass
+        self._set_power_state(instance, power_state.RUNNING,
+                              virtevent.EVENT_LIFECYCLE_STARTED)
 
     def soft_delete(self, instance):
         pass
@@ -195,22 +211,28 @@ class FakeDriver(driver.ComputeDriver):
         pass
 
     def pause(self, instance):
-        pass
+        self._set_power_state(instance, power_state.PAUSED,
+                              virtevent.EVENT_LIFECYCLE_PAUSED)
 
     def unpause(self, instance):
-        pass
+        self._set_power_state(instance, power_state.RUNNING,
+                              virtevent.EVENT_LIFECYCLE_RESUMED)
 
     def suspend(self, instance):
-        pass
+        self._set_power_state(instance, power_state.SUSPENDED,
+                              virtevent.EVENT_LIFECYCLE_STOPPED)
 
     def resume(self, instance, network_info, block_device_info=None):
-        pass
+        self._set_power_state(instance, power_state.RUNNING,
+                              virtevent.EVENT_LIFECYCLE_STARTED)
 
     def destroy(self, instance, network_info, block_device_info=None,
                 destroy_disks=True, context=None):
         key = instance['name']
         if key in self.instances:
             del self.instances[key]
+            self._emit_lifecycle_event(instance,
+                                       virtevent.EVENT_LIFECYCLE_STOPPED)
         else:
             LOG.warning(_("Key '%(key)s' not in instances '%(inst)s'") %
                         {'key': key,
@@ -266,6 +288,16 @@ class FakeDriver(driver.ComputeDriver):
                 'num_cpu': 2,
                 'cpu_time': 0}
 
+    def list_instance_power_states(self, instances):
+        states = {}
+        for instance in instances:
+            fake_instance = self.instances.get(instance['name'])
+            if fake_instance is None:
+                states[instance['uuid']] = power_state.NOSTATE
+            else:
+                states[instance['uuid']] = fake_instance.state
+        return states
+
     def get_diagnostics(self, instance_name):
         return {'cpu0_time': 17300000000,
                 'memory': 524288,
@@ -400,7 +432,10 @@ class FakeDriver(driver.ComputeDriver):
         return
 
     def test_remove_vm(self, instance_name):
-        """Removes the named VM, as if it crashed. For testing."""
+        """Removes the named VM, as if it crashed. For testing.
+
+        No lifecycle event is emitted, as if it had been lost.
+        """
         self.instances.pop(instance_name)
 
     def get_host_stats(self, refresh=False):
@@ -440,6 +475,9 @@ class FakeDriver(driver.ComputeDriver):
     def get_disk_available_least(self):
         pass
 
+    def cache_image(self, context, image_id):
+        pass
+
     def add_to_aggregate(self, context, aggregate, host, **kwargs):
         pass
 
@@ -504,3 +542,9 @@ class FakeVirtAPI(virtapi.VirtAPI):
 
     def block_device_mapping_update(self, context, bdm_id, values):
         return db.block_device_mapping_update(context, bdm_id, values)
+
+    def action_event_start(self, context, values):
+        return db.action_event_start(context, values)
+
+    def action_event_finish(self, context, values):
+        return db.action_event_finish(context, values)
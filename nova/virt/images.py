@@ -190,6 +190,17 @@ def fetch(context, image_href, path, _user_id, _project_id):
         image_service.download(context, image_id, dst_path=path)
 
 
+def get_image_locations(context, image_href):
+    """Return the image metadata and the backend storage location urls
+    Glance reports for the image.
+    """
+    (image_service, image_id) = glance.get_remote_image_service(context,
+                                                                image_href)
+    image_meta = image_service.show(context, image_id)
+    locations = image_service.get_locations(context, image_id)
+    return image_meta, [location['url'] for location in locations]
+
+
 def fetch_to_raw(context, image_href, path, user_id, project_id):
     path_tmp = "%s.part" % path
     fetch(context, image_href, path_tmp, user_id, project_id)
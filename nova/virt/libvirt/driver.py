@@ -54,6 +54,7 @@ import time
 import uuid
 
 from eventlet import greenio
+from eventlet import greenpool
 from eventlet import greenthread
 from eventlet import patcher
 from eventlet import tpool
@@ -81,6 +82,7 @@ from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
 from nova.openstack.common import loopingcall
 from nova.openstack.common import processutils
+from nova.openstack.common import timeutils
 from nova.openstack.common import xmlutils
 from nova.pci import pci_manager
 from nova.pci import pci_utils
@@ -97,6 +99,7 @@ from nova.virt.libvirt import config as vconfig
 from nova.virt.libvirt import firewall as libvirt_firewall
 from nova.virt.libvirt import imagebackend
 from nova.virt.libvirt import imagecache
+from nova.virt.libvirt import imagedownload
 from nova.virt.libvirt import utils as libvirt_utils
 from nova.virt import netutils
 from nova import volume
@@ -217,6 +220,20 @@ libvirt_opts = [
     cfg.StrOpt('vcpu_pin_set',
                 help='Which pcpus can be used by vcpus of instance '
                      'e.g: "4-12,^8,15"'),
+    cfg.IntOpt('libvirt_image_prep_concurrency',
+               default=1,
+               help='Number of independent image preparation steps (root '
+                    'disk, kernel, ramdisk, ephemeral and swap disks, config '
+                    'drive) run at the same time when creating an '
+                    'instance. 1 runs them one after another. When run at '
+                    'the same time, each step is recorded as an instance '
+                    'action event'),
+    cfg.BoolOpt('image_cache_manager_background',
+                default=False,
+                help='Run image cache manager passes in a background '
+                     'greenthread so that they do not hold up other periodic '
+                     'tasks. A pass is skipped if the previous one is still '
+                     'running'),
     ]
 
 CONF = cfg.CONF
@@ -225,6 +242,7 @@ CONF.import_opt('host', 'nova.netconf')
 CONF.import_opt('my_ip', 'nova.netconf')
 CONF.import_opt('default_ephemeral_format', 'nova.virt.driver')
 CONF.import_opt('use_cow_images', 'nova.virt.driver')
+CONF.import_opt('base_dir_name', 'nova.virt.libvirt.imagecache')
 CONF.import_opt('live_migration_retry_count', 'nova.compute.manager')
 CONF.import_opt('vncserver_proxyclient_address', 'nova.vnc')
 CONF.import_opt('server_proxyclient_address', 'nova.spice', group='spice')
@@ -307,6 +325,7 @@ class LibvirtDriver(driver.ComputeDriver):
     capabilities = {
         "has_imagecache": True,
         "supports_recreate": True,
+        "emits_lifecycle_events": True,
         }
 
     def __init__(self, virtapi, read_only=False):
@@ -323,6 +342,8 @@ class LibvirtDriver(driver.ComputeDriver):
         self._wrapped_conn = None
         self._wrapped_conn_lock = threading.Lock()
         self._caps = None
+        self._cpu_info = None
+        self._disk_over_commit_cache = {}
         self._vcpu_total = 0
         self.read_only = read_only
         self.firewall_driver = firewall.load_driver(
@@ -339,9 +360,12 @@ class LibvirtDriver(driver.ComputeDriver):
         self.dev_filter = pci_whitelist.get_pci_devices_filter()
 
         self._event_queue = None
+        self._events_registered = False
+        self._events_interrupted = False
 
         self._disk_cachemode = None
         self.image_cache_manager = imagecache.ImageCacheManager()
+        self._image_cache_pass = None
         self.image_backend = imagebackend.Backend(CONF.use_cow_images)
 
         self.disk_cachemodes = {}
@@ -590,6 +614,12 @@ class LibvirtDriver(driver.ComputeDriver):
                     self._connect, self.uri(), self.read_only)
             with self._wrapped_conn_lock:
                 self._wrapped_conn = wrapped_conn
+                # The host may have changed while disconnected
+                self._caps = None
+                self._cpu_info = None
+                # Events are lost while there is no connection
+                self._events_registered = False
+                self._events_interrupted = True
 
             try:
                 LOG.debug(_("Registering for lifecycle events %s") %
@@ -599,6 +629,7 @@ class LibvirtDriver(driver.ComputeDriver):
                     libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE,
                     self._event_lifecycle_callback,
                     self)
+                self._events_registered = True
             except Exception:
                 LOG.warn(_("URI %s does not support events"),
                          self.uri())
@@ -622,6 +653,21 @@ class LibvirtDriver(driver.ComputeDriver):
             if conn == self._wrapped_conn:
                 LOG.info(_("Connection to libvirt lost: %s") % reason)
                 self._wrapped_conn = None
+                self._events_registered = False
+
+    def lifecycle_events_healthy(self):
+        """Report whether events flowed uninterrupted since the last check.
+
+        Events are only delivered while the event loop is running and the
+        current connection has the lifecycle callback registered. Any
+        reconnection in between means events may have been missed.
+        """
+        with self._wrapped_conn_lock:
+            healthy = (self._event_queue is not None and
+                       self._events_registered and
+                       not self._events_interrupted)
+            self._events_interrupted = False
+        return healthy
 
     @staticmethod
     def _test_connection(conn):
@@ -742,6 +788,31 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return list(uuids)
 
+    def list_instance_power_states(self, instances):
+        """Efficient override of base list_instance_power_states method."""
+        if not hasattr(self._conn, 'listAllDomains'):
+            # NOTE: listAllDomains() needs libvirt >= 0.9.13
+            return super(LibvirtDriver, self).list_instance_power_states(
+                instances)
+
+        domain_states = {}
+        for domain in self._conn.listAllDomains(0):
+            try:
+                domain_states[domain.name()] = domain.info()[0]
+            except libvirt.libvirtError as ex:
+                # The domain may vanish between listing and querying it
+                if ex.get_error_code() != libvirt.VIR_ERR_NO_DOMAIN:
+                    raise
+
+        states = {}
+        for instance in instances:
+            state = domain_states.get(instance['name'])
+            if state is None:
+                states[instance['uuid']] = power_state.NOSTATE
+            else:
+                states[instance['uuid']] = LIBVIRT_POWER_STATE[state]
+        return states
+
     def plug_vifs(self, instance, network_info):
         """Plug VIFs into networks."""
         for vif in network_info:
@@ -2316,22 +2387,30 @@ class LibvirtDriver(driver.ComputeDriver):
                            'kernel_id': instance['kernel_id'],
                            'ramdisk_id': instance['ramdisk_id']}
 
+        # NOTE: the steps below do not depend on each other, so they are
+        # collected first and then run by _run_image_steps().
+        steps = []
+
         if disk_images['kernel_id']:
             fname = imagecache.get_cache_fname(disk_images, 'kernel_id')
-            raw('kernel').cache(fetch_func=libvirt_utils.fetch_image,
-                                context=context,
-                                filename=fname,
-                                image_id=disk_images['kernel_id'],
-                                user_id=instance['user_id'],
-                                project_id=instance['project_id'])
+            steps.append(('kernel', functools.partial(
+                raw('kernel').cache,
+                fetch_func=libvirt_utils.fetch_image,
+                context=context,
+                filename=fname,
+                image_id=disk_images['kernel_id'],
+                user_id=instance['user_id'],
+                project_id=instance['project_id'])))
             if disk_images['ramdisk_id']:
                 fname = imagecache.get_cache_fname(disk_images, 'ramdisk_id')
-                raw('ramdisk').cache(fetch_func=libvirt_utils.fetch_image,
-                                     context=context,
-                                     filename=fname,
-                                     image_id=disk_images['ramdisk_id'],
-                                     user_id=instance['user_id'],
-                                     project_id=instance['project_id'])
+                steps.append(('ramdisk', functools.partial(
+                    raw('ramdisk').cache,
+                    fetch_func=libvirt_utils.fetch_image,
+                    context=context,
+                    filename=fname,
+                    image_id=disk_images['ramdisk_id'],
+                    user_id=instance['user_id'],
+                    project_id=instance['project_id'])))
 
         inst_type = flavors.extract_flavor(instance)
 
@@ -2345,13 +2424,15 @@ class LibvirtDriver(driver.ComputeDriver):
             if size == 0 or suffix == '.rescue':
                 size = None
 
-            image('disk').cache(fetch_func=libvirt_utils.fetch_image,
-                                context=context,
-                                filename=root_fname,
-                                size=size,
-                                image_id=disk_images['image_id'],
-                                user_id=instance['user_id'],
-                                project_id=instance['project_id'])
+            steps.append(('disk', functools.partial(
+                image('disk').cache,
+                fetch_func=libvirt_utils.fetch_image,
+                context=context,
+                filename=root_fname,
+                size=size,
+                image_id=disk_images['image_id'],
+                user_id=instance['user_id'],
+                project_id=instance['project_id'])))
 
         # Lookup the filesystem type if required
         os_type_with_default = instance['os_type']
@@ -2365,10 +2446,12 @@ class LibvirtDriver(driver.ComputeDriver):
                                    os_type=instance["os_type"])
             fname = "ephemeral_%s_%s" % (ephemeral_gb, os_type_with_default)
             size = ephemeral_gb * 1024 * 1024 * 1024
-            image('disk.local').cache(fetch_func=fn,
-                                      filename=fname,
-                                      size=size,
-                                      ephemeral_size=ephemeral_gb)
+            steps.append(('disk.local', functools.partial(
+                image('disk.local').cache,
+                fetch_func=fn,
+                filename=fname,
+                size=size,
+                ephemeral_size=ephemeral_gb)))
 
         for idx, eph in enumerate(driver.block_device_info_get_ephemerals(
                 block_device_info)):
@@ -2377,11 +2460,13 @@ class LibvirtDriver(driver.ComputeDriver):
                                    os_type=instance["os_type"])
             size = eph['size'] * 1024 * 1024 * 1024
             fname = "ephemeral_%s_%s" % (eph['size'], os_type_with_default)
-            image(blockinfo.get_eph_disk(idx)).cache(
+            eph_name = blockinfo.get_eph_disk(idx)
+            steps.append((eph_name, functools.partial(
+                image(eph_name).cache,
                 fetch_func=fn,
                 filename=fname,
                 size=size,
-                ephemeral_size=eph['size'])
+                ephemeral_size=eph['size'])))
 
         if 'disk.swap' in disk_mapping:
             mapping = disk_mapping['disk.swap']
@@ -2397,13 +2482,16 @@ class LibvirtDriver(driver.ComputeDriver):
 
             if swap_mb > 0:
                 size = swap_mb * 1024 * 1024
-                image('disk.swap').cache(fetch_func=self._create_swap,
-                                         filename="swap_%s" % swap_mb,
-                                         size=size,
-                                         swap_mb=swap_mb)
+                steps.append(('disk.swap', functools.partial(
+                    image('disk.swap').cache,
+                    fetch_func=self._create_swap,
+                    filename="swap_%s" % swap_mb,
+                    size=size,
+                    swap_mb=swap_mb)))
 
         # Config drive
-        if configdrive.required_by(instance):
+        use_config_drive = configdrive.required_by(instance)
+        if use_config_drive:
             LOG.info(_('Using config drive'), instance=instance)
             extra_md = {}
             if admin_pass:
@@ -2411,21 +2499,29 @@ class LibvirtDriver(driver.ComputeDriver):
 
             inst_md = instance_metadata.InstanceMetadata(instance,
                 content=files, extra_md=extra_md, network_info=network_info)
-            with configdrive.ConfigDriveBuilder(instance_md=inst_md) as cdb:
-                configdrive_path = basepath(fname='disk.config')
-                LOG.info(_('Creating config drive at %(path)s'),
-                         {'path': configdrive_path}, instance=instance)
 
-                try:
-                    cdb.make_drive(configdrive_path)
-                except processutils.ProcessExecutionError as e:
-                    with excutils.save_and_reraise_exception():
-                        LOG.error(_('Creating config drive failed '
-                                  'with error: %s'),
-                                  e, instance=instance)
+            def _create_config_drive():
+                with configdrive.ConfigDriveBuilder(
+                        instance_md=inst_md) as cdb:
+                    configdrive_path = basepath(fname='disk.config')
+                    LOG.info(_('Creating config drive at %(path)s'),
+                             {'path': configdrive_path}, instance=instance)
+
+                    try:
+                        cdb.make_drive(configdrive_path)
+                    except processutils.ProcessExecutionError as e:
+                        with excutils.save_and_reraise_exception():
+                            LOG.error(_('Creating config drive failed '
+                                      'with error: %s'),
+                                      e, instance=instance)
+
+            steps.append(('disk.config', _create_config_drive))
+
+        self._run_image_steps(context, instance, steps)
 
         # File injection only if needed
-        elif inject_files and CONF.libvirt_inject_partition != -2:
+        if (not use_config_drive and inject_files and
+                CONF.libvirt_inject_partition != -2):
             target_partition = None
             if not instance['kernel_id']:
                 target_partition = CONF.libvirt_inject_partition
@@ -2477,6 +2573,79 @@ class LibvirtDriver(driver.ComputeDriver):
         if CONF.libvirt_type == 'uml':
             libvirt_utils.chown(image('disk').path, 'root')
 
+    def _run_image_steps(self, context, instance, steps):
+        """Run independent image preparation steps.
+
+        Up to libvirt_image_prep_concurrency steps run at once, each in its
+        own greenthread. If any of them fail, the others are still waited
+        for and then the first failure is raised. Only steps run this way
+        are recorded as instance action events, as recording them costs
+        two conductor calls each.
+        """
+        concurrency = CONF.libvirt_image_prep_concurrency
+        if concurrency <= 1 or len(steps) <= 1:
+            for name, func in steps:
+                self._run_image_step(context, instance, name, func)
+            return
+
+        pool = greenpool.GreenPool(concurrency)
+        threads = [pool.spawn(self._run_image_step, context, instance,
+                              name, func, record_event=True)
+                   for name, func in steps]
+        exc_info = None
+        for thread in threads:
+            try:
+                thread.wait()
+            except Exception:
+                if exc_info is None:
+                    exc_info = sys.exc_info()
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def _run_image_step(self, context, instance, name, func,
+                        record_event=False):
+        """Run one image preparation step, logging how long it took.
+
+        With record_event, the timing is also recorded as a
+        'libvirt_create_image_<name>' instance action event.
+        """
+        start_time = timeutils.utcnow()
+        start = time.time()
+        exc_info = (None, None, None)
+        try:
+            func()
+        except Exception:
+            exc_info = sys.exc_info()
+            raise
+        finally:
+            LOG.debug(_("Image preparation step %(step)s took %(secs).2f "
+                        "seconds"),
+                      {'step': name, 'secs': time.time() - start},
+                      instance=instance)
+            if record_event:
+                self._record_image_step_event(context, instance, name,
+                                              start_time, exc_info)
+
+    def _record_image_step_event(self, context, instance, name, start_time,
+                                 exc_info):
+        if context is None:
+            return
+        event_name = 'libvirt_create_image_%s' % name
+        try:
+            values = compute_utils.pack_action_event_start(
+                context, instance['uuid'], event_name)
+            values['start_time'] = start_time
+            self.virtapi.action_event_start(context, values)
+            values = compute_utils.pack_action_event_finish(
+                context, instance['uuid'], event_name,
+                exc_val=exc_info[1], exc_tb=exc_info[2])
+            self.virtapi.action_event_finish(context, values)
+        except Exception as e:
+            # NOTE: not every caller has an instance action to attach
+            # events to, and reporting must never fail the spawn.
+            LOG.debug(_("Unable to record event %(event)s: %(e)s"),
+                      {'event': event_name, 'e': e}, instance=instance)
+
     def _prepare_pci_devices_for_use(self, pci_devices):
         # kvm , qemu support managed mode
         # In managed mode, the configured device will be automatically
@@ -2562,6 +2731,8 @@ class LibvirtDriver(driver.ComputeDriver):
     def get_host_capabilities(self):
         """Returns an instance of config.LibvirtConfigCaps representing
            the capabilities of the host.
+
+        The result is cached for the life of the libvirt connection.
         """
         if not self._caps:
             xmlstr = self._conn.getCapabilities()
@@ -3503,12 +3674,16 @@ class LibvirtDriver(driver.ComputeDriver):
         """Get cpuinfo information.
 
         Obtains cpu feature from virConnect.getCapabilities,
-        and returns as a json string.
+        and returns as a json string. The result is cached for the life
+        of the libvirt connection.
 
         :return: see above description
 
         """
 
+        if self._cpu_info is not None:
+            return self._cpu_info
+
         caps = self.get_host_capabilities()
         cpu_info = dict()
 
@@ -3536,7 +3711,8 @@ class LibvirtDriver(driver.ComputeDriver):
         # That said, arch_filter.py now seems to rely on
         # the libvirt drivers format which suggests this
         # data format needs to be standardized across drivers
-        return jsonutils.dumps(cpu_info)
+        self._cpu_info = jsonutils.dumps(cpu_info)
+        return self._cpu_info
 
     def _get_pcidev_info(self, devname):
         """Returns a dict of PCI device."""
@@ -4321,13 +4497,13 @@ class LibvirtDriver(driver.ComputeDriver):
         # Disk size that all instance uses : virtual_size - disk_size
         instances_name = self.list_instances()
         disk_over_committed_size = 0
+        seen_uuids = set()
         for i_name in instances_name:
             try:
-                disk_infos = jsonutils.loads(
-                        self.get_instance_disk_info(i_name))
-                for info in disk_infos:
-                    disk_over_committed_size += int(
-                        info['over_committed_disk_size'])
+                virt_dom = self._lookup_by_name(i_name)
+                seen_uuids.add(virt_dom.UUIDString())
+                disk_over_committed_size += (
+                    self._get_disk_over_committed_size(i_name, virt_dom))
             except OSError as e:
                 if e.errno == errno.ENOENT:
                     LOG.error(_('Getting disk size of %(i_name)s: %(e)s'),
@@ -4337,10 +4513,47 @@ class LibvirtDriver(driver.ComputeDriver):
             except exception.InstanceNotFound:
                 # Instance was deleted during the check so ignore it
                 pass
+            except libvirt.libvirtError as ex:
+                # The domain may vanish between looking it up and querying it
+                if ex.get_error_code() != libvirt.VIR_ERR_NO_DOMAIN:
+                    raise
             # NOTE(gtt116): give change to do other task.
             greenthread.sleep(0)
+
+        # Forget about domains which no longer exist
+        for uuid in set(self._disk_over_commit_cache) - seen_uuids:
+            del self._disk_over_commit_cache[uuid]
         return disk_over_committed_size
 
+    def _get_disk_over_committed_size(self, instance_name, virt_dom):
+        """Return the over committed disk size of a single domain.
+
+        Inspecting the disks runs qemu-img on each of them, so the result
+        is cached per domain UUID until the domain XML or the mtime or size
+        of one of its disk files changes.
+        """
+        xml = virt_dom.XMLDesc(0)
+        disk_stats = []
+        doc = etree.fromstring(xml)
+        for source in doc.findall('.//devices/disk/source'):
+            path = source.get('file')
+            if path:
+                stat = os.stat(path)
+                disk_stats.append((path, stat.st_mtime, stat.st_size))
+        fingerprint = (xml, disk_stats)
+
+        uuid = virt_dom.UUIDString()
+        cached = self._disk_over_commit_cache.get(uuid)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        disk_infos = jsonutils.loads(
+                self.get_instance_disk_info(instance_name, xml=xml))
+        size = sum(int(info['over_committed_disk_size'])
+                   for info in disk_infos)
+        self._disk_over_commit_cache[uuid] = (fingerprint, size)
+        return size
+
     def unfilter_instance(self, instance, network_info):
         """See comments of same method in firewall_driver."""
         self.firewall_driver.unfilter_instance(instance,
@@ -4362,7 +4575,49 @@ class LibvirtDriver(driver.ComputeDriver):
 
     def manage_image_cache(self, context, all_instances):
         """Manage the local cache of images."""
-        self.image_cache_manager.verify_base_images(context, all_instances)
+        if not CONF.image_cache_manager_background:
+            self.image_cache_manager.verify_base_images(context,
+                                                        all_instances)
+            return
+
+        if self._image_cache_pass is not None:
+            LOG.debug(_('Previous image cache manager pass still running, '
+                        'skipping'))
+            return
+
+        def _run_pass():
+            try:
+                self.image_cache_manager.verify_base_images(context,
+                                                            all_instances)
+            except Exception:
+                LOG.exception(_('Image cache manager pass failed'))
+            finally:
+                self._image_cache_pass = None
+
+        self._image_cache_pass = greenthread.spawn(_run_pass)
+
+    def cache_image(self, context, image_id):
+        """Download an image into _base ahead of it being used."""
+        base_dir = os.path.join(CONF.instances_path, CONF.base_dir_name)
+        fileutils.ensure_tree(base_dir)
+        filename = imagecache.get_cache_fname({'image_id': image_id},
+                                              'image_id')
+        base = os.path.join(base_dir, filename)
+
+        # NOTE: this takes the same lock as imagebackend.Image.cache() so
+        # that spawns of the image wait for this download too.
+        @utils.synchronized(filename, external=True,
+                            lock_path=os.path.join(CONF.instances_path,
+                                                   'locks'))
+        def fetch_if_not_exists(target):
+            if not os.path.exists(target):
+                libvirt_utils.fetch_image(context, target, image_id,
+                                          context.user_id,
+                                          context.project_id)
+
+        imagedownload.get_coordinator().fetch(base, fetch_if_not_exists,
+                                              base)
+        imagecache.write_stored_info(base, field='precached', value=image_id)
 
     def _cleanup_remote_migration(self, dest, inst_base, inst_base_resize,
                                   shared_storage=False):
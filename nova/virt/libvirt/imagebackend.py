@@ -18,6 +18,7 @@
 import abc
 import contextlib
 import os
+import urllib
 
 from oslo.config import cfg
 
@@ -27,10 +28,12 @@ from nova.openstack.common import fileutils
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
+from nova.openstack.common import processutils
 from nova import utils
 from nova.virt.disk import api as disk
 from nova.virt import images
 from nova.virt.libvirt import config as vconfig
+from nova.virt.libvirt import imagedownload
 from nova.virt.libvirt import utils as libvirt_utils
 
 
@@ -63,6 +66,21 @@ __imagebackend_opts = [
     cfg.StrOpt('libvirt_images_rbd_ceph_conf',
             default='',  # default determined by librados
             help='path to the ceph configuration file to use'),
+    cfg.BoolOpt('libvirt_images_reflink',
+            default=False,
+            help='Copy cached base images into raw instance disks with'
+                 ' cp --reflink=auto, so that filesystems supporting'
+                 ' reflinks share the data blocks instead of copying them.'),
+    cfg.StrOpt('libvirt_images_lvm_thin_pool',
+            help='Thin pool in libvirt_images_volume_group. If set, each'
+                 ' cached base image is written once to a thin logical'
+                 ' volume and instance disks are created as thin snapshots'
+                 ' of it instead of full copies.'),
+    cfg.BoolOpt('libvirt_images_rbd_clone',
+            default=False,
+            help='Clone rbd instance disks directly from Glance images'
+                 ' stored in the same Ceph cluster instead of downloading'
+                 ' and importing them.'),
         ]
 
 CONF = cfg.CONF
@@ -157,13 +175,19 @@ class Image(object):
         :size: Size of created image in bytes (optional)
         """
         @utils.synchronized(filename, external=True, lock_path=self.lock_path)
-        def call_if_not_exists(target, *args, **kwargs):
+        def fetch_if_not_exists(target, *args, **kwargs):
             if not os.path.exists(target):
                 fetch_func(target=target, *args, **kwargs)
             elif CONF.libvirt_images_type == "lvm" and \
                     'ephemeral_size' in kwargs:
                 fetch_func(target=target, *args, **kwargs)
 
+        def call_if_not_exists(target, *args, **kwargs):
+            # Requests for a target that is already being fetched by this
+            # host wait for that fetch rather than queue up on the lock.
+            imagedownload.get_coordinator().fetch(
+                target, fetch_if_not_exists, target, *args, **kwargs)
+
         base_dir = os.path.join(CONF.instances_path, CONF.base_dir_name)
         if not os.path.exists(base_dir):
             fileutils.ensure_tree(base_dir)
@@ -222,7 +246,8 @@ class Raw(Image):
     def create_image(self, prepare_template, base, size, *args, **kwargs):
         @utils.synchronized(base, external=True, lock_path=self.lock_path)
         def copy_raw_image(base, target, size):
-            libvirt_utils.copy_image(base, target)
+            libvirt_utils.copy_image(base, target,
+                                     reflink=CONF.libvirt_images_reflink)
             if size:
                 # class Raw is misnamed, format may not be 'raw' in all cases
                 use_cow = self.driver_format == 'qcow2'
@@ -382,11 +407,45 @@ class Lvm(Image):
                                            size, sparse=self.sparse)
             with self.remove_volume_on_error(self.path):
                 prepare_template(target=self.path, *args, **kwargs)
+        elif CONF.libvirt_images_lvm_thin_pool and not generated:
+            prepare_template(target=base, *args, **kwargs)
+            base_lv = self._create_base_volume(base)
+            with self.remove_volume_on_error(self.path):
+                self._clone_base_volume(base_lv, size)
         else:
             prepare_template(target=base, *args, **kwargs)
             with self.remove_volume_on_error(self.path):
                 create_lvm_image(base, size)
 
+    def _create_base_volume(self, base):
+        """Make sure the cached base image has a thin volume of its own.
+
+        The volume is only written the first time the base image is used
+        on this host, later instances are snapshots of it.
+        """
+        base_lv = '_base_%s' % self.escape(os.path.basename(base))
+
+        @utils.synchronized(base, external=True, lock_path=self.lock_path)
+        def create_base_volume():
+            if base_lv in libvirt_utils.list_logical_volumes(self.vg):
+                return
+            base_path = os.path.join('/dev', self.vg, base_lv)
+            libvirt_utils.create_lvm_thin_volume(
+                self.vg, CONF.libvirt_images_lvm_thin_pool, base_lv,
+                disk.get_disk_size(base))
+            with self.remove_volume_on_error(base_path):
+                images.convert_image(base, base_path, 'raw',
+                                     run_as_root=True)
+
+        create_base_volume()
+        return base_lv
+
+    def _clone_base_volume(self, base_lv, size):
+        libvirt_utils.create_lvm_thin_snapshot(self.vg, base_lv, self.lv)
+        if size and size > libvirt_utils.logical_volume_size(self.path):
+            libvirt_utils.extend_logical_volume(self.path, size)
+            disk.resize2fs(self.path, run_as_root=True)
+
     @contextlib.contextmanager
     def remove_volume_on_error(self, path):
         try:
@@ -440,6 +499,65 @@ class Rbd(Image):
         args.extend(['--conf', self.ceph_conf])
         return args
 
+    def _get_fsid(self):
+        args = ['ceph', 'fsid'] + self._ceph_args()
+        out, _ = utils.execute(*args)
+        return out.strip()
+
+    @staticmethod
+    def _parse_location(url):
+        """Split an rbd://fsid/pool/image/snapshot url into its parts.
+
+        Returns None for anything that isn't a complete rbd location.
+        """
+        prefix = 'rbd://'
+        if not url or not url.startswith(prefix):
+            return None
+        pieces = [urllib.unquote(piece)
+                  for piece in url[len(prefix):].split('/')]
+        if len(pieces) != 4 or '' in pieces:
+            return None
+        return pieces
+
+    def _clone_image(self, context, image_id):
+        """Clone the disk from the Glance image's own rbd location.
+
+        This only works for raw images stored in the cluster the disks
+        are created in. Returns False when the image has to be downloaded
+        and imported instead.
+        """
+        try:
+            image_meta, locations = images.get_image_locations(context,
+                                                               image_id)
+        except Exception as e:
+            LOG.debug(_("Unable to get locations of image %(image)s: %(e)s"),
+                      {'image': image_id, 'e': e})
+            return False
+        if image_meta.get('disk_format') != 'raw':
+            return False
+
+        fsid = None
+        for url in locations:
+            location = self._parse_location(url)
+            if location is None:
+                continue
+            if fsid is None:
+                fsid = self._get_fsid()
+            if location[0] != fsid:
+                continue
+            _fsid, pool, image, snapshot = location
+            try:
+                libvirt_utils.clone_rbd_image(
+                    '%s/%s@%s' % (pool, image, snapshot),
+                    '%s/%s' % (self.pool, self.rbd_name),
+                    *self._ceph_args())
+            except processutils.ProcessExecutionError as e:
+                LOG.debug(_("Unable to clone %(url)s: %(e)s"),
+                          {'url': url, 'e': e})
+                continue
+            return True
+        return False
+
     def _get_mon_addrs(self):
         args = ['ceph', 'mon', 'dump', '--format=json'] + self._ceph_args()
         out, _ = utils.execute(*args)
@@ -512,6 +630,13 @@ class Rbd(Image):
             old_format = False
             features = self.rbd.RBD_FEATURE_LAYERING
 
+        if (CONF.libvirt_images_rbd_clone and self._supports_layering() and
+                kwargs.get('image_id') and kwargs.get('context')):
+            if self.check_image_exists():
+                return
+            if self._clone_image(kwargs['context'], kwargs['image_id']):
+                return
+
         if not os.path.exists(base):
             prepare_template(target=base, *args, **kwargs)
 
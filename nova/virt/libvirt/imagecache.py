@@ -36,6 +36,7 @@ from nova.openstack.common import fileutils
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
+from nova.openstack.common import processutils
 from nova import utils
 from nova.virt.libvirt import utils as virtutils
 
@@ -74,12 +75,43 @@ imagecache_opts = [
     cfg.IntOpt('checksum_interval_seconds',
                default=3600,
                help='How frequently to checksum base images'),
+    cfg.IntOpt('precached_image_keep_seconds',
+               default=7 * 24 * 3600,
+               help='Base images downloaded ahead of use by an image '
+                    'pre-cache request are kept this long even if no '
+                    'instance uses them'),
+    cfg.BoolOpt('checksum_only_changed_base_images',
+                default=False,
+                help='Only checksum base images again when their size or '
+                     'modification time changed since they were last '
+                     'verified by this host'),
+    cfg.IntOpt('checksum_max_read_rate',
+               default=0,
+               help='Maximum rate in MB per second at which base images are '
+                    'read when checksumming them. 0 means no limit'),
+    cfg.IntOpt('base_dir_listing_max_age',
+               default=0,
+               help='Seconds for which the listing of the base image '
+                    'directory is reused while the directory looks '
+                    'unchanged. Shared file systems such as NFS may not '
+                    'update the directory times promptly. 0 lists the '
+                    'directory on every pass'),
+    cfg.BoolOpt('cache_disk_backing_files',
+                default=False,
+                help='Remember the backing file of each instance disk '
+                     'between passes for as long as the disk file is '
+                     'unchanged, instead of reading it from every disk on '
+                     'every pass'),
     ]
 
 CONF = cfg.CONF
 CONF.register_opts(imagecache_opts)
 CONF.import_opt('host', 'nova.netconf')
 CONF.import_opt('instances_path', 'nova.compute.manager')
+CONF.import_opt('libvirt_images_volume_group',
+                'nova.virt.libvirt.imagebackend')
+CONF.import_opt('libvirt_images_lvm_thin_pool',
+                'nova.virt.libvirt.imagebackend')
 
 
 def get_cache_fname(images, key):
@@ -221,6 +253,26 @@ def write_stored_info(target, field=None, value=None):
     write_file(info_file, field, value)
 
 
+def _hash_base_file(target):
+    """Checksum a base image, reading it no faster than the configured rate.
+
+    This gives the same result as utils.hash_file().
+    """
+    checksum = hashlib.sha1()
+    rate = CONF.checksum_max_read_rate * 1024 * 1024
+    start = time.time()
+    read = 0
+    with open(target, 'r') as img_file:
+        for chunk in iter(lambda: img_file.read(1024 * 1024), b''):
+            checksum.update(chunk)
+            if rate:
+                read += len(chunk)
+                delay = float(read) / rate - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+    return checksum.hexdigest()
+
+
 def read_stored_checksum(target, timestamped=True):
     """Read the checksum.
 
@@ -232,8 +284,7 @@ def read_stored_checksum(target, timestamped=True):
 def write_stored_checksum(target):
     """Write a checksum to disk for a file in _base."""
 
-    with open(target, 'r') as img_file:
-        checksum = utils.hash_file(img_file)
+    checksum = _hash_base_file(target)
     write_stored_info(target, field='sha1', value=checksum)
 
 
@@ -242,6 +293,12 @@ class ImageCacheManager(object):
         self.lock_path = os.path.join(CONF.instances_path, 'locks')
         self._reset_state()
 
+        # These are kept between passes so that work whose inputs haven't
+        # changed isn't repeated.
+        self._base_dir_listing = (None, None, [])
+        self._backing_files = {}
+        self._verified_base_files = {}
+
     def _reset_state(self):
         """Reset state variables used for each pass."""
 
@@ -273,15 +330,33 @@ class ImageCacheManager(object):
         Note that this does not return a value. It instead populates a class
         variable with a list of images that we need to try and explain.
         """
-        digest_size = hashlib.sha1().digestsize * 2
-        for ent in os.listdir(base_dir):
-            if len(ent) == digest_size:
-                self._store_image(base_dir, ent, original=True)
-
-            elif (len(ent) > digest_size + 2 and
-                  ent[digest_size] == '_' and
-                  not is_valid_info_file(os.path.join(base_dir, ent))):
-                self._store_image(base_dir, ent, original=False)
+        # NOTE: the listing is only redone when the directory's times or
+        # link count show that it changed since the previous pass, or once
+        # the listing is older than base_dir_listing_max_age. Directory
+        # times are not always updated promptly on NFS.
+        try:
+            stat = os.stat(base_dir)
+            signature = (stat.st_mtime, stat.st_ctime, stat.st_nlink)
+        except OSError:
+            signature = None
+        now = time.time()
+        cached_signature, listed_at, images = self._base_dir_listing
+        if (signature is None or signature != cached_signature or
+                now - listed_at >= CONF.base_dir_listing_max_age):
+            images = []
+            digest_size = hashlib.sha1().digestsize * 2
+            for ent in os.listdir(base_dir):
+                if len(ent) == digest_size:
+                    images.append((ent, True))
+
+                elif (len(ent) > digest_size + 2 and
+                      ent[digest_size] == '_' and
+                      not is_valid_info_file(os.path.join(base_dir, ent))):
+                    images.append((ent, False))
+            self._base_dir_listing = (signature, now, images)
+
+        for ent, original in images:
+            self._store_image(base_dir, ent, original=original)
 
     def _list_running_instances(self, context, all_instances):
         """List running instances (on all compute nodes)."""
@@ -322,16 +397,43 @@ class ImageCacheManager(object):
                 self.image_popularity.setdefault(image_ref_str, 0)
                 self.image_popularity[image_ref_str] += 1
 
+    def _get_disk_backing_file(self, disk_path):
+        """Return the backing file of an instance disk.
+
+        With cache_disk_backing_files set, the answer is remembered for as
+        long as the disk file looks unchanged. A disk recreated by a
+        rebuild or rebased in place changes its ctime, so it is read
+        again even if its inode number was reused.
+        """
+        if not CONF.cache_disk_backing_files:
+            return virtutils.get_disk_backing_file(disk_path)
+
+        try:
+            stat = os.stat(disk_path)
+            signature = (stat.st_ino, stat.st_dev, stat.st_ctime,
+                         stat.st_size)
+        except OSError:
+            signature = None
+        cached = self._backing_files.get(disk_path)
+        if signature is not None and cached and cached[0] == signature:
+            return cached[1]
+
+        backing_file = virtutils.get_disk_backing_file(disk_path)
+        self._backing_files[disk_path] = (signature, backing_file)
+        return backing_file
+
     def _list_backing_images(self):
         """List the backing images currently in use."""
         inuse_images = []
+        disk_paths = set()
         for ent in os.listdir(CONF.instances_path):
             if ent in self.instance_names:
                 LOG.debug(_('%s is a valid instance name'), ent)
                 disk_path = os.path.join(CONF.instances_path, ent, 'disk')
                 if os.path.exists(disk_path):
                     LOG.debug(_('%s has a disk file'), ent)
-                    backing_file = virtutils.get_disk_backing_file(disk_path)
+                    disk_paths.add(disk_path)
+                    backing_file = self._get_disk_backing_file(disk_path)
                     LOG.debug(_('Instance %(instance)s is backed by '
                                 '%(backing)s'),
                               {'instance': ent,
@@ -353,6 +455,11 @@ class ImageCacheManager(object):
                                          'backing': backing_file})
                             self.unexplained_images.remove(backing_path)
 
+        # Forget about disks that have gone away
+        for disk_path in self._backing_files.keys():
+            if disk_path not in disk_paths:
+                del self._backing_files[disk_path]
+
         return inuse_images
 
     def _find_base_file(self, base_dir, fingerprint):
@@ -416,8 +523,16 @@ class ImageCacheManager(object):
                     write_stored_info(base_file, field='sha1',
                                       value=stored_checksum)
 
-                with open(base_file, 'r') as f:
-                    current_checksum = utils.hash_file(f)
+                if (CONF.checksum_only_changed_base_images and
+                        self._verified_base_files.get(base_file) ==
+                        self._stat_base_file(base_file)):
+                    LOG.debug(_('image %(id)s at (%(base_file)s): unchanged '
+                                'since last verified'),
+                              {'id': img_id,
+                               'base_file': base_file})
+                    return True
+
+                current_checksum = _hash_base_file(base_file)
 
                 if current_checksum != stored_checksum:
                     LOG.error(_('image %(id)s at (%(base_file)s): image '
@@ -427,6 +542,8 @@ class ImageCacheManager(object):
                     return False
 
                 else:
+                    self._verified_base_files[base_file] = (
+                        self._stat_base_file(base_file))
                     return True
 
             else:
@@ -448,6 +565,20 @@ class ImageCacheManager(object):
 
         return inner_verify_checksum()
 
+    @staticmethod
+    def _stat_base_file(base_file):
+        stat = os.stat(base_file)
+        return stat.st_size, stat.st_mtime
+
+    def _is_precached(self, base_file):
+        """Check if a base file was recently downloaded by cache_image()."""
+        image_id, timestamp = read_stored_info(base_file, field='precached',
+                                               timestamped=True)
+        if not image_id or not timestamp:
+            return False
+        age = time.time() - timestamp
+        return age < CONF.precached_image_keep_seconds
+
     def _remove_base_file(self, base_file):
         """Remove a single base file if it is old enough.
 
@@ -472,6 +603,7 @@ class ImageCacheManager(object):
             LOG.info(_('Removing base file: %s'), base_file)
             try:
                 os.remove(base_file)
+                self._verified_base_files.pop(base_file, None)
                 signature = get_info_filename(base_file)
                 if os.path.exists(signature):
                     os.remove(signature)
@@ -481,6 +613,44 @@ class ImageCacheManager(object):
                           {'base_file': base_file,
                            'error': e})
 
+    def _remove_base_volumes(self, base_dir):
+        """Remove the thin base volumes of base files which are gone.
+
+        With libvirt_images_lvm_thin_pool, Lvm disks are snapshots of a
+        thin volume named _base_<base file>. The volume is removed once
+        its base file was removed, so it is kept as long and by the same
+        rules. The instance disks are thin volumes of their own and are
+        not affected.
+        """
+        vg = CONF.libvirt_images_volume_group
+        if not vg or not CONF.libvirt_images_lvm_thin_pool:
+            return
+
+        # NOTE: Lvm.escape() doubles underscores, so instance volume names
+        # never start with _base_.
+        prefix = '_base_'
+        for lv in virtutils.list_logical_volumes(vg):
+            if not lv.startswith(prefix):
+                continue
+            base_file = os.path.join(base_dir,
+                                     lv[len(prefix):].replace('__', '_'))
+
+            # Same lock as Lvm._create_base_volume()
+            @utils.synchronized(base_file, external=True,
+                                lock_path=self.lock_path)
+            def remove_base_volume(lv, base_file):
+                if os.path.exists(base_file):
+                    return
+                LOG.info(_('Removing base volume: %s'), lv)
+                try:
+                    virtutils.remove_thin_volume(vg, lv)
+                except processutils.ProcessExecutionError as e:
+                    LOG.error(_('Failed to remove base volume %(lv)s, '
+                                'error was %(error)s'),
+                              {'lv': lv, 'error': e})
+
+            remove_base_volume(lv, base_file)
+
     def _handle_base_image(self, img_id, base_file):
         """Handle the checks for a single base image."""
 
@@ -549,6 +719,11 @@ class ImageCacheManager(object):
                 if os.path.exists(base_file):
                     virtutils.chown(base_file, os.getuid())
                     os.utime(base_file, None)
+                    # Touching the file isn't a change to its contents
+                    if (checksum_result and
+                            base_file in self._verified_base_files):
+                        self._verified_base_files[base_file] = (
+                            self._stat_base_file(base_file))
 
     def verify_base_images(self, context, all_instances):
         """Verify that base images are in a reasonable state."""
@@ -593,6 +768,13 @@ class ImageCacheManager(object):
             if backing_path not in self.active_base_files:
                 self.active_base_files.append(backing_path)
 
+        # Images pre-cached ahead of use are kept for a while
+        for img in self.unexplained_images[:]:
+            if self._is_precached(img):
+                LOG.info(_('%s was pre-cached and is kept'), img)
+                self.unexplained_images.remove(img)
+                self.active_base_files.append(img)
+
         # Anything left is an unknown base image
         for img in self.unexplained_images:
             LOG.warning(_('Unknown base file: %s'), img)
@@ -614,5 +796,8 @@ class ImageCacheManager(object):
                 for base_file in self.removable_base_files:
                     self._remove_base_file(base_file)
 
+        if CONF.remove_unused_base_images:
+            self._remove_base_volumes(base_dir)
+
         # That's it
         LOG.debug(_('Verification complete'))
@@ -0,0 +1,185 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Host local coordination of image downloads.
+
+When many instances using the same uncached image are spawned on a host
+at once, only the first request fetches the image. The others wait for
+that transfer to finish, logging its progress while they do, instead of
+queueing up on the image lock. The number of transfers running at the
+same time can be limited to protect the host's disk I/O.
+"""
+
+import os
+import sys
+import time
+
+from eventlet import event
+from eventlet import semaphore
+from eventlet import timeout
+from oslo.config import cfg
+
+from nova import exception
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+imagedownload_opts = [
+    cfg.IntOpt('max_concurrent_image_downloads',
+               default=0,
+               help='Maximum number of images downloaded at the same time '
+                    'by this host. Further downloads wait in a queue. '
+                    '0 means no limit'),
+    cfg.IntOpt('image_download_retries',
+               default=0,
+               help='Number of times a failed image download is retried '
+                    'before the instances waiting for it fail'),
+    cfg.IntOpt('image_download_progress_interval',
+               default=30,
+               help='Interval in seconds at which the progress of a shared '
+                    'image download is logged while instances wait for it'),
+    cfg.IntOpt('image_download_wait_timeout',
+               default=0,
+               help='Seconds an instance waits for a download started by '
+                    'another instance before giving up. 0 means wait until '
+                    'the download finishes'),
+    ]
+
+CONF = cfg.CONF
+CONF.register_opts(imagedownload_opts)
+
+
+class _Download(object):
+    """A transfer in flight and the requests waiting for it."""
+
+    def __init__(self, target):
+        self.target = target
+        self.state = 'queued'
+        self.attempts = 0
+        self.waiters = 0
+        self.created = time.time()
+        self.started = None
+        self.event = event.Event()
+
+    def bytes_downloaded(self):
+        # Image fetches write to a '.part' file that is renamed into place
+        # once complete.
+        for path in (self.target + '.part', self.target):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                pass
+        return 0
+
+    def to_dict(self):
+        return {'target': self.target,
+                'state': self.state,
+                'attempts': self.attempts,
+                'waiters': self.waiters,
+                'queued_seconds': (self.started or time.time()) - self.created,
+                'bytes': self.bytes_downloaded()}
+
+
+class DownloadCoordinator(object):
+    """Shares concurrent fetches of the same target between callers."""
+
+    def __init__(self):
+        self._downloads = {}
+        self._slots = None
+        if CONF.max_concurrent_image_downloads > 0:
+            self._slots = semaphore.Semaphore(
+                CONF.max_concurrent_image_downloads)
+
+    def get_downloads(self):
+        """Return the downloads in flight, queued ones included."""
+        return [download.to_dict() for download in self._downloads.values()]
+
+    def fetch(self, target, fetch_func, *args, **kwargs):
+        """Call fetch_func to create target, unless that's already underway.
+
+        If another greenthread is already fetching the same target this
+        waits for it to finish instead, and raises its error if it failed.
+        """
+        download = self._downloads.get(target)
+        if download is not None:
+            return self._wait(download)
+
+        download = _Download(target)
+        self._downloads[target] = download
+        try:
+            result = self._run(download, fetch_func, *args, **kwargs)
+        except Exception:
+            exc_info = sys.exc_info()
+            download.event.send_exception(*exc_info)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        else:
+            download.event.send(result)
+            return result
+        finally:
+            del self._downloads[target]
+
+    def _run(self, download, fetch_func, *args, **kwargs):
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            download.state = 'downloading'
+            download.started = time.time()
+            while True:
+                download.attempts += 1
+                try:
+                    return fetch_func(*args, **kwargs)
+                except Exception as e:
+                    if download.attempts > CONF.image_download_retries:
+                        raise
+                    LOG.warn(_("Download of %(target)s failed, retrying: "
+                               "%(e)s"), {'target': download.target, 'e': e})
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def _wait(self, download):
+        download.waiters += 1
+        start = time.time()
+        try:
+            while True:
+                interval = CONF.image_download_progress_interval or None
+                if CONF.image_download_wait_timeout:
+                    remaining = (CONF.image_download_wait_timeout -
+                                 (time.time() - start))
+                    if remaining <= 0:
+                        raise exception.ImageDownloadTimeout(
+                            target=download.target,
+                            timeout=CONF.image_download_wait_timeout)
+                    interval = min(interval or remaining, remaining)
+                with timeout.Timeout(interval, False):
+                    return download.event.wait()
+                LOG.info(_("Waiting for %(state)s download of %(target)s, "
+                           "%(bytes)d bytes so far after %(secs)d seconds"),
+                         {'state': download.state,
+                          'target': download.target,
+                          'bytes': download.bytes_downloaded(),
+                          'secs': time.time() - start})
+        finally:
+            download.waiters -= 1
+
+
+_COORDINATOR = None
+
+
+def get_coordinator():
+    global _COORDINATOR
+    if _COORDINATOR is None:
+        _COORDINATOR = DownloadCoordinator()
+    return _COORDINATOR
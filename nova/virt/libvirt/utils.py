@@ -258,10 +258,50 @@ def create_lvm_image(vg, lv, size, sparse=False):
     execute(*cmd, run_as_root=True, attempts=3)
 
 
+def create_lvm_thin_volume(vg, pool, lv, size):
+    """Create a thin logical volume.
+
+    :param vg: existing volume group which holds the thin pool
+    :param pool: existing thin pool which should hold this volume
+    :param lv: name for this volume
+    :size: virtual size of the volume in bytes
+    """
+    execute('lvcreate', '-V', '%db' % size, '-T', '%s/%s' % (vg, pool),
+            '-n', lv, run_as_root=True, attempts=3)
+
+
+def create_lvm_thin_snapshot(vg, origin, lv):
+    """Create a writable thin snapshot of a thin logical volume.
+
+    :param vg: volume group holding the origin volume
+    :param origin: name of the thin volume to snapshot
+    :param lv: name for the snapshot
+    """
+    # Thin snapshots are flagged to be skipped on activation by default,
+    # clear that so the snapshot is usable straight away.
+    execute('lvcreate', '-s', '-kn', '-n', lv, '%s/%s' % (vg, origin),
+            run_as_root=True, attempts=3)
+
+
+def extend_logical_volume(path, size):
+    """Grow a logical volume to the given size in bytes."""
+    execute('lvextend', '-L', '%db' % size, path,
+            run_as_root=True, attempts=3)
+
+
 def import_rbd_image(*args):
     execute('rbd', 'import', *args)
 
 
+def clone_rbd_image(src, dest, *args):
+    """Create a copy-on-write clone of an rbd snapshot.
+
+    :param src: protected snapshot to clone, as pool/image@snapshot
+    :param dest: name of the clone, as pool/image
+    """
+    execute('rbd', 'clone', src, dest, *args)
+
+
 def list_rbd_volumes(pool):
     """List volumes names for given ceph pool.
 
@@ -392,6 +432,16 @@ def remove_logical_volumes(*paths):
         execute(*lvremove, attempts=3, run_as_root=True)
 
 
+def remove_thin_volume(vg, lv):
+    """Remove a thin logical volume without clearing it first.
+
+    Only use this for volumes holding copies of images, clearing them
+    would allocate every block of the volume for nothing.
+    """
+    execute('lvremove', '-f', '%s/%s' % (vg, lv),
+            attempts=3, run_as_root=True)
+
+
 def pick_disk_driver_name(hypervisor_version, is_block_dev=False):
     """Pick the libvirt primary backend driver name
 
@@ -446,12 +496,14 @@ def get_disk_backing_file(path, basename=True):
     return backing_file
 
 
-def copy_image(src, dest, host=None):
+def copy_image(src, dest, host=None, reflink=False):
     """Copy a disk image to an existing directory
 
     :param src: Source image
     :param dest: Destination path
     :param host: Remote host
+    :param reflink: Share the data blocks with src on filesystems that
+                    support it (local copies only)
     """
 
     if not host:
@@ -459,7 +511,12 @@ def copy_image(src, dest, host=None):
         # sparse files.  I.E. holes will not be written to DEST,
         # rather recreated efficiently.  In addition, since
         # coreutils 8.11, holes can be read efficiently too.
-        execute('cp', src, dest)
+        if reflink:
+            # --reflink=auto falls back to a normal copy where the
+            # filesystem can't clone the file.
+            execute('cp', '--reflink=auto', src, dest)
+        else:
+            execute('cp', src, dest)
     else:
         dest = "%s:%s" % (host, dest)
         # Try rsync first as that can compress and create sparse dest files.
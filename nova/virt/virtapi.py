@@ -106,3 +106,19 @@ class VirtAPI(object):
         :param bdm: the block device mapping dict
         """
         raise NotImplementedError()
+
+    def action_event_start(self, context, values):
+        """Record the start of an instance action event
+        :param context: security context
+        :param values: the event values, see
+                       nova.compute.utils.pack_action_event_start
+        """
+        raise NotImplementedError()
+
+    def action_event_finish(self, context, values):
+        """Record the end of an instance action event
+        :param context: security context
+        :param values: the event values, see
+                       nova.compute.utils.pack_action_event_finish
+        """
+        raise NotImplementedError()
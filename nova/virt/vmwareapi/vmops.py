@@ -1207,6 +1207,38 @@ class VMwareVMOps(object):
             LOG.info(_("Automatically hard rebooting"), instance=instance)
             self.compute_api.reboot(ctxt, instance, "HARD")
 
+    def list_instance_power_states(self, instances):
+        """Return the power state of each instance from one property query.
+
+        VMs are named either after the instance uuid or the instance name,
+        so both are tried, like vm_util.get_vm_ref() does.
+        """
+        vms = self._session._call_method(vim_util, "get_objects",
+                     "VirtualMachine", ["name", "runtime.powerState"])
+        vm_states = {}
+        while vms:
+            token = vm_util._get_token(vms)
+            for vm in vms.objects:
+                query = {'name': None, 'runtime.powerState': None}
+                for prop in vm.propSet:
+                    query[prop.name] = prop.val
+                vm_states[query['name']] = VMWARE_POWER_STATES.get(
+                    query['runtime.powerState'], power_state.NOSTATE)
+            if token:
+                vms = self._session._call_method(vim_util,
+                                                 "continue_to_get_objects",
+                                                 token)
+            else:
+                break
+
+        states = {}
+        for instance in instances:
+            state = vm_states.get(instance['uuid'])
+            if state is None:
+                state = vm_states.get(instance['name'], power_state.NOSTATE)
+            states[instance['uuid']] = state
+        return states
+
     def get_info(self, instance):
         """Return data about the VM instance."""
         vm_ref = vm_util.get_vm_ref(self._session, instance)
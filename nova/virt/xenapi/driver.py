@@ -343,6 +343,10 @@ class XenAPIDriver(driver.ComputeDriver):
         """Return data about VM instance."""
         return self._vmops.get_info(instance)
 
+    def list_instance_power_states(self, instances):
+        """Efficient override of base list_instance_power_states method."""
+        return self._vmops.list_instance_power_states(instances)
+
     def get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         return self._vmops.get_diagnostics(instance)
@@ -231,6 +231,7 @@ def after_VBD_create(vbd_ref, vbd_rec):
 
 def after_VM_create(vm_ref, vm_rec):
     """Create read-only fields in the VM record."""
+    vm_rec.setdefault('is_a_template', False)
     vm_rec.setdefault('is_control_domain', False)
     vm_rec.setdefault('memory_static_max', str(8 * 1024 * 1024 * 1024))
     vm_rec.setdefault('memory_dynamic_max', str(8 * 1024 * 1024 * 1024))
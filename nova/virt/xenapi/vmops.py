@@ -1395,6 +1395,23 @@ class VMOps(object):
             LOG.info(_("Automatically hard rebooting"), instance=instance)
             self.compute_api.reboot(ctxt, instance, "HARD")
 
+    def list_instance_power_states(self, instances):
+        """Return the power state of each instance from one VM query."""
+        vm_states = {}
+        # NOTE: not vm_utils.list_vms(), which skips halted VMs as they
+        # are not resident on any host.
+        for vm_ref, vm_rec in self._session.get_all_refs_and_recs('VM'):
+            if vm_rec['is_a_template'] or vm_rec['is_control_domain']:
+                continue
+            vm_states[vm_rec['name_label']] = vm_utils.XENAPI_POWER_STATE[
+                vm_rec['power_state']]
+
+        states = {}
+        for instance in instances:
+            states[instance['uuid']] = vm_states.get(instance['name'],
+                                                     power_state.NOSTATE)
+        return states
+
     def get_info(self, instance, vm_ref=None):
         """Return data about VM instance."""
         vm_ref = vm_ref or self._get_vm_opaque_ref(instance)
@@ -22,6 +22,7 @@
 from __future__ import print_function
 
 import os.path
+import random
 import socket
 import sys
 
@@ -64,7 +65,23 @@ wsgi_opts = [
     cfg.IntOpt('tcp_keepidle',
                default=600,
                help="Sets the value of TCP_KEEPIDLE in seconds for each "
-                    "server socket. Not supported on OS X.")
+                    "server socket. Not supported on OS X."),
+    cfg.IntOpt('wsgi_default_pool_size',
+               default=1000,
+               help="Size of the pool of greenthreads used by each wsgi "
+                    "server process to handle requests"),
+    cfg.IntOpt('wsgi_worker_max_requests',
+               default=0,
+               help="Number of requests after which an API worker process "
+                    "stops accepting connections and exits once the "
+                    "requests in progress are done, to be replaced by a "
+                    "new one. Only used when the API runs several "
+                    "workers. 0 means workers are never recycled"),
+    cfg.IntOpt('wsgi_worker_max_requests_jitter',
+               default=0,
+               help="Maximum number of requests randomly added to "
+                    "wsgi_worker_max_requests for each API worker, so that "
+                    "the workers are not all recycled at the same time"),
     ]
 CONF = cfg.CONF
 CONF.register_opts(wsgi_opts)
@@ -75,11 +92,10 @@ LOG = logging.getLogger(__name__)
 class Server(object):
     """Server class to manage a WSGI server, serving a WSGI application."""
 
-    default_pool_size = 1000
-
     def __init__(self, name, app, host='0.0.0.0', port=0, pool_size=None,
                        protocol=eventlet.wsgi.HttpProtocol, backlog=128,
-                       use_ssl=False, max_url_len=None):
+                       use_ssl=False, max_url_len=None, max_requests=None,
+                       max_requests_jitter=0):
         """Initialize, but do not start, a WSGI server.
 
         :param name: Pretty name for logging.
@@ -89,6 +105,12 @@ class Server(object):
         :param pool_size: Maximum number of eventlets to spawn concurrently.
         :param backlog: Maximum number of queued connections.
         :param max_url_len: Maximum length of permitted URLs.
+        :param max_requests: Number of requests after which the server
+                             stops accepting connections, so the process
+                             running it can be replaced.
+        :param max_requests_jitter: Maximum number of requests randomly
+                                    added to max_requests when the server
+                                    is started.
         :returns: None
         :raises: nova.exception.InvalidInput
         """
@@ -96,11 +118,16 @@ class Server(object):
         self.app = app
         self._server = None
         self._protocol = protocol
-        self._pool = eventlet.GreenPool(pool_size or self.default_pool_size)
+        self._pool = eventlet.GreenPool(pool_size or
+                                        CONF.wsgi_default_pool_size)
         self._logger = logging.getLogger("nova.%s.wsgi.server" % self.name)
         self._wsgi_logger = logging.WritableLogger(self._logger)
         self._use_ssl = use_ssl
         self._max_url_len = max_url_len
+        self._max_requests = max_requests
+        self._max_requests_jitter = max_requests_jitter
+        self._requests_limit = None
+        self._requests = 0
 
         if backlog < 1:
             raise exception.InvalidInput(
@@ -196,8 +223,48 @@ class Server(object):
         if self._max_url_len:
             wsgi_kwargs['url_length_limit'] = self._max_url_len
 
+        if self._max_requests:
+            # NOTE: workers are forked before they start their server, and
+            # SystemRandom does not share its state with the parent process.
+            self._requests_limit = self._max_requests
+            if self._max_requests_jitter > 0:
+                self._requests_limit += random.SystemRandom().randint(
+                    0, self._max_requests_jitter)
+            wsgi_kwargs['protocol'] = self._recycling_protocol()
+
         self._server = eventlet.spawn(**wsgi_kwargs)
 
+    def _recycling_protocol(self):
+        """Return a protocol class counting the requests it handles.
+
+        Once the limit is reached, every response closes its connection so
+        that the client reconnects to another worker.
+        """
+        server = self
+        protocol = self._protocol
+
+        class RecyclingProtocol(protocol):
+            def handle_one_response(self):
+                if server._count_request():
+                    # eventlet then answers with Connection: close, even to
+                    # clients which asked for keep-alive.
+                    self.close_connection = 1
+                return protocol.handle_one_response(self)
+
+        return RecyclingProtocol
+
+    def _count_request(self):
+        """Count a request, returning whether the limit has been reached."""
+        self._requests += 1
+        if self._requests == self._requests_limit:
+            LOG.info(_("%(name)s served %(requests)d requests, no longer "
+                       "accepting connections"),
+                     {'name': self.name, 'requests': self._requests})
+            # Only the accept loop is killed, the requests already being
+            # served finish and wait() returns once they are done.
+            self._server.kill()
+        return self._requests >= self._requests_limit
+
     def stop(self):
         """Stop this server.
 
@@ -226,6 +293,10 @@ class Server(object):
             self._server.wait()
         except greenlet.GreenletExit:
             LOG.info(_("WSGI server has stopped."))
+        if self._max_requests:
+            # The server may have stopped after max_requests, let the
+            # requests still in progress finish.
+            self._pool.waitall()
 
 
 class Request(webob.Request):
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Time the startup of OpenStack API workers with and without preloading.
+
+The osapi_compute application is loaded from etc/nova/api-paste.ini, as
+nova-api does before forking its workers. Workers are then forked before
+and after the policy and the XML templates are preloaded, and each of
+them does the loading it would otherwise do on its first requests. The
+report shows the time this takes in each worker and the memory each
+worker stops sharing with the parent because of it (read from
+/proc/self/smaps, so this only runs on Linux):
+
+    python tools/benchmarks/api_startup.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                    os.pardir, os.pardir))
+sys.path.insert(0, ROOT)
+
+from oslo.config import cfg
+
+from nova.api.openstack import xmlutil
+from nova import config
+from nova import policy
+from nova import wsgi
+
+
+CONF = cfg.CONF
+
+
+def _private_dirty_kb():
+    total = 0
+    with open('/proc/self/smaps') as smaps:
+        for line in smaps:
+            if line.startswith('Private_Dirty:'):
+                total += int(line.split()[1])
+    return total
+
+
+def _preload():
+    start = time.time()
+    policy.init()
+    xmlutil.preload_templates()
+    return time.time() - start
+
+
+def _start_worker():
+    """Fork a worker which preloads, and return what it measured."""
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(rfd)
+        before = _private_dirty_kb()
+        elapsed = _preload()
+        os.write(wfd, json.dumps([elapsed, _private_dirty_kb() - before]))
+        os._exit(0)
+
+    os.close(wfd)
+    with os.fdopen(rfd) as pipe:
+        result = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+    return result
+
+
+def _report(label, workers):
+    results = [_start_worker() for i in range(workers)]
+    print '  %s:' % label
+    print '    Time per worker:      %.3f s' % (
+        sum(elapsed for elapsed, memory in results) / workers)
+    print '    Private memory:       %d kB per worker' % (
+        sum(memory for elapsed, memory in results) / workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of workers to fork')
+    args = parser.parse_args()
+
+    config.parse_args([sys.argv[0]])
+    CONF.set_override('api_paste_config',
+                      os.path.join(ROOT, 'etc', 'nova', 'api-paste.ini'))
+    CONF.set_override('policy_file',
+                      os.path.join(ROOT, 'etc', 'nova', 'policy.json'))
+
+    start = time.time()
+    wsgi.Loader().load_app('osapi_compute')
+    print 'Loading the application:  %.3f s' % (time.time() - start)
+    print 'Workers:                  %d' % args.workers
+
+    _report('without preloading', args.workers)
+    elapsed = _preload()
+    print '  preloading in the parent: %.3f s' % elapsed
+    _report('with preloading', args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Time EC2 DescribeInstances for a large number of instances.
+
+The database calls made while the instances are formatted are replaced by
+fakes which count them and sleep for --latency milliseconds to stand in
+for a round trip to the database. The report shows how the number of
+queries and the time taken grow with the number of instances:
+
+    python tools/benchmarks/ec2_describe_instances.py --count 1000 5000
+"""
+
+import argparse
+import collections
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                os.pardir, os.pardir)))
+
+from nova.api.ec2 import cloud
+from nova.api.ec2 import ec2utils
+from nova import availability_zones
+from nova.compute import flavors
+from nova import context
+from nova import db
+from nova.tests import fake_instance
+
+
+QUERIES = collections.defaultdict(int)
+
+
+def _fake_db_call(latency, name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        QUERIES[name] += 1
+        time.sleep(latency)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _stub_db(latency, ec2_ids):
+    def get_ec2_instance_id_by_uuid(context, instance_uuid):
+        return ec2_ids[instance_uuid]
+
+    def get_ec2_instance_ids_by_uuids(context, instance_uuids):
+        return dict((instance_uuid, ec2_ids[instance_uuid])
+                    for instance_uuid in instance_uuids)
+
+    def block_device_mapping_get_all_by_instance(context, instance_uuid):
+        return []
+
+    def block_device_mapping_get_all_by_instance_uuids(context,
+                                                       instance_uuids):
+        return dict((instance_uuid, []) for instance_uuid in instance_uuids)
+
+    def s3_image_get_by_uuid(context, image_uuid):
+        return {'id': 1, 'uuid': image_uuid}
+
+    def aggregate_metadata_get_by_host(context, host, key=None):
+        return {'availability_zone': set(['zone-%s' % host])}
+
+    fakes = dict((name, value) for name, value in locals().items()
+                 if callable(value))
+    for name, func in fakes.items():
+        setattr(db, name, _fake_db_call(latency, name, func))
+
+
+def _make_instances(count, hosts):
+    flavor = {'id': 1, 'name': 'm1.tiny', 'memory_mb': 512, 'vcpus': 1,
+              'root_gb': 1, 'ephemeral_gb': 0, 'flavorid': '1', 'swap': 0,
+              'rxtx_factor': 1.0, 'vcpu_weight': None}
+    sys_meta = flavors.save_flavor_info({}, flavor)
+    return [fake_instance.fake_db_instance(
+                id=i + 1,
+                host='host-%d' % (i % hosts),
+                hostname='server-%d' % i,
+                image_ref='cedef40a-ed67-4d10-800e-17455edce175',
+                kernel_id='',
+                ramdisk_id='',
+                reservation_id='r-%08x' % (i // 10),
+                root_device_name='/dev/vda',
+                vm_state='active',
+                shutdown_terminate=False,
+                info_cache={'network_info': []},
+                metadata=[],
+                system_metadata=sys_meta,
+                security_groups=['default'])
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, nargs='+', default=[1000, 5000],
+                        help='Numbers of instances to describe')
+    parser.add_argument('--hosts', type=int, default=50,
+                        help='Number of compute hosts the instances are on')
+    parser.add_argument('--latency', type=float, default=1.0,
+                        help='Milliseconds taken by each database query')
+    args = parser.parse_args()
+
+    controller = cloud.CloudController()
+    ctxt = context.RequestContext('fake-user', 'fake-project')
+
+    for count in args.count:
+        instances = _make_instances(count, args.hosts)
+        ec2_ids = dict((instance['uuid'], instance['id'])
+                       for instance in instances)
+        _stub_db(args.latency / 1000.0, ec2_ids)
+        controller.compute_api.get_all = (
+            lambda *a, **kw: instances)
+        ec2utils.reset_cache()
+        availability_zones.reset_cache()
+        QUERIES.clear()
+
+        start = time.time()
+        result = controller.describe_instances(ctxt)
+        elapsed = time.time() - start
+
+        described = sum(len(reservation['instancesSet'])
+                        for reservation in result['reservationSet'])
+        print 'Instances:              %d' % described
+        print 'Time:                   %.2f s' % elapsed
+        print 'Database queries:       %d' % sum(QUERIES.values())
+        for name, calls in sorted(QUERIES.items()):
+            print '    %-40s %d' % (name, calls)
+        print
+
+
+if __name__ == '__main__':
+    main()
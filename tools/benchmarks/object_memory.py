@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the memory held by a large InstanceList.
+
+This builds an InstanceList from fake database rows the same way
+InstanceList.get_by_filters() does and reports the resident set growth
+as well as the per-object storage overhead (the object itself plus any
+instance __dict__ and set it owns). Run it before and after changes to
+the object storage layout to compare:
+
+    python tools/benchmarks/object_memory.py --count 10000
+"""
+
+import argparse
+import gc
+import os
+import resource
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                os.pardir, os.pardir)))
+
+from nova import context
+from nova.objects import base
+from nova.objects import instance as instance_obj
+from nova.tests import fake_instance
+
+
+def _rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _storage_size(obj):
+    """Size of a NovaObject and the containers used to store its fields."""
+    size = sys.getsizeof(obj)
+    for ref in gc.get_referents(obj):
+        if isinstance(ref, (dict, set)):
+            size += sys.getsizeof(ref)
+    return size
+
+
+def _walk_objects(objects):
+    for obj in objects:
+        yield obj
+        for name in obj.fields:
+            if not obj.obj_attr_is_set(name):
+                continue
+            value = getattr(obj, name)
+            if isinstance(value, base.ObjectListBase):
+                for child in _walk_objects(value.objects):
+                    yield child
+            elif isinstance(value, base.NovaObject):
+                for child in _walk_objects([value]):
+                    yield child
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=10000,
+                        help='Number of instances in the list')
+    parser.add_argument('--security-groups', type=int, default=2,
+                        help='Number of security groups per instance')
+    args = parser.parse_args()
+
+    ctxt = context.get_admin_context()
+    secgroups = ['secgroup-%i' % i for i in range(args.security_groups)]
+    db_insts = [fake_instance.fake_db_instance(id=i + 1,
+                                               security_groups=secgroups)
+                for i in range(args.count)]
+    gc.collect()
+
+    rss_before = _rss_kb()
+    inst_list = instance_obj._make_instance_list(
+        ctxt, instance_obj.InstanceList(), db_insts,
+        ['info_cache', 'security_groups'])
+    gc.collect()
+    rss_after = _rss_kb()
+
+    storage = 0
+    nobjects = 0
+    for obj in _walk_objects(inst_list.objects):
+        storage += _storage_size(obj)
+        nobjects += 1
+
+    print 'Instances:              %d' % len(inst_list)
+    print 'NovaObjects:            %d' % nobjects
+    print 'Object storage:         %.1f KiB (%d bytes/instance)' % (
+        storage / 1024.0, storage / max(len(inst_list), 1))
+    print 'Max RSS growth:         %d KiB' % (rss_after - rss_before)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Time GET /servers/detail with and without the server extensions.
+
+The request goes through the servers resource of the v2 API with the
+extensions which add attributes to servers registered on it, as the API
+router would. The database calls made while the response is built are
+replaced by fakes which count them and sleep for --latency milliseconds
+to stand in for a round trip to the database. The report shows the time
+taken per server, which should stay flat as the number of servers grows:
+
+    python tools/benchmarks/servers_detail.py --count 100 1000
+
+Use --xml to time the XML serialization of the response instead of JSON.
+"""
+
+import argparse
+import collections
+import functools
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                    os.pardir, os.pardir))
+sys.path.insert(0, ROOT)
+
+from oslo.config import cfg
+
+from nova.api.openstack.compute.contrib import extended_availability_zone
+from nova.api.openstack.compute.contrib import extended_ips
+from nova.api.openstack.compute.contrib import extended_ips_mac
+from nova.api.openstack.compute.contrib import extended_server_attributes
+from nova.api.openstack.compute.contrib import extended_status
+from nova.api.openstack.compute.contrib import extended_volumes
+from nova.api.openstack.compute.contrib import security_groups
+from nova.api.openstack.compute.contrib import server_usage
+from nova.api.openstack.compute import servers
+from nova.api.openstack import wsgi
+from nova import availability_zones
+from nova.compute import flavors
+from nova import context
+from nova import db
+from nova.objects import instance as instance_obj
+from nova.tests import fake_instance
+
+
+CONF = cfg.CONF
+
+EXTENSIONS = [
+    extended_availability_zone.ExtendedAZController,
+    extended_ips.ExtendedIpsController,
+    extended_ips_mac.ExtendedIpsMacController,
+    extended_server_attributes.ExtendedServerAttributesController,
+    extended_status.ExtendedStatusController,
+    extended_volumes.ExtendedVolumesController,
+    security_groups.SecurityGroupsOutputController,
+    server_usage.ServerUsageController,
+]
+
+QUERIES = collections.defaultdict(int)
+
+
+class FakeExtensionManager(object):
+    def is_loaded(self, alias):
+        return False
+
+
+def _fake_db_call(latency, name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        QUERIES[name] += 1
+        time.sleep(latency)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _stub_db(latency):
+    def instance_fault_get_by_instance_uuids(context, instance_uuids):
+        return dict((instance_uuid, []) for instance_uuid in instance_uuids)
+
+    def block_device_mapping_get_all_by_instance(context, instance_uuid):
+        return []
+
+    def block_device_mapping_get_all_by_instance_uuids(context,
+                                                       instance_uuids):
+        return dict((instance_uuid, []) for instance_uuid in instance_uuids)
+
+    def aggregate_metadata_get_by_host(context, host, key=None):
+        return {'availability_zone': set(['zone-%s' % host])}
+
+    def aggregate_host_get_by_metadata_key(context, key):
+        return {}
+
+    fakes = dict((name, value) for name, value in locals().items()
+                 if callable(value))
+    for name, func in fakes.items():
+        setattr(db, name, _fake_db_call(latency, name, func))
+
+
+def _make_instances(ctxt, count, hosts):
+    flavor = {'id': 1, 'name': 'm1.tiny', 'memory_mb': 512, 'vcpus': 1,
+              'root_gb': 1, 'ephemeral_gb': 0, 'flavorid': '1', 'swap': 0,
+              'rxtx_factor': 1.0, 'vcpu_weight': None}
+    sys_meta = flavors.save_flavor_info({}, flavor)
+    db_instances = []
+    for i in range(count):
+        db_instance = fake_instance.fake_db_instance(
+            id=i + 1,
+            host='host-%d' % (i % hosts),
+            node='node-%d' % (i % hosts),
+            hostname='server-%d' % i,
+            display_name='server-%d' % i,
+            image_ref='cedef40a-ed67-4d10-800e-17455edce175',
+            vm_state='active',
+            power_state=1,
+            metadata=[],
+            system_metadata=sys_meta,
+            security_groups=['default'])
+        db_instance['info_cache'] = {'instance_uuid': db_instance['uuid'],
+                                     'network_info': '[]'}
+        db_instances.append(db_instance)
+    return instance_obj._make_instance_list(
+        ctxt, instance_obj.InstanceList(), db_instances,
+        instance_obj.INSTANCE_DEFAULT_FIELDS)
+
+
+def _make_resource(instances, extensions):
+    controller = servers.Controller(ext_mgr=FakeExtensionManager())
+    controller.compute_api.get_all = lambda *args, **kwargs: instances
+    resource = wsgi.Resource(controller)
+    for extension in extensions:
+        resource.register_extensions(extension())
+    return resource
+
+
+def _get_detail(resource, ctxt, accept):
+    req = wsgi.Request.blank('/v2/fake-project/servers/detail')
+    req.accept = accept
+    req.environ['nova.context'] = ctxt
+    req.environ['wsgiorg.routing_args'] = (None, {'action': 'detail'})
+    start = time.time()
+    response = req.get_response(resource)
+    elapsed = time.time() - start
+    if response.status_int != 200:
+        raise Exception('GET /servers/detail returned %s' % response.status)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, nargs='+', default=[100, 1000],
+                        help='Numbers of servers to list')
+    parser.add_argument('--hosts', type=int, default=50,
+                        help='Number of compute hosts the servers are on')
+    parser.add_argument('--latency', type=float, default=1.0,
+                        help='Milliseconds taken by each database query')
+    parser.add_argument('--xml', action='store_true',
+                        help='Ask for an XML response instead of JSON')
+    args = parser.parse_args()
+    accept = 'application/xml' if args.xml else 'application/json'
+
+    CONF.set_override('policy_file',
+                      os.path.join(ROOT, 'etc', 'nova', 'policy.json'))
+    ctxt = context.RequestContext('fake-user', 'fake-project',
+                                  is_admin=True, roles=['admin'])
+    _stub_db(args.latency / 1000.0)
+
+    for count in args.count:
+        instances = _make_instances(ctxt, count, args.hosts)
+        print 'Servers:                %d' % count
+        for label, extensions in (('without extensions', []),
+                                  ('with extensions', EXTENSIONS)):
+            resource = _make_resource(instances, extensions)
+            availability_zones.reset_cache()
+            QUERIES.clear()
+
+            elapsed = _get_detail(resource, ctxt, accept)
+
+            print '  %s:' % label
+            print '    Time:                 %.2f s' % elapsed
+            print '    Time per server:      %.2f ms' % (
+                elapsed * 1000.0 / count)
+            print '    Database queries:     %d' % sum(QUERIES.values())
+            for name, calls in sorted(QUERIES.items()):
+                print '        %-40s %d' % (name, calls)
+        print
+
+
+if __name__ == '__main__':
+    main()